@@ -0,0 +1,171 @@
+# Adaptive (early-stopping) SPSRQ administration.
+# The only decision the SPSRQ drives is whether reward or punishment sensitivity
+# dominates (SR total >= SP total -> RSS, else ASQ). Items are presented
+# alternating reward/punishment so both subscales are estimated from the start,
+# and administration stops once the projected full-length SR-vs-SP difference
+# is settled at the configured confidence:
+#
+#   projected total  T = N * mean of the answered items of that subscale
+#   Var(T)           = N^2 * (1 - n/N) * s^2 / n     (finite-population correction)
+#   settled when     |T_SR - T_SP| / sqrt(Var(T_SR) + Var(T_SP)) >= z(confidence)
+#
+# Partial administrations are scored with scoring.score_spsrq(prorate=True),
+# whose dominant sensitivity is the sign of that same projected difference.
+#
+#   python adaptive.py intake.jsonl --confidence 0.95 --min-items 12
+# replays full-length responses (batch_assess input format) to show how many
+# items the rule saves and how often it agrees with the full questionnaire.
+import argparse
+from statistics import NormalDist
+
+import numpy as np
+
+import scoring
+
+CONFIDENCE = 0.95
+MIN_ITEMS = 12
+MIN_PER_SCALE = 2
+# Floor on the within-person item variance so a run of identical answers
+# does not look like a certain classification
+MIN_VARIANCE = 1.0
+
+
+def item_order(spsrq_df, calibration=None):
+    """Item positions in presentation order, alternating reward and punishment items.
+
+    Without calibration data each subscale keeps file order. With `calibration`
+    (a respondents x items matrix of full-length responses) items within each
+    subscale are ranked by how strongly they correlate with the SR-SP difference.
+    """
+    types = spsrq_df["type"].str.lower().to_numpy()
+    scales = [np.flatnonzero(types == t) for t in ("reward", "punishment")]
+    if calibration is not None:
+        calibration = np.nan_to_num(np.atleast_2d(np.asarray(calibration, dtype=float)), nan=0.0)
+        difference = calibration[:, scales[0]].sum(axis=1) - calibration[:, scales[1]].sum(axis=1)
+        centered = calibration - calibration.mean(axis=0)
+        d = difference - difference.mean()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = (centered * d[:, None]).sum(axis=0) / np.sqrt((centered ** 2).sum(axis=0) * (d ** 2).sum())
+        corr = np.nan_to_num(np.abs(corr))
+        scales = [scale[np.argsort(-corr[scale], kind="stable")] for scale in scales]
+    order = []
+    for i in range(max(len(s) for s in scales)):
+        order.extend(int(s[i]) for s in scales if i < len(s))
+    return np.array(order)
+
+
+def projection(matrix, spsrq_df):
+    """Projected SR-SP total difference and its z-score for every respondent.
+
+    Unanswered items are NaN. Respondents with fewer than MIN_PER_SCALE answers
+    on either subscale get z = 0 (undecided).
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+    types = spsrq_df["type"].str.lower().to_numpy()
+    difference = np.zeros(len(matrix))
+    variance = np.zeros(len(matrix))
+    enough = np.ones(len(matrix), dtype=bool)
+    for sign, q_type in ((1, "reward"), (-1, "punishment")):
+        block = matrix[:, types == q_type]
+        total_items = block.shape[1]
+        n = (~np.isnan(block)).sum(axis=1)
+        filled = np.nan_to_num(block, nan=0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = filled.sum(axis=1) / n
+            s2 = ((filled - mean[:, None]) ** 2 * ~np.isnan(block)).sum(axis=1) / (n - 1)
+            var_total = total_items ** 2 * (1 - n / total_items) * np.maximum(s2, MIN_VARIANCE) / n
+        enough &= n >= min(MIN_PER_SCALE, total_items)
+        difference += sign * np.nan_to_num(total_items * mean)
+        variance += np.nan_to_num(var_total)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Zero variance means every item is answered: the sign is final (ties go to reward)
+        z = np.where(variance > 0, difference / np.sqrt(variance), np.where(difference >= 0, np.inf, -np.inf))
+    z[~enough] = 0.0
+    return difference, z
+
+
+def settled(matrix, spsrq_df, confidence=CONFIDENCE, min_items=MIN_ITEMS):
+    """Boolean per respondent: is the SR-vs-SP classification settled?"""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+    _, z = projection(matrix, spsrq_df)
+    answered = (~np.isnan(matrix)).sum(axis=1)
+    complete = answered == matrix.shape[1]
+    return complete | ((answered >= min_items) & (np.abs(z) >= NormalDist().inv_cdf(confidence)))
+
+
+def is_settled(responses, spsrq_df, confidence=CONFIDENCE, min_items=MIN_ITEMS):
+    """`settled` for one participant's {key: value} responses."""
+    matrix = scoring.response_matrix(responses, spsrq_df, "spsrq")
+    return bool(settled(matrix, spsrq_df, confidence, min_items)[0])
+
+
+def stopping_points(matrix, spsrq_df, order=None, confidence=CONFIDENCE, min_items=MIN_ITEMS, step=1):
+    """Number of items each respondent answers before stopping.
+
+    Replays full-length responses in presentation `order`, checking the rule
+    after every `step` items (the questionnaire page size in the app).
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+    order = item_order(spsrq_df) if order is None else np.asarray(order)
+    n_items = len(order)
+    stops = np.full(len(matrix), n_items)
+    pending = np.ones(len(matrix), dtype=bool)
+    partial = np.full(matrix.shape, np.nan)
+    for k in list(range(step, n_items, step)) + [n_items]:
+        partial[:, order[:k]] = matrix[:, order[:k]]
+        done = pending & settled(partial, spsrq_df, confidence, min_items)
+        stops[done] = k
+        pending &= ~done
+        if not pending.any():
+            break
+    return stops
+
+
+def evaluate(matrix, spsrq_df, order=None, confidence=CONFIDENCE, min_items=MIN_ITEMS, step=1):
+    """Items used and agreement with the full-length classification for a cohort."""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+    order = item_order(spsrq_df) if order is None else np.asarray(order)
+    stops = stopping_points(matrix, spsrq_df, order, confidence, min_items, step)
+    partial = np.full(matrix.shape, np.nan)
+    rank = np.empty(len(order), dtype=int)
+    rank[order] = np.arange(len(order))
+    shown = rank[None, :] < stops[:, None]
+    partial[shown] = matrix[shown]
+    full = scoring.score_spsrq(matrix, spsrq_df)["sensitivity"].to_numpy()
+    adaptive = scoring.score_spsrq(partial, spsrq_df, prorate=True)["sensitivity"].to_numpy()
+    return {
+        "respondents": len(matrix),
+        "items": matrix.shape[1],
+        "mean_items": float(stops.mean()),
+        "median_items": float(np.median(stops)),
+        "items_saved": float(1 - stops.mean() / matrix.shape[1]),
+        "agreement": float((full == adaptive).mean()),
+    }
+
+
+def main(argv=None):
+    import batch_assess
+    import registry
+
+    parser = argparse.ArgumentParser(description="Replay full SPSRQ responses through the adaptive stopping rule.")
+    parser.add_argument("input", help="JSONL/CSV file of responses (batch_assess format), or a directory of them")
+    parser.add_argument("--confidence", type=float, action="append", help="Confidence level(s) to evaluate (repeatable)")
+    parser.add_argument("--min-items", type=int, default=MIN_ITEMS)
+    parser.add_argument("--page-size", type=int, default=1, help="Check the rule every this many items")
+    parser.add_argument("--calibrate", action="store_true", help="Order items by their correlation with SR-SP in the input")
+    parser.add_argument("--instruments", default="", help="Directory holding the questionnaire CSVs")
+    args = parser.parse_args(argv)
+
+    spsrq_df = registry.get_instrument("spsrq", args.instruments).df
+    records = [responses for _, responses in batch_assess.iter_records(args.input)]
+    matrix = scoring.response_matrix(records, spsrq_df, "spsrq")
+    order = item_order(spsrq_df, matrix if args.calibrate else None)
+    print(f"{'confidence':>10} {'mean items':>11} {'median':>7} {'saved':>7} {'agreement':>10}")
+    for confidence in args.confidence or [0.9, 0.95, 0.99]:
+        result = evaluate(matrix, spsrq_df, order, confidence, args.min_items, args.page_size)
+        print(f"{confidence:10.3f} {result['mean_items']:11.1f} {result['median_items']:7.0f} "
+              f"{result['items_saved']:7.1%} {result['agreement']:10.1%}")
+
+
+if __name__ == "__main__":
+    main()
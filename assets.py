@@ -0,0 +1,160 @@
+# Resized, compressed variants of the apps' images.
+# Each source image is encoded once as WebP and JPEG at a few widths, written
+# to ASSET_DIR (so later processes and restarts just read them) and kept in a
+# process-wide cache. Pages show the smallest variant that is still at least
+# as wide as the content column, in a format they can pass through as is
+# (st.image re-encodes anything but PNG/JPEG on every rerun, so the apps use
+# JPEG; WebP is for HTML pages). Because the bytes are identical on every
+# rerun, Streamlit serves them under the same media URL and the browser never
+# downloads the image twice in a session. Pillow (installed with Streamlit)
+# does the encoding; without it callers fall back to the original file.
+#
+#   python assets.py title.png          # pre-build the variants (e.g. at deploy time)
+import argparse
+import importlib.util
+import io
+import os
+import threading
+from dataclasses import dataclass
+
+ASSET_DIR = "assets"
+VARIANT_WIDTHS = (480, 720, 1024)
+# Width the image is shown at: the centered layout's content column
+DISPLAY_WIDTH = int(os.environ.get("OPERANT_IMAGE_WIDTH", 720))
+FORMATS = {
+    "webp": {"quality": 80, "method": 6},
+    "jpeg": {"quality": 85, "optimize": True, "progressive": True},
+}
+MIMETYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+# Formats st.image sends without decoding and re-encoding them
+STREAMLIT_FORMATS = ("jpeg",)
+AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+_variants = {}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Variant:
+    """One encoded size and format of an image."""
+    format: str
+    width: int
+    data: bytes
+
+    @property
+    def mimetype(self):
+        return MIMETYPES[self.format]
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _variant_path(path, fmt, width, asset_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(asset_dir, f"{stem}-{width}.{fmt}")
+
+
+def _widths(source_width):
+    return sorted({w for w in VARIANT_WIDTHS if w < source_width} | {source_width})
+
+
+def encode_variants(path):
+    """Encode every (format, width) variant of an image."""
+    from PIL import Image
+    with Image.open(path) as source:
+        source.load()
+        variants = []
+        for width in _widths(source.width):
+            resized = source if width == source.width else source.resize(
+                (width, round(source.height * width / source.width)), Image.Resampling.LANCZOS)
+            for fmt, options in FORMATS.items():
+                image = resized
+                if fmt == "jpeg" and image.mode in ("RGBA", "LA", "P"):
+                    # JPEG has no alpha channel; flatten onto the page's white background
+                    image = Image.new("RGB", image.size, "white")
+                    image.paste(resized, mask=resized.convert("RGBA").getchannel("A"))
+                buf = io.BytesIO()
+                image.save(buf, format=fmt.upper(), **options)
+                variants.append(Variant(fmt, width, buf.getvalue()))
+    return variants
+
+
+def _load_built(path, asset_dir):
+    """Variants already written to asset_dir, or None if any is missing or older than the source."""
+    from PIL import Image
+    with Image.open(path) as source:
+        widths = _widths(source.width)
+    source_mtime = os.stat(path).st_mtime_ns
+    variants = []
+    for width in widths:
+        for fmt in FORMATS:
+            built = _variant_path(path, fmt, width, asset_dir)
+            if not os.path.exists(built) or os.stat(built).st_mtime_ns < source_mtime:
+                return None
+            with open(built, "rb") as f:
+                variants.append(Variant(fmt, width, f.read()))
+    return variants
+
+
+def build(path, asset_dir=ASSET_DIR):
+    """Encode an image's variants and write them to asset_dir; returns them."""
+    variants = encode_variants(path)
+    os.makedirs(asset_dir, exist_ok=True)
+    for variant in variants:
+        built = _variant_path(path, variant.format, variant.width, asset_dir)
+        tmp = f"{built}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(variant.data)
+        os.replace(tmp, built)
+    return variants
+
+
+def get_variants(path, asset_dir=ASSET_DIR):
+    """Return the process-wide variants of an image, reading pre-built ones or building them once."""
+    key = os.path.abspath(path)
+    signature = _signature(path)
+    with _lock:
+        cached = _variants.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        variants = _load_built(path, asset_dir)
+        if variants is None:
+            try:
+                variants = build(path, asset_dir)
+            except OSError:
+                variants = encode_variants(path)  # read-only app directory: keep them in memory only
+        _variants[key] = (signature, variants)
+        return variants
+
+
+def best_variant(path, display_width=DISPLAY_WIDTH, formats=tuple(FORMATS), asset_dir=ASSET_DIR):
+    """Smallest variant in `formats` at least `display_width` wide (or the widest), None without Pillow."""
+    if not AVAILABLE:
+        return None
+    variants = [v for v in get_variants(path, asset_dir) if v.format in formats]
+    widest = max(v.width for v in variants)
+    adequate = [v for v in variants if v.width >= min(display_width, widest)]
+    return min(adequate, key=lambda v: (len(v.data), v.width))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-build resized WebP/JPEG variants of images.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--out", default=ASSET_DIR, help=f"Output directory (default: {ASSET_DIR})")
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        original = os.path.getsize(path)
+        print(f"{path}: {original / 1024:,.0f} KiB")
+        for variant in build(path, args.out):
+            print(f"  {variant.width:5d}px {variant.format:<4} {len(variant.data) / 1024:8,.0f} KiB "
+                  f"({len(variant.data) / original:.1%})")
+        for formats in (tuple(FORMATS), STREAMLIT_FORMATS):
+            chosen = best_variant(path, formats=formats, asset_dir=args.out)
+            print(f"  best of {'/'.join(formats)} at {DISPLAY_WIDTH}px: {chosen.width}px {chosen.format}")
+
+
+if __name__ == "__main__":
+    main()
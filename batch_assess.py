@@ -0,0 +1,237 @@
+# Headless batch assessment: score intake files without the browser flow.
+# Reads participant responses from a JSONL/CSV file (or a directory of them),
+# scores them in chunks across a process pool with the same scoring engine the
+# app uses, and writes each participant's <name>_sticker_data.csv export plus
+# a cohort summary. Input is streamed and only a bounded number of chunks is
+# in flight at once, so memory stays flat however large the intake file is.
+#
+#   python batch_assess.py intake.jsonl --out exports/
+#
+# JSONL lines look like {"participant": "Jane Doe", "responses": {"Q1": 5, "RSS_3": 7, ...}}
+# (item keys may also sit at the top level). CSV files have a participant (or name)
+# column and one column per item key (Q1..Q48, RSS_1.., ASQ_1..).
+# Records without a usable name, or whose name maps to an export already written
+# in this run, are skipped and logged. Incomplete records (see missing_items) are
+# listed in the summary with status "incomplete" but not scored or exported.
+import argparse
+import csv
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+import psychometrics
+import registry
+import scoring
+
+NAME_FIELDS = ("participant", "name", "participant_name")
+SUMMARY_FILE = "cohort_summary.csv"
+SCORE_COLUMNS = ("reward_total", "reward_mean", "reward_sd", "punishment_total", "punishment_mean",
+                 "punishment_sd", "dominant", "sensitivity")
+
+logger = logging.getLogger(__name__)
+
+
+def _split_record(record):
+    # A null (JSON) or empty (CSV NaN) name field counts as missing
+    name = next((str(record[f]) for f in NAME_FIELDS if record.get(f) is not None and record[f] == record[f]), None)
+    responses = record.get("responses")
+    if responses is None:
+        responses = {k: v for k, v in record.items() if k not in NAME_FIELDS}
+    responses = {k: float(v) for k, v in responses.items() if v is not None and v == v}
+    return name, responses
+
+
+def iter_records(path, chunk_size=1000):
+    """Stream (participant, responses) pairs from a .jsonl/.csv file or a directory of them."""
+    if os.path.isdir(path):
+        for entry in sorted(os.listdir(path)):
+            if entry.endswith((".jsonl", ".csv")):
+                yield from iter_records(os.path.join(path, entry), chunk_size)
+        return
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield _split_record(json.loads(line))
+    elif path.endswith(".csv"):
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            for record in chunk.to_dict("records"):
+                yield _split_record(record)
+    else:
+        raise ValueError(f"Unsupported input file (expected .jsonl or .csv): {path}")
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def missing_items(records, base_dir=""):
+    """Per (participant, responses) record, (instrument kind, missing item keys), or None if it can be scored.
+
+    A record needs the whole SPSRQ, the whole follow-up questionnaire (RSS or
+    ASQ) its SPSRQ scores select, and every item of any other questionnaire it
+    answers. The scoring engine reads a missing item as 0, so a partial record
+    would get wrong totals and classification.
+    """
+    responses = [r for _, r in records]
+    answered = {}
+    for kind in registry.INSTRUMENT_FILES:
+        instrument = registry.get_instrument(kind, base_dir)
+        matrix = scoring.response_matrix(responses, instrument.df, kind)
+        answered[kind] = (np.asarray(instrument.keys), ~np.isnan(matrix))
+    spsrq = registry.get_instrument("spsrq", base_dir)
+    selected = scoring.score_spsrq(scoring.response_matrix(responses, spsrq.df, "spsrq"), spsrq.df)["sensitivity"]
+    found = [None] * len(records)
+    for kind, (keys, present) in answered.items():
+        partial = ~present.all(axis=1) & (present.any(axis=1) | (kind == "spsrq") | (selected.to_numpy() == kind))
+        for row in np.flatnonzero(partial):
+            if found[row] is None:
+                found[row] = (kind, keys[~present[row]].tolist())
+    return found
+
+
+def score_chunk(records, out_dir, base_dir="", with_stats=False):
+    """Score one chunk of (participant, responses) pairs and write their sticker exports.
+
+    Names must pass scoring.valid_name. Incomplete records get status
+    "incomplete", their missing item keys and no scores or export. Returns the
+    chunk's rows of the cohort summary, and with `with_stats` also the chunk's
+    psychometrics.CohortStats of the scored records (merged across chunks by the caller).
+    """
+    names = [name for name, _ in records]
+    missing = missing_items(records, base_dir)
+    complete = np.array([m is None for m in missing], dtype=bool)
+    spsrq = registry.get_instrument("spsrq", base_dir)
+    matrix = scoring.response_matrix([responses for _, responses in records], spsrq.df, "spsrq")
+    summary = scoring.score_spsrq(matrix, spsrq.df)
+    summary.loc[~complete, list(SCORE_COLUMNS)] = np.nan
+    summary.insert(0, "participant", names)
+    stats = psychometrics.CohortStats() if with_stats else None
+    if stats is not None:
+        stats.update_items("spsrq", matrix[complete])
+        stats.update_norms(summary[complete])
+    top_stimuli = np.full(len(records), "", dtype=object)
+    export_files = np.full(len(records), "", dtype=object)
+
+    for kind in ("rss", "asq"):
+        rows = np.flatnonzero((summary["sensitivity"].to_numpy() == kind) & complete)
+        if not len(rows):
+            continue
+        instrument = registry.get_instrument(kind, base_dir)
+        follow_up = scoring.response_matrix([records[i][1] for i in rows], instrument.df, kind)
+        if stats is not None:
+            stats.update_items(kind, follow_up)
+        top = scoring.top_stimuli(follow_up, instrument.df, kind)
+        respondents = top["respondent"].to_numpy()
+        qids, questions, values = (top[c].to_numpy() for c in ("qid", "question", "response"))
+        # top_stimuli rows are grouped by respondent; write each group with the csv module
+        # (a pandas to_csv per participant costs more than the scoring itself)
+        for group in np.split(np.arange(len(top)), np.flatnonzero(np.diff(respondents)) + 1):
+            if not len(group):
+                continue
+            row = rows[respondents[group[0]]]
+            filename = scoring.sticker_filename(names[row])
+            with open(scoring.output_path(out_dir, filename), "w", newline="") as f:
+                writer = csv.writer(f, lineterminator="\n")
+                writer.writerow(["qid", "question", "response"])
+                writer.writerows(zip(qids[group], questions[group], values[group]))
+            top_stimuli[row] = ";".join(qids[group])
+            export_files[row] = filename
+
+    summary["top_stimuli"] = top_stimuli
+    summary["export_file"] = export_files
+    summary["status"] = np.where(complete, "scored", "incomplete")
+    summary["missing_items"] = [";".join(m[1]) if m else "" for m in missing]
+    return (summary, stats) if with_stats else summary
+
+
+def _screen(records, counts):
+    """Drop (and log) records without a valid name or whose export name was already used in this run."""
+    seen = set()
+    for i, (name, responses) in enumerate(records, 1):
+        if not scoring.valid_name(name):
+            counts["invalid name"] += 1
+            logger.warning("Record %d skipped: participant name %r missing or not usable as a file name", i, name)
+            continue
+        pid = scoring.participant_id(name)
+        if pid in seen:
+            counts["duplicate"] += 1
+            logger.warning("Record %d skipped: %r has the same export file as an earlier record", i, name)
+            continue
+        seen.add(pid)
+        yield name, responses
+
+
+def run(input_path, out_dir, workers=None, chunk_size=500, base_dir="", norms_path=None):
+    """Score every participant in `input_path`; returns {status: count}.
+
+    Statuses are "scored" and "incomplete" (rows of the summary) and "invalid
+    name" and "duplicate" (skipped records). With `norms_path`, the scored
+    records' item statistics and SR/SP totals are merged into that psychometrics file.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with_stats = norms_path is not None
+    cohort = psychometrics.CohortStats()
+    summary_path = os.path.join(out_dir, SUMMARY_FILE)
+    counts = {"scored": 0, "incomplete": 0, "invalid name": 0, "duplicate": 0}
+    chunks = _chunks(_screen(iter_records(input_path, chunk_size), counts), chunk_size)
+    header = True
+
+    def write(result):
+        nonlocal header
+        if with_stats:
+            summary, stats = result
+            cohort.merge(stats)
+        else:
+            summary = result
+        summary.to_csv(summary_path, mode="w" if header else "a", header=header, index=False)
+        header = False
+        for status, n in summary["status"].value_counts().items():
+            counts[status] += int(n)
+
+    if workers == 0:
+        for chunk in chunks:
+            write(score_chunk(chunk, out_dir, base_dir, with_stats))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep at most two chunks per worker in flight and write results in input order
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(score_chunk, chunk, out_dir, base_dir, with_stats))
+                if len(pending) >= 2 * workers:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+
+    if with_stats:
+        psychometrics.merge_into(norms_path, cohort)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score participant responses and export sticker chart files.")
+    parser.add_argument("input", help="JSONL/CSV file of responses, or a directory of them")
+    parser.add_argument("--out", default="exports", help="Output directory for exports and the cohort summary")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 0 = no pool)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Participants scored per task")
+    parser.add_argument("--instruments", default="", help="Directory holding the questionnaire CSVs")
+    parser.add_argument("--norms", default=None, help="Also fold the cohort into this psychometrics file (e.g. cohort_norms.npz)")
+    args = parser.parse_args(argv)
+
+    counts = run(args.input, args.out, args.workers, args.chunk_size, args.instruments, args.norms)
+    print(f"Scored {counts['scored']} participants, {counts['incomplete']} incomplete (not scored); "
+          f"skipped {counts['invalid name']} with an invalid name and {counts['duplicate']} duplicate(s); "
+          f"summary written to {os.path.join(args.out, SUMMARY_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
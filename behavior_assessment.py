@@ -1,8 +1,47 @@
 #program by Marcus C. Rodriguez PSYC-3220-U71 06/10/2025
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+import startup_profile
+import metrics
+import checkpoint
+import questionnaire
+
+# Heavy modules (pandas/numpy via registry and scoring, matplotlib via figures)
+# are imported by the pages that need them through this run's startup profile
+PAGE = "behavior_assessment"
+profile = startup_profile.begin(PAGE)
+
+# Progress is checkpointed per resume code; ?resume=<code> stays in the URL, so a browser
+# refresh (or a server restart) picks the assessment up where it left off
+CHECKPOINT_FIELDS = (
+    "consent_given", "consent_name", "participant_name",
+    "spsrq_complete", "sensitivity", "rss_asq_complete",
+    "spsrq_responses", "rss_responses", "asq_responses",
+    "spsrq_answers", "rss_answers", "asq_answers",
+    "spsrq_page", "rss_page", "asq_page", "spsrq_settled_at",
+    "spsrq_reward", "spsrq_punishment", "spsrq_scores", "spsrq_items_answered",
+    "cohort_recorded",
+)
+
+def resume_session(token):
+    """Load a checkpoint into the session; returns False if there is none for this code."""
+    session = checkpoint.Checkpoint(PAGE, token)
+    fields = session.restore()
+    if not fields:
+        return False
+    for field, value in fields.items():
+        st.session_state[field] = value
+    st.session_state.checkpoint = session
+    return True
+
+def save_checkpoint():
+    session = st.session_state.get("checkpoint")
+    if session is not None:
+        session.sync({f: st.session_state[f] for f in CHECKPOINT_FIELDS if f in st.session_state})
+
+if "checkpoint" not in st.session_state:
+    st.session_state.checkpoint = None
+    if st.query_params.get("resume"):
+        resume_session(st.query_params["resume"])
 
 # Initialize session state variables
 if 'consent_given' not in st.session_state:
@@ -30,34 +69,30 @@ if "spsrq_responses" not in st.session_state:
 if 'consent_name' not in st.session_state:
     st.session_state.consent_name = ""
 
-def get_color(value):
-    """Return a CSS color gradient based on Likert scale value."""
-    color_map = {
-        1: '#b30000',  # Dark red
-        2: '#e34a33',
-        3: '#fc8d59',
-        4: '#fdbb84',  # Orange for Neutral
-        5: '#a1d99b',
-        6: '#74c476',
-        7: '#31a354'   # Green
-    }
-    return color_map.get(value, 'black')
-    
-# Set Likert Labels
-likert_labels = {
-    1: "Strongly Disagree",
-    2: "Disagree",
-    3: "Somewhat Disagree",
-    4: "Neutral",
-    5: "Somewhat Agree",
-    6: "Agree",
-    7: "Strongly Agree"
-}
+profile.mark("session state")
+
+# Questionnaires show this many items per page (None shows every item on one page)
+ITEMS_PER_PAGE = 12
+
+# Adaptive SPSRQ: items alternate reward/punishment and the questionnaire stops once
+# the SR-vs-SP classification is settled at ADAPTIVE_CONFIDENCE (checked every
+# ADAPTIVE_PAGE_SIZE items, never before ADAPTIVE_MIN_ITEMS). False shows every item.
+ADAPTIVE_SPSRQ = False
+ADAPTIVE_CONFIDENCE = 0.95
+ADAPTIVE_MIN_ITEMS = 12
+ADAPTIVE_PAGE_SIZE = 6
+
+# Summary charts: "matplotlib" (cached PNGs) or "native" (Streamlit charts, no matplotlib)
+CHART_BACKEND = "matplotlib"
 
 # Function: Consent Form
+@metrics.timed(PAGE)
 def show_consent_form():
     if not st.session_state.consent_given:
-        st.image("title.png", use_container_width=True, caption="PSYC-3220-U71: Learning, Program By: Marcus C. Rodriguez www.marcusc.com")
+        # A resized JPEG (built once per process, same bytes and media URL on every rerun); the PNG without Pillow
+        assets = profile.import_module("assets")
+        title = assets.best_variant("title.png", formats=assets.STREAMLIT_FORMATS)
+        st.image(title.data if title is not None else "title.png", use_container_width=True, caption="PSYC-3220-U71: Learning, Program By: Marcus C. Rodriguez www.marcusc.com")
     st.write("The cluttered mobile depicted in the image not only creates the visualization of the operant tension between punishment and reward as reflected in the eyes of the mouse, the cat on one side the cheese the other, it also mirrors the perceptual disarray experienced by individuals with ADHD. For those suffering with impaired executive functioning, the world often presents itself not as a mobile in equilibrium reflecting a balanced hierarchy of incentives and consequences, but rather as a disorganized field of dangling contingencies. The field is constantly shifting, overlapping, and difficult to parse. The exaggerated representation of the Calderesque mobile is a metaphor of the  chaotic reinforcement environment: unpredictable, overstimulating, and difficult to regulate. As a cat might swipe at a mobile in fascination and confusion, the ADHD brain is drawn toward stimuli without clear direction or ability to  readily discriminate consequences. In this mock study/paper, I attempt to use instrumental conditioning not just to shape behavior, but to impose structure onto disorder, clarity onto chaos in an effort to restore the contingencies that are drowned out by the distraction.")
 
     st.title("Informed Consent Form")
@@ -85,100 +120,95 @@ def show_consent_form():
         submitted = st.form_submit_button("I Consent")
         
         if submitted:
-            if name.strip():
+            scoring = profile.import_module("scoring")
+            if name.strip() and not scoring.valid_name(name):
+                # The name becomes the export's file name
+                st.warning("Please use only letters, digits, spaces and . , ' - in your name.")
+            elif name.strip():
                 st.session_state.consent_name = name.strip()
                 st.session_state.participant_name = name.strip()
                 st.session_state.consent_given = True
+                # Start checkpointing under a fresh resume code
+                st.session_state.checkpoint = checkpoint.Checkpoint(PAGE, checkpoint.new_token())
+                st.query_params["resume"] = st.session_state.checkpoint.token
                 st.success(f"Consent provided by {name.strip()}.")
             else:
                 st.warning("Please enter your full name before submitting.")
+
+    with st.form("resume_form", clear_on_submit=False):
+        code = st.text_input("Already started? Enter your resume code:")
+        if st.form_submit_button("Resume"):
+            if code.strip() and resume_session(code.strip()):
+                st.query_params["resume"] = code.strip()
+                st.rerun()
+            else:
+                st.warning("No saved assessment was found for that code.")
 # Function: SPSRQ Questionnaire 
+@metrics.timed(PAGE)
 def run_spsrq():
     st.header("Sensitivity to Punishment and Sensitivity to Reward Questionnaire (SPSRQ)")
-    st.markdown("""
-    <div class='likert-legend'>
-        <b>Likert Scale</b>: 
-        <span style='color:#b30000;'>1</span>, 
-        <span style='color:#e34a33;'>2</span>, 
-        <span style='color:#fc8d59;'>3</span>, 
-        <span style='color:#fdbb84;'>4</span>, 
-        <span style='color:#a1d99b;'>5</span>, 
-        <span style='color:#74c476;'>6</span>, 
-        <span style='color:#31a354;'>7</span> <br>
-        <hr style='height:5px;border:none;background:linear-gradient(to right, yellow, orange); border-radius:5px;'>
-        <i>1 = Strongly Disagree &nbsp;&nbsp;&nbsp; 2 = Disagree &nbsp;&nbsp;&nbsp; 3 = Somewhat Disagree &nbsp;&nbsp;&nbsp; <br> 4 = Neutral <br> 5 = Somewhat Agree &nbsp;&nbsp;&nbsp; 6 = Agree &nbsp;&nbsp;&nbsp; 7 = Strongly Agree</i>
-    </div>
-    """, unsafe_allow_html=True)
-    # Load SPSRQ questions if not already loaded
-    if "spsrq_df" not in st.session_state:
-        try:
-            spsrq_df = pd.read_csv("spsrq_questions.csv")
-            st.session_state.spsrq_df = spsrq_df
-        except FileNotFoundError:
-            st.error("SPSRQ questions file not found. Please ensure 'spsrq_questions.csv' is in the app directory.")
-            return
-
-    responses = {}
-
-    for _, row in st.session_state.spsrq_df.iterrows():    	
-        st.markdown("<hr style='height:3px;border:none;background:linear-gradient(to right, red, orange, yellow, green); border-radius:5px;'>", unsafe_allow_html=True)
-        question = row["question"]
-        qid = f"Q{row['id']}"
-        value = st.slider(
-            f"{qid}. {question}",
-            min_value=1,
-            max_value=7,
-            value=4,
-            key=qid,
-            label_visibility="visible"
-        )
-        responses[qid] = value
-        color = get_color(value)
-        label = likert_labels.get(value, "Invalid value")
-        st.markdown(
-            f"<div style='padding:6px; border-radius:5px; background-color:{color}; color:black; margin-bottom:5px;'>"
-            f"<b>Your response:</b> {label}</div>",
-            unsafe_allow_html=True
+    questionnaire.render_legend()
+    # Load SPSRQ questions from the shared registry
+    registry = profile.import_module("registry")
+    try:
+        instrument = registry.get_instrument("spsrq")
+    except FileNotFoundError:
+        st.error("SPSRQ questions file not found. Please ensure 'spsrq_questions.csv' is in the app directory.")
+        return
+
+    if ADAPTIVE_SPSRQ:
+        adaptive = profile.import_module("adaptive")
+        responses = questionnaire.render_questionnaire(
+            instrument,
+            page_size=ADAPTIVE_PAGE_SIZE,
+            order=adaptive.item_order(instrument.df),
+            is_settled=lambda shown: adaptive.is_settled(shown, instrument.df, ADAPTIVE_CONFIDENCE, ADAPTIVE_MIN_ITEMS),
+            on_change=save_checkpoint,
         )
+    else:
+        responses = questionnaire.render_questionnaire(instrument, page_size=ITEMS_PER_PAGE, on_change=save_checkpoint)
 
-    if st.button("Submit SPSRQ"):
+    if responses is not None and st.button("Submit SPSRQ"):
         st.session_state.spsrq_responses = responses
         st.session_state.spsrq_complete = True
         process_spsrq_results(responses)
         
     
 # Function to compute SPSRQ scores and branch to the next questionnaire
+@metrics.timed(PAGE)
 def process_spsrq_results(spsrq_responses):
-    reward_score = 0
-    punishment_score = 0
-
-    for qid, value in spsrq_responses.items():
-        q_type = st.session_state.spsrq_df.loc[st.session_state.spsrq_df['id'] == int(qid[1:]), 'type'].values[0]
-        if q_type == 'reward':
-            reward_score += value
-        elif q_type == 'punishment':
-            punishment_score += value
+    registry = profile.import_module("registry")
+    scoring = profile.import_module("scoring")
+    spsrq_df = registry.get_instrument("spsrq").df
+    matrix = scoring.response_matrix(spsrq_responses, spsrq_df, "spsrq")
+    # An adaptive administration that stopped early is scored from the items answered
+    partial = len(spsrq_responses) < len(spsrq_df)
+    scores = scoring.score_spsrq(matrix, spsrq_df, prorate=partial).iloc[0]
+    reward_score = int(scores["reward_total"])
+    punishment_score = int(scores["punishment_total"])
 
     # Store for later reference
     st.session_state.spsrq_reward = reward_score
     st.session_state.spsrq_punishment = punishment_score
+    st.session_state.spsrq_scores = scores
+    st.session_state.spsrq_items_answered = len(spsrq_responses)
 
     st.markdown("---")
     st.subheader("SPSRQ Results Summary")
     st.write(f"**Total Sensitivity to Reward (SR):** {reward_score}")
     st.write(f"**Total Sensitivity to Punishment (SP):** {punishment_score}")
+    if partial:
+        st.caption(f"Classification settled after {len(spsrq_responses)} of {len(spsrq_df)} items; "
+                   "totals are prorated from the items answered.")
 
-    # Decide dominant sensitivity
-    if reward_score > punishment_score:
+    # Dominant sensitivity comes from the scoring engine (ties default to reward)
+    st.session_state.sensitivity = str(scores["sensitivity"])
+    if reward_score == punishment_score and scores["sensitivity"] == "rss":
+        st.info("Scores are equal. Defaulting to **RSS** as per positive conditioning preference.")
+    elif scores["sensitivity"] == "rss":
         st.success("Based on your profile, we will proceed with the **Reinforcement Survey Schedule (RSS)**.")
-        st.session_state.sensitivity = "rss"
-    elif punishment_score > reward_score:
-        st.warning("Based on your profile, we will proceed with the **Aversive Stimuli Questionnaire (ASQ)**.")
-        st.session_state.sensitivity = "asq"
     else:
-        # Tie-breaker: default to reward
-        st.info("Scores are equal. Defaulting to **RSS** as per positive conditioning preference.")
-        st.session_state.sensitivity = "rss"
+        st.warning("Based on your profile, we will proceed with the **Aversive Stimuli Questionnaire (ASQ)**.")
 
     # Trigger button to continue
     if st.button("Continue to Next Questionnaire"):
@@ -194,53 +224,18 @@ def run_rss_or_asq():
 # Function: RSS Questionnaire 
 def run_rss():
     st.header("Reinforcement Survey Schedule (RSS)")
-    st.markdown("""
-    <div class='likert-legend'>
-        <b>Likert Scale</b>: 
-        <span style='color:#b30000;'>1</span>, 
-        <span style='color:#e34a33;'>2</span>, 
-        <span style='color:#fc8d59;'>3</span>, 
-        <span style='color:#fdbb84;'>4</span>, 
-        <span style='color:#a1d99b;'>5</span>, 
-        <span style='color:#74c476;'>6</span>, 
-        <span style='color:#31a354;'>7</span> <br>
-        <hr style='height:5px;border:none;background:linear-gradient(to right, yellow, orange); border-radius:5px;'>
-        <i>1 = Strongly Disagree &nbsp;&nbsp;&nbsp; 2 = Disagree &nbsp;&nbsp;&nbsp; 3 = Somewhat Disagree &nbsp;&nbsp;&nbsp; <br> 4 = Neutral <br> 5 = Somewhat Agree &nbsp;&nbsp;&nbsp; 6 = Agree &nbsp;&nbsp;&nbsp; 7 = Strongly Agree</i>
-    </div>
-    """, unsafe_allow_html=True)
+    questionnaire.render_legend()
     st.subheader("____________ is important to me.")
-# Load RSS questions if not already loaded
-    if "rss_df" not in st.session_state:
-        try:
-            rss_df = pd.read_csv("rss_questions.csv")
-            st.session_state.rss_df = rss_df
-        except FileNotFoundError:
-            st.error("RSS questions file not found. Please ensure 'rss_questions.csv' is in the app directory.")
-            return
-    responses = {}
-    for _, row in st.session_state.rss_df.iterrows():
-        st.markdown("<hr style='height:3px;border:none;background:linear-gradient(to right, red, orange, yellow, green); border-radius:5px;'>", unsafe_allow_html=True)
-        question = row["question"]
-        qid = f"RSS_{row['id']}"
-        value = st.slider(
-            f"{qid}. {question}",
-            min_value=1,
-            max_value=7,
-            value=4,
-            key=qid,
-            label_visibility="visible"
-        )
-        responses[qid] = value
-        color = get_color(value)
-        label = likert_labels.get(value, "Invalid value")
-        
-        st.markdown(
-            f"<div style='padding:6px; border-radius:5px; background-color:{color}; color:black; margin-bottom:5px;'>"
-            f"<b>Your response:</b> {label}</div>",
-            unsafe_allow_html=True
-        )
-
-    if st.button("Submit RSS"):
+    # Load RSS questions from the shared registry
+    registry = profile.import_module("registry")
+    try:
+        instrument = registry.get_instrument("rss")
+    except FileNotFoundError:
+        st.error("RSS questions file not found. Please ensure 'rss_questions.csv' is in the app directory.")
+        return
+    responses = questionnaire.render_questionnaire(instrument, page_size=ITEMS_PER_PAGE, on_change=save_checkpoint)
+
+    if responses is not None and st.button("Submit RSS"):
         st.session_state.rss_responses = responses
         st.session_state.rss_asq_complete = True
         st.success("RSS Completed. Proceeding to next phase...")
@@ -249,56 +244,20 @@ def run_rss():
 # Function: Aversive Stimuli Questionnaire (ASQ)
 def run_asq():
     st.header("Aversive Stimuli Questionnaire (ASQ)")
-    st.markdown("""
-    <div class='likert-legend'>
-        <b>Likert Scale</b>: 
-        <span style='color:#b30000;'>1</span>, 
-        <span style='color:#e34a33;'>2</span>, 
-        <span style='color:#fc8d59;'>3</span>, 
-        <span style='color:#fdbb84;'>4</span>, 
-        <span style='color:#a1d99b;'>5</span>, 
-        <span style='color:#74c476;'>6</span>, 
-        <span style='color:#31a354;'>7</span> <br>
-        <hr style='height:5px;border:none;background:linear-gradient(to right, yellow, orange); border-radius:5px;'>
-        <i>1 = Strongly Disagree &nbsp;&nbsp;&nbsp; 2 = Disagree &nbsp;&nbsp;&nbsp; 3 = Somewhat Disagree &nbsp;&nbsp;&nbsp; <br> 4 = Neutral <br> 5 = Somewhat Agree &nbsp;&nbsp;&nbsp; 6 = Agree &nbsp;&nbsp;&nbsp; 7 = Strongly Agree</i>
-    </div>
-    """, unsafe_allow_html=True)
+    questionnaire.render_legend()
     st.subheader("How unpleasant is ____________?")
 
-    # Load ASQ questions if not already loaded
-    if "asq_df" not in st.session_state:
-        try:
-            asq_df = pd.read_csv("asq_questions.csv")
-            st.session_state.asq_df = asq_df
-        except FileNotFoundError:
-            st.error("ASQ questions file not found. Please ensure 'asq_questions.csv' is in the app directory.")
-            return
-
-    responses = {}
-    for _, row in st.session_state.asq_df.iterrows():
-        st.markdown("<hr style='height:3px;border:none;background:linear-gradient(to right, red, orange, yellow, green); border-radius:5px;'>", unsafe_allow_html=True)
-        question = row["question"]
-        qid = f"ASQ_{row['id']}"
-
-        value = st.slider(
-            f"{qid}. {question}",
-            min_value=1,
-            max_value=7,
-            value=4,
-            key=qid,
-            label_visibility="visible"
-        )
-        responses[qid] = value
-
-        color = get_color(value)
-        label = likert_labels.get(value, "Invalid value")
-        st.markdown(
-            f"<div style='padding:6px; border-radius:5px; background-color:{color}; color:black; margin-bottom:5px;'>"
-            f"<b>Your response:</b> {label}</div>",
-            unsafe_allow_html=True
-        )
+    # Load ASQ questions from the shared registry
+    registry = profile.import_module("registry")
+    try:
+        instrument = registry.get_instrument("asq")
+    except FileNotFoundError:
+        st.error("ASQ questions file not found. Please ensure 'asq_questions.csv' is in the app directory.")
+        return
 
-    if st.button("Submit ASQ"):
+    responses = questionnaire.render_questionnaire(instrument, page_size=ITEMS_PER_PAGE, on_change=save_checkpoint)
+
+    if responses is not None and st.button("Submit ASQ"):
         st.session_state.asq_responses = responses
         st.session_state.rss_asq_complete = True
         st.success("ASQ Completed. Proceeding to next phase...")
@@ -306,140 +265,102 @@ def run_asq():
 
 #Function: Final Summary Report & Behavior Modifier Data Pass Through
 def render_summary_table(summary_df):
+    tables = profile.import_module("tables")
     st.markdown("### Summary Table")
-    html = "<table style='width:100%; border-collapse: collapse; font-family: sans-serif;'>"
-    # Header
-    html += "<thead><tr>" + "".join(
-        [f"<th style='padding:8px;border:1px solid #ddd;background:#333333;color:#ffffff;text-align:left;'>{col}</th>"
-         for col in summary_df.columns]) + "</tr></thead><tbody>"    
-    # Body
-    for _, row in summary_df.iterrows():
-        html += "<tr>" + "".join([
-            f"<td style='padding:8px;border:1px solid #ddd;"
-            f"{'font-weight:bold;color:#0072B2;' if str(cell) in ['Reward','Punishment'] else ''}'>"
-            f"{cell}</td>"
-            for cell in row
-        ]) + "</tr>"
-    html += "</tbody></table>"
-    st.markdown(html, unsafe_allow_html=True)
+    # Escaped, built in one pass and paginated, so the same table serves cohort-sized frames
+    tables.render_table(summary_df, key="summary_table")
 
+@metrics.timed(PAGE)
 def plot_bliss_or_distress_point():
-    fig, ax = plt.subplots(figsize=(7, 5))
-    
-    top_question = "Question text not found"
-    
+    registry = profile.import_module("registry")
+    figures = profile.import_module("figures")
     if st.session_state.get("rss_responses"):
+        kind = "rss"
         responses = st.session_state.rss_responses
-        top_item = max(responses.items(), key=lambda x: x[1])
-        top_label = top_item[0]
-        top_id = int(top_label.split('_')[1])
-
-        if "rss_df" in st.session_state:
-            top_question = st.session_state.rss_df.loc[
-                st.session_state.rss_df["id"] == top_id, "question"
-            ].values[0]
-
-        x = [1, 2, 3, 4, 5]
-        y = [i * 1.5 for i in x]
-        ax.plot(x, y, label="Effort vs. Perceived Reward Utility", color="green")
-        ax.scatter(2.5, 7.5, color="blue", label="Bliss Point", s=100, zorder=5)
-        #ax.text(2.5, 7.8, "Bliss Point", ha='center', fontsize=8)
-        ax.set_title(f"Top Reward: {top_question}", fontsize=10)
-        ax.set_ylabel("Perceived Reward Utility (PRU)")
-        ax.set_xlabel("Required Behavioral Effort (RBE)")
-        ax.legend()        
-        plt.tight_layout()
-        plt.figtext(0.5, 0.01,
-            "RDH: When access to a normally high-frequency behavior is restricted below baseline, it becomes a reinforcer.",
-            wrap=True, horizontalalignment='center', fontsize=9, style='italic')
-        st.pyplot(fig)
-
     elif st.session_state.get("asq_responses"):
+        kind = "asq"
         responses = st.session_state.asq_responses
-        top_item = max(responses.items(), key=lambda x: x[1])
-        top_label = top_item[0]
-        top_id = int(top_label.split('_')[1])
-
-        if "asq_df" in st.session_state:
-            top_question = st.session_state.asq_df.loc[
-                st.session_state.asq_df["id"] == top_id, "question"
-            ].values[0]
-
-        x = [1, 2, 3, 4, 5]
-        y = [i * 1.5 for i in x]
-        ax.plot(x, y, label="Arousal vs. Perceived Punisher Aversiveness", color="red")
-        ax.scatter(2.5, 7.5, color="black", label="Distress Point", s=100, zorder=5)
-        #ax.text(3.5, 5.1, "Distress Point", ha='center', fontsize=8)
-        ax.set_title(f"Top Punisher: {top_question}", fontsize=10)
-        ax.set_ylabel("Perceived Punisher Aversiveness (PPA)")
-        ax.set_xlabel("Arousal (Arousal)")
-        ax.legend()
-        plt.tight_layout()
-        plt.figtext(0.5, 0.01,
-            "PAH: When exposure to a low-frequency behavior is imposed above baseline, it becomes a punisher.",
-            wrap=True, horizontalalignment='center', fontsize=9, style='italic')
-        st.pyplot(fig)
+    else:
+        return
 
+    top_item = max(responses.items(), key=lambda x: x[1])
+    top_label = top_item[0]
+    top_id = int(top_label.split('_')[1])
+    top_question = registry.get_instrument(kind).question(top_id)
 
+    if CHART_BACKEND == "native":
+        figures.bliss_native(kind, top_question)
+    else:
+        st.image(figures.bliss_png(kind, top_question))
+
+
+@metrics.timed(PAGE)
 def show_summary():
+    pd = profile.import_module("pandas")
+    registry = profile.import_module("registry")
+    scoring = profile.import_module("scoring")
+    figures = profile.import_module("figures")
     st.header("Summary of Behavioral Assessment")
 
     # --- Part 1: Summary Table ---
     st.subheader("1. SPSRQ Scores Summary")
-    reward = st.session_state.spsrq_reward
-    punishment = st.session_state.spsrq_punishment
-    dominant = "Reward" if reward > punishment else "Punishment"
-    
-    # Assuming SPSRQ has 24 reward and 24 punishment questions
-    reward_total = st.session_state.spsrq_reward
-    punishment_total = st.session_state.spsrq_punishment
-    reward_mean = round(reward_total / 24, 2)
-    punishment_mean = round(punishment_total / 24, 2)
-    reward_sd = round(st.session_state.spsrq_df[st.session_state.spsrq_df['type'] == 'reward']['id'].apply(lambda x: st.session_state.spsrq_responses.get(f"Q{x}", 0)).std(), 2)
-    punishment_sd = round(st.session_state.spsrq_df[st.session_state.spsrq_df['type'] == 'punishment']['id'].apply(lambda x: st.session_state.spsrq_responses.get(f"Q{x}", 0)).std(), 2)
+    scores = st.session_state.spsrq_scores
     
     summary_data = {
-        "Total Sensitivity to Reward": [reward_total],
-        "Mean Reward Score": [reward_mean],
-        "Reward Score SD": [reward_sd],
-        "Total Sensitivity to Punishment": [punishment_total],
-        "Mean Punishment Score": [punishment_mean],
-        "Punishment Score SD": [punishment_sd],
-        "Dominant Sensitivity": [dominant]
+        "Total Sensitivity to Reward": [int(scores["reward_total"])],
+        "Mean Reward Score": [scores["reward_mean"]],
+        "Reward Score SD": [scores["reward_sd"]],
+        "Total Sensitivity to Punishment": [int(scores["punishment_total"])],
+        "Mean Punishment Score": [scores["punishment_mean"]],
+        "Punishment Score SD": [scores["punishment_sd"]],
+        "Dominant Sensitivity": [scores["dominant"]]
     }
     summary_df = pd.DataFrame(summary_data)
     render_summary_table(summary_df)
 
+    # Fold this participant into the cohort statistics once (on the background writer),
+    # then place them in the SR/SP norms
+    psychometrics = profile.import_module("psychometrics")
+    if not st.session_state.get("cohort_recorded"):
+        follow_up = st.session_state.sensitivity
+        psychometrics.record_async({
+            "spsrq": st.session_state.spsrq_responses,
+            follow_up: st.session_state[f"{follow_up}_responses"],
+        })
+        st.session_state.cohort_recorded = True
+    norms = psychometrics.get_stats()
+    if norms.norm_count("reward") >= psychometrics.MIN_NORM_N:
+        st.caption(
+            f"Percentile rank among {norms.norm_count('reward')} participants: "
+            f"SR {norms.percentile_rank('reward', scores['reward_total']):.0f}, "
+            f"SP {norms.percentile_rank('punishment', scores['punishment_total']):.0f}."
+        )
+
     # --- Part 2: Lollipop Chart of Top 5 Stimuli ---
     st.subheader("2. Top 5 Stimuli by Strength of Response")
     
     # Choose data source
     if st.session_state.sensitivity == "rss":
-        data_df = st.session_state.rss_df
+        data_df = registry.get_instrument("rss").df
         responses = st.session_state.rss_responses
         stim_type = "Reinforcer"
     else:
-        data_df = st.session_state.asq_df
+        data_df = registry.get_instrument("asq").df
         responses = st.session_state.asq_responses
         stim_type = "Punisher"
 
-    # Merge responses with questions
-    df = data_df.copy()
-    df["qid"] = df["id"].apply(lambda x: f"{'RSS' if stim_type=='Reinforcer' else 'ASQ'}_{x}")
-    df["response"] = df["qid"].map(responses)
-    df = df.dropna(subset=["response"])
-    df = df.sort_values("response", ascending=False).head(5)
+    # Rank responses through the shared scoring engine
+    matrix = scoring.response_matrix(responses, data_df, st.session_state.sensitivity)
+    df = scoring.sticker_export(scoring.top_stimuli(matrix, data_df, st.session_state.sensitivity))
 
     # Save to session for export
-    st.session_state.sticker_data = df[["qid", "question", "response"]]
-
-    # Plot lollipop chart
-    fig, ax = plt.subplots(figsize=(8, 5))
-    ax.hlines(y=df["question"], xmin=0, xmax=df["response"], color="skyblue")
-    ax.plot(df["response"], df["question"], "o")
-    ax.set_xlabel("Likert Score (1-7)")
-    ax.set_title(f"Top 5 {stim_type}s by Subjective Intensity")
-    st.pyplot(fig)
+    st.session_state.sticker_data = df
+
+    # Plot lollipop chart (rendered once per distinct top-5 and cached)
+    if CHART_BACKEND == "native":
+        figures.lollipop_native(df["question"], df["response"], stim_type)
+    else:
+        st.image(figures.lollipop_png(df["question"], df["response"], stim_type))
     
     # Plot Bliss Point / Distress Point
     plot_bliss_or_distress_point()
@@ -447,7 +368,7 @@ def show_summary():
     # --- Part 3: Export to CSV ---
     st.subheader("3. Export for Digital Sticker Chart")
 
-    filename = f"{st.session_state.participant_name.replace(' ', '_')}_sticker_data.csv"
+    filename = scoring.sticker_filename(st.session_state.participant_name)
     csv = st.session_state.sticker_data.to_csv(index=False)
     st.download_button(
         label="📥 Download CSV",
@@ -469,3 +390,11 @@ elif not st.session_state.rss_asq_complete:
 else:
     show_summary()
 
+profile.mark("page render")
+
+# Checkpoint whatever this run changed and show the participant their resume code
+save_checkpoint()
+if st.session_state.checkpoint is not None:
+    st.sidebar.caption(f"Resume code: **{st.session_state.checkpoint.token}**")
+profile.mark("checkpoint")
+startup_profile.show(profile)
@@ -0,0 +1,173 @@
+# Load generator for the JSON ingestion API (ingest_api.py).
+#
+#   python benchmarks/ingest_load.py                    # starts a loopback server on a scratch database
+#   python benchmarks/ingest_load.py --url http://127.0.0.1:8765 --connections 16 --batch 200
+#
+# Each connection is a keep-alive client posting sticker batches (and
+# optionally questionnaire submissions) as fast as the server answers. The
+# report gives accepted events per second, request latency percentiles and
+# shed (503) requests, then waits for the server's queues to drain so the
+# committed rate is reported as well.
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+
+async def _request(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def _client(url, requests, make_payload, path, latencies, statuses):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    try:
+        for i in range(requests):
+            t0 = time.perf_counter()
+            status, _ = await _request(reader, writer, parts.netloc, "POST", path, make_payload(i))
+            latencies.append((time.perf_counter() - t0) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def _health(url):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    try:
+        return (await _request(reader, writer, parts.netloc, "GET", "/v1/health"))[1]
+    finally:
+        writer.close()
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def run_load(url, participant, behaviors, connections, requests, batch, assessments):
+    rng = np.random.default_rng(0)
+    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+    def sticker_payload(i):
+        picks = rng.integers(0, len(behaviors), batch), rng.integers(0, 7, batch), rng.integers(0, 2, batch)
+        return {
+            "participant": participant, "week": 1 + i % 52,
+            "events": [{"behavior": behaviors[b], "day": days[d], "value": int(v)} for b, d, v in zip(*picks)],
+        }
+
+    def assessment_payload(i):
+        responses = {f"Q{k}": int(v) for k, v in zip(range(1, 49), rng.integers(1, 8, 48))}
+        responses.update({f"RSS_{k}": int(v) for k, v in zip(range(1, 22), rng.integers(1, 8, 21))})
+        responses.update({f"ASQ_{k}": int(v) for k, v in zip(range(1, 22), rng.integers(1, 8, 21))})
+        return {"participant": f"Load Participant {i}", "responses": responses}
+
+    before = await _health(url)
+    latencies, statuses = [], {}
+    t0 = time.perf_counter()
+    clients = [_client(url, requests, sticker_payload, "/v1/stickers", latencies, statuses) for _ in range(connections)]
+    if assessments:
+        clients.append(_client(url, assessments, assessment_payload, "/v1/assessments", [], statuses))
+    await asyncio.gather(*clients)
+    sent_s = time.perf_counter() - t0
+    while True:
+        health = await _health(url)
+        if not (health["sticker_queue"] or health["pending_events"] or health["assessment_queue"]):
+            break
+        await asyncio.sleep(0.05)
+    drained_s = time.perf_counter() - t0
+
+    accepted = health["events"] - before["events"]
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "statuses": statuses,
+        "events_accepted": accepted,
+        "accepted_per_s": accepted / sent_s,
+        "committed_per_s": accepted / drained_s,
+        "submissions_accepted": health["submissions"] - before["submissions"],
+        "latency_ms": {
+            "median": statistics.median(ordered),
+            "p95": _percentile(ordered, 0.95),
+            "p99": _percentile(ordered, 0.99),
+        },
+    }
+
+
+def _start_server(scratch):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "ingest_api.py"), "--port", "0",
+         "--db", os.path.join(scratch, "load.sqlite3"), "--out", os.path.join(scratch, "exports")],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True,
+    )
+    line = process.stdout.readline()
+    if "listening on" not in line:
+        process.kill()
+        raise RuntimeError(f"ingest_api.py did not start: {line!r}")
+    return process, line.split()[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the ingestion API over loopback.")
+    parser.add_argument("--url", help="Running server to test (default: start one on a scratch database)")
+    parser.add_argument("--participant", default="Ronda_Montelli")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="Sticker requests per connection")
+    parser.add_argument("--batch", type=int, default=100, help="Events per sticker request")
+    parser.add_argument("--assessments", type=int, default=0, help="Questionnaire submissions sent on one extra connection")
+    args = parser.parse_args(argv)
+
+    import registry
+    config = registry.get_sticker_config(
+        os.path.join(ROOT, f"{args.participant}_sticker_data.csv"), os.path.join(ROOT, "target_behaviors.csv"),
+    )
+    scratch, process = None, None
+    url = args.url
+    if url is None:
+        scratch = tempfile.mkdtemp(prefix="operant-ingest-")
+        process, url = _start_server(scratch)
+    try:
+        result = asyncio.run(run_load(
+            url, args.participant, list(config.modified_behaviors),
+            args.connections, args.requests, args.batch, args.assessments,
+        ))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"{result['requests']} requests {result['statuses']}, {result['events_accepted']} events accepted")
+    print(f"  accepted  {result['accepted_per_s']:,.0f} events/s")
+    print(f"  committed {result['committed_per_s']:,.0f} events/s")
+    latency = result["latency_ms"]
+    print(f"  latency   median {latency['median']:.2f} ms, p95 {latency['p95']:.2f} ms, p99 {latency['p99']:.2f} ms")
+    if args.assessments:
+        print(f"  {result['submissions_accepted']} questionnaire submissions accepted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# Benchmark suite: page rerun latency, scoring throughput and weekly-log I/O.
+#
+#   python benchmarks/run_benchmarks.py                 # full run, JSON in benchmarks/results/
+#   python benchmarks/run_benchmarks.py --quick         # smaller sizes for a fast check
+#   python benchmarks/run_benchmarks.py --compare old.json new.json
+#
+# Page benchmarks drive the real Streamlit scripts headlessly with AppTest in a
+# scratch directory filled with synthetic instruments/behaviors of growing size.
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+import synthetic  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+FULL = {"items": [12, 48, 96, 192], "behaviors": [4, 11, 25, 50], "respondents": [1000, 10000, 100000],
+        "weeks": [10, 100, 1000], "repeats": 10}
+QUICK = {"items": [12, 48], "behaviors": [4, 11], "respondents": [1000, 10000],
+         "weeks": [10, 100], "repeats": 3}
+
+
+def _stats(times_ms):
+    ordered = sorted(times_ms)
+    return {
+        "runs": len(ordered),
+        "min_ms": ordered[0],
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "mean_ms": statistics.fmean(ordered),
+    }
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - t0) * 1000, result
+
+
+# --- Page reruns ---
+
+def _app_dir(n_items, n_behaviors):
+    import registry
+    app_dir = tempfile.mkdtemp(prefix="operant-bench-")
+    for kind, filename in registry.INSTRUMENT_FILES.items():
+        synthetic.instrument_df(kind, n_items).to_csv(os.path.join(app_dir, filename), index=False)
+    synthetic.target_behaviors_df(n_behaviors).to_csv(os.path.join(app_dir, "target_behaviors.csv"), index=False)
+    synthetic.sticker_export_df().to_csv(os.path.join(app_dir, "Ronda_Montelli_sticker_data.csv"), index=False)
+    for name in ("behavior_assessment.py", "sticker_chart.py", "title.png"):
+        shutil.copy(os.path.join(ROOT, name), app_dir)
+    return app_dir
+
+
+def _time_page(script, state, repeats, interact=None):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(script, default_timeout=300)
+    for key, value in state.items():
+        at.session_state[key] = value
+    cold_ms, _ = _timed(at.run)
+    if at.exception:
+        raise RuntimeError(f"{script} raised: {at.exception}")
+    times = []
+    for i in range(repeats):
+        if interact:
+            interact(at, i)
+        elapsed, _ = _timed(at.run)
+        times.append(elapsed)
+    return {"cold_ms": cold_ms, **_stats(times)}
+
+
+def bench_pages(sizes, repeats):
+    import scoring
+    results = []
+    cwd = os.getcwd()
+    for n_items, n_behaviors in zip(sizes["items"], sizes["behaviors"]):
+        app_dir = _app_dir(n_items, n_behaviors)
+        os.chdir(app_dir)
+        try:
+            assessment = os.path.join(app_dir, "behavior_assessment.py")
+            spsrq_df = synthetic.instrument_df("spsrq", n_items)
+            rss_df = synthetic.instrument_df("rss", n_items)
+            spsrq_responses = synthetic.responses(spsrq_df, "spsrq")
+            scores = scoring.score_spsrq(scoring.response_matrix(spsrq_responses, spsrq_df, "spsrq"), spsrq_df).iloc[0]
+
+            def move_slider(at, i):
+                at.slider[i % len(at.slider)].set_value(1 + i % 7)
+
+            def toggle_checkbox(at, i):
+                box = at.checkbox[i % len(at.checkbox)]
+                box.set_value(not box.value)
+
+            pages = {
+                "run_spsrq": (assessment, {"consent_given": True}, move_slider),
+                "run_rss": (assessment, {"consent_given": True, "spsrq_complete": True, "sensitivity": "rss"}, move_slider),
+                "show_summary": (assessment, {
+                    "consent_given": True, "spsrq_complete": True, "rss_asq_complete": True,
+                    "sensitivity": "rss", "participant_name": "Bench Participant",
+                    "spsrq_responses": spsrq_responses, "spsrq_scores": scores,
+                    "spsrq_reward": int(scores["reward_total"]), "spsrq_punishment": int(scores["punishment_total"]),
+                    "rss_responses": synthetic.responses(rss_df, "rss"),
+                }, None),
+                "sticker_form": (os.path.join(app_dir, "sticker_chart.py"), {}, toggle_checkbox),
+            }
+            for page, (script, state, interact) in pages.items():
+                params = {"items": n_items} if page != "sticker_form" else {"behaviors": n_behaviors}
+                results.append({"bench": f"page.{page}", "params": params, **_time_page(script, state, repeats, interact)})
+                print(f"  page.{page} {params}: median {results[-1]['median_ms']:.1f} ms")
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(app_dir, ignore_errors=True)
+    return results
+
+
+# --- Scoring throughput ---
+
+def bench_scoring(sizes, repeats):
+    import scoring
+    spsrq_df = synthetic.instrument_df("spsrq", 48)
+    rss_df = synthetic.instrument_df("rss", 21)
+    results = []
+    for n in sizes["respondents"]:
+        spsrq = synthetic.response_matrix(n, len(spsrq_df), seed=1)
+        rss = synthetic.response_matrix(n, len(rss_df), seed=2)
+        times = [_timed(lambda: (scoring.score_spsrq(spsrq, spsrq_df), scoring.top_stimuli(rss, rss_df, "rss")))[0]
+                 for _ in range(repeats)]
+        stats = _stats(times)
+        stats["ms_per_1k_respondents"] = stats["median_ms"] * 1000 / n
+        results.append({"bench": "scoring.spsrq_plus_top5", "params": {"respondents": n}, **stats})
+        print(f"  scoring {n} respondents: {stats['ms_per_1k_respondents']:.2f} ms per 1k")
+    return results
+
+
+# --- Weekly log I/O ---
+
+def bench_log_io(sizes, repeats):
+    import log_store
+    import sticker_matrix
+    behaviors = synthetic.target_behaviors_df(11)["modified_behavior"].tolist()
+    results = []
+    for n_weeks in sizes["weeks"]:
+        frames = [synthetic.week_frame(behaviors, seed=w) for w in range(n_weeks)]
+        write_times, read_times = [], []
+        for _ in range(max(1, repeats // 3)):
+            db_dir = tempfile.mkdtemp(prefix="operant-bench-db-")
+            store = log_store.LogStore(os.path.join(db_dir, "bench.sqlite3"))
+            elapsed, _ = _timed(lambda: [store.append_week("bench", f, "Phase I", "Fixed Ratio", 15) for f in frames])
+            write_times.append(elapsed)
+            for _ in range(repeats):
+                elapsed, _ = _timed(lambda: (
+                    sticker_matrix.StickerHistory.from_long(store.query("bench"), behaviors, store.weeks("bench")),
+                    store.week_frame("bench", n_weeks),
+                ))
+                read_times.append(elapsed)
+            store.close()
+            shutil.rmtree(db_dir, ignore_errors=True)
+        results.append({"bench": "log.write_weeks", "params": {"weeks": n_weeks}, **_stats(write_times)})
+        results.append({"bench": "log.read_history", "params": {"weeks": n_weeks}, **_stats(read_times)})
+        print(f"  log {n_weeks} weeks: write {results[-2]['median_ms']:.1f} ms, read {results[-1]['median_ms']:.1f} ms")
+    return results
+
+
+# --- Reporting ---
+
+def _meta():
+    try:
+        commit = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    import pandas
+    import streamlit
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "streamlit": streamlit.__version__,
+    }
+
+
+def _key(result):
+    return result["bench"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = {_key(r): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    print(f"{'benchmark':<45} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for result in new:
+        before = old.get(_key(result))
+        if before is None:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("nan")
+        label = f"{result['bench']} {json.dumps(result['params'])}"
+        print(f"{label:<45} {before['median_ms']:10.2f} {result['median_ms']:10.2f} {ratio:7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the operant benchmark suite.")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes and fewer repeats")
+    parser.add_argument("--only", choices=["pages", "scoring", "log"], action="append",
+                        help="Run only these groups (repeatable)")
+    parser.add_argument("--out", help="Result JSON path (default: benchmarks/results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = QUICK if args.quick else FULL
+    groups = args.only or ["pages", "scoring", "log"]
+    results = []
+    if "pages" in groups:
+        print("Page reruns")
+        results += bench_pages(sizes, sizes["repeats"])
+    if "scoring" in groups:
+        print("Scoring throughput")
+        results += bench_scoring(sizes, sizes["repeats"])
+    if "log" in groups:
+        print("Weekly log I/O")
+        results += bench_log_io(sizes, sizes["repeats"])
+
+    meta = _meta()
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{meta['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"meta": {**meta, "quick": args.quick}, "results": results}, f, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Synthetic data generators for the benchmark suite.
+# Everything is drawn from a seeded NumPy generator so runs are reproducible.
+import numpy as np
+import pandas as pd
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def instrument_df(kind, n_items):
+    """Questionnaire CSV contents with n_items items (SPSRQ alternates reward/punishment)."""
+    ids = np.arange(1, n_items + 1)
+    if kind == "spsrq":
+        types = np.where(ids % 2 == 1, "reward", "punishment")
+    elif kind == "rss":
+        types = np.full(n_items, "Reward")
+    else:
+        types = np.full(n_items, "punishment")
+    return pd.DataFrame({"id": ids, "question": [f"Synthetic {kind} item {i}" for i in ids], "type": types})
+
+
+def response_matrix(n_respondents, n_items, seed=0):
+    """Likert 1-7 responses, respondents x items."""
+    return np.random.default_rng(seed).integers(1, 8, size=(n_respondents, n_items)).astype(float)
+
+
+def responses(instrument, kind, seed=0):
+    """One respondent's {key: value} dict for an instrument DataFrame."""
+    import scoring
+    values = response_matrix(1, len(instrument), seed)[0].astype(int)
+    return dict(zip(scoring.item_keys(instrument, kind), values.tolist()))
+
+
+def target_behaviors_df(n_behaviors):
+    ids = np.arange(1, n_behaviors + 1)
+    return pd.DataFrame({
+        "id_rank": ids,
+        "target_behavior": [f"target behavior {i}" for i in ids],
+        "modified_behavior": [f"modified behavior {i}" for i in ids],
+    })
+
+
+def sticker_export_df(kind="rss", n=5):
+    prefix = "RSS_" if kind == "rss" else "ASQ_"
+    return pd.DataFrame({
+        "qid": [f"{prefix}{i}" for i in range(1, n + 1)],
+        "question": [f"Synthetic stimulus {i}" for i in range(1, n + 1)],
+        "response": np.arange(7, 7 - n, -1).clip(1),
+    })
+
+
+def week_frame(behaviors, seed=0, p=0.4):
+    """A behaviors x days 0/1 sticker grid."""
+    grid = (np.random.default_rng(seed).random((len(behaviors), len(DAYS))) < p).astype(int)
+    return pd.DataFrame(grid, index=list(behaviors), columns=DAYS)
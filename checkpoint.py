@@ -0,0 +1,173 @@
+# Session checkpoints so a browser refresh or server restart doesn't lose progress.
+# Each page keeps a handful of session-state fields per participant token in a
+# local SQLite file. Only fields whose value changed since the last write are
+# saved (one small JSON row per field), so checkpointing on every answer is
+# cheap, and restoring is a single indexed read with no instrument parsing.
+#
+#   python checkpoint.py --list
+#   python checkpoint.py --purge-days 30
+import argparse
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = "session_checkpoints.sqlite3"
+# Bump when the meaning of a stored field changes; rows of other versions are ignored on restore
+FORMAT_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    page TEXT NOT NULL,
+    token TEXT NOT NULL,
+    field TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (page, token, field)
+) WITHOUT ROWID;
+"""
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _default(obj):
+    # NumPy scalars and pandas Series (e.g. the SPSRQ scores) become plain JSON values
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Cannot checkpoint a {type(obj).__name__}")
+
+
+def encode(value):
+    return json.dumps(value, separators=(",", ":"), default=_default)
+
+
+class CheckpointStore:
+    """Per-field session checkpoints keyed by page and token."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def save(self, page, token, encoded_fields):
+        """Upsert already-encoded {field: json} values in one transaction."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO checkpoints VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (page, token, field) DO UPDATE SET "
+                    "version = excluded.version, value = excluded.value, updated_at = excluded.updated_at",
+                    [(page, token, field, FORMAT_VERSION, value, now) for field, value in encoded_fields.items()],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load(self, page, token):
+        """{field: json} for a checkpoint (empty if there is none)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT field, value FROM checkpoints WHERE page = ? AND token = ? AND version = ?",
+                (page, token, FORMAT_VERSION),
+            ).fetchall()
+        return dict(rows)
+
+    def delete(self, page, token):
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE page = ? AND token = ?", (page, token))
+
+    def purge(self, older_than_s):
+        """Drop checkpoints not updated for `older_than_s` seconds; returns the number of tokens removed."""
+        cutoff = time.time() - older_than_s
+        with self._lock:
+            stale = self._conn.execute(
+                "SELECT page, token FROM checkpoints GROUP BY page, token HAVING MAX(updated_at) < ?", (cutoff,)
+            ).fetchall()
+            self._conn.executemany("DELETE FROM checkpoints WHERE page = ? AND token = ?", stale)
+        return len(stale)
+
+    def summary(self):
+        """(page, token, fields, last update) for every checkpoint."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT page, token, COUNT(*), MAX(updated_at) FROM checkpoints "
+                "GROUP BY page, token ORDER BY MAX(updated_at) DESC"
+            ).fetchall()
+
+
+def get_store(path=DEFAULT_PATH):
+    """Return the process-wide CheckpointStore for a database path."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = CheckpointStore(key)
+        return _stores[key]
+
+
+def new_token():
+    """Short URL-safe resume code."""
+    return secrets.token_urlsafe(6)
+
+
+class Checkpoint:
+    """One session's checkpoint; remembers what it last wrote so sync() only saves changes."""
+
+    def __init__(self, page, token, path=DEFAULT_PATH):
+        self.page = page
+        self.token = token
+        self.path = path
+        self._saved = {}  # field -> encoded value last written or restored
+
+    def sync(self, fields):
+        """Save the entries of {field: value} that changed since the last sync."""
+        changed = {}
+        for field, value in fields.items():
+            encoded = encode(value)
+            if self._saved.get(field) != encoded:
+                changed[field] = encoded
+        if changed:
+            get_store(self.path).save(self.page, self.token, changed)
+            self._saved.update(changed)
+        return len(changed)
+
+    def restore(self):
+        """{field: value} of the stored checkpoint (empty if there is none)."""
+        stored = get_store(self.path).load(self.page, self.token)
+        self._saved.update(stored)
+        return {field: json.loads(value) for field, value in stored.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or prune session checkpoints.")
+    parser.add_argument("--db", default=DEFAULT_PATH, help=f"SQLite database path (default: {DEFAULT_PATH})")
+    parser.add_argument("--list", action="store_true", help="List checkpoints, most recent first")
+    parser.add_argument("--purge-days", type=float, help="Delete checkpoints untouched for this many days")
+    args = parser.parse_args(argv)
+
+    store = CheckpointStore(args.db)
+    if args.purge_days is not None:
+        print(f"Removed {store.purge(args.purge_days * 86400)} checkpoint(s)")
+    if args.list:
+        for page, token, fields, updated_at in store.summary():
+            print(f"{page:<20} {token:<12} {fields:3d} fields  {time.strftime('%Y-%m-%d %H:%M', time.localtime(updated_at))}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# Longitudinal effect analytics: did a phase or schedule move behavior?
+# For every participant (weekly sticker totals) and every participant-behavior
+# (weekly stickers of one behavior), weeks under a treatment condition (e.g.
+# Phase II, or Fixed Ratio) are compared with weeks under a control condition
+# (Phase I, Continuous): Hedges' g with a percentile bootstrap confidence
+# interval, plus the goal attainment rate in each condition and its difference.
+# The bootstrap is vectorized across the whole cohort: units are padded into one
+# units x weeks matrix and resampled in blocks of units x resamples x weeks.
+# Input comes from the rollup tables, and results are cached per query (the
+# MAX_CACHED most recently used) until new weeks are aggregated (saved weeks
+# never change).
+#
+#   python effects.py --dimension phase --treatment "Phase II" --control "Phase I"
+#   python effects.py --dimension schedule --treatment "Fixed Ratio" --control Continuous --by-behavior
+import argparse
+import os
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import log_store
+import rollups
+
+N_BOOT = 2000
+CONFIDENCE = 0.95
+SEED = 0
+# Upper bound on resampled values held at once (units x resamples x weeks)
+MAX_BOOT_ELEMENTS = 4_000_000
+BASELINES = {"phase": "Phase I", "schedule": "Continuous"}
+MAX_CACHED = 256  # queries kept (one per participant and comparison on a cohort server)
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # (abspath, query) -> (rollup version, DataFrame), least recently used first
+
+
+def _padded(values, unit_codes, n_units):
+    """Scatter long values into a units x max-count matrix (NaN padded) plus each unit's count."""
+    counts = np.bincount(unit_codes, minlength=n_units)
+    matrix = np.full((n_units, max(int(counts.max()) if n_units else 0, 1)), np.nan)
+    order = np.argsort(unit_codes, kind="stable")
+    codes = unit_codes[order]
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    matrix[codes, np.arange(len(codes)) - starts[codes]] = values[order]
+    return matrix, counts
+
+
+def _moments(matrix, counts):
+    """Mean and sample variance of each row's first `counts` values (trailing axis)."""
+    present = np.arange(matrix.shape[-1]) < counts[..., None]
+    total = np.where(present, matrix, 0.0).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / counts
+        squares = np.where(present, (matrix - mean[..., None]) ** 2, 0.0).sum(axis=-1)
+        return mean, squares / (counts - 1)
+
+
+def _take(matrix, rows, draws):
+    """Resampled values: matrix[rows] gathered along the weeks axis by `draws` (rows x resamples x weeks)."""
+    return np.take_along_axis(matrix[rows][:, None, :], draws, axis=2)
+
+
+def _hedges_g(mean_t, var_t, n_t, mean_c, var_c, n_c):
+    """Standardized mean difference (treatment - control) with the small-sample correction."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pooled = np.sqrt(((n_t - 1) * var_t + (n_c - 1) * var_c) / (n_t + n_c - 2))
+        d = (mean_t - mean_c) / pooled
+        # No spread in either condition: identical means are no effect, different ones are undefined
+        d = np.where(pooled == 0, np.where(mean_t == mean_c, 0.0, np.nan), d)
+        return d * (1 - 3 / (4 * (n_t + n_c) - 9))
+
+
+def bootstrap(treatment, n_t, control, n_c, extra=(), n_boot=N_BOOT, confidence=CONFIDENCE, seed=SEED):
+    """Percentile bootstrap intervals of Hedges' g for every unit (row) at once.
+
+    `treatment` and `control` are units x weeks matrices holding each unit's
+    first n_t / n_c values. `extra` pairs of (treatment, control) matrices with
+    the same shapes (e.g. goal met indicators) get an interval for their mean
+    difference from the same resampled weeks. Returns (g_low, g_high,
+    [(diff_low, diff_high) per extra pair]); units with fewer than two weeks in
+    either condition get NaN.
+    """
+    rng = np.random.default_rng(seed)
+    n_units = treatment.shape[0]
+    tails = [(1 - confidence) / 2, (1 + confidence) / 2]
+    g_interval = np.full((2, n_units), np.nan)
+    extra_intervals = [np.full((2, n_units), np.nan) for _ in extra]
+    usable = np.flatnonzero((n_t >= 2) & (n_c >= 2))
+    width = treatment.shape[1] + control.shape[1]
+    block = max(1, MAX_BOOT_ELEMENTS // (n_boot * width))
+    for start in range(0, len(usable), block):
+        rows = usable[start:start + block]
+        # Draw week indices once per condition and apply them to every matrix, so extras pair with g
+        draws_t = (rng.random((len(rows), n_boot, treatment.shape[1])) * n_t[rows, None, None]).astype(np.intp)
+        draws_c = (rng.random((len(rows), n_boot, control.shape[1])) * n_c[rows, None, None]).astype(np.intp)
+        mean_t, var_t = _moments(_take(treatment, rows, draws_t), np.broadcast_to(n_t[rows, None], (len(rows), n_boot)))
+        mean_c, var_c = _moments(_take(control, rows, draws_c), np.broadcast_to(n_c[rows, None], (len(rows), n_boot)))
+        g = _hedges_g(mean_t, var_t, n_t[rows, None], mean_c, var_c, n_c[rows, None])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # units whose every resample is undefined stay NaN
+            g_interval[:, rows] = np.nanquantile(g, tails, axis=1)
+        for interval, (extra_t, extra_c) in zip(extra_intervals, extra):
+            counts_t = np.broadcast_to(n_t[rows, None], (len(rows), n_boot))
+            counts_c = np.broadcast_to(n_c[rows, None], (len(rows), n_boot))
+            diff = _moments(_take(extra_t, rows, draws_t), counts_t)[0] - _moments(_take(extra_c, rows, draws_c), counts_c)[0]
+            interval[:, rows] = np.quantile(diff, tails, axis=1)
+    return g_interval[0], g_interval[1], [(low, high) for low, high in extra_intervals]
+
+
+def compare(rows, unit_columns, dimension, treatment, control, value="stickers", met=None, **kwargs):
+    """Effect of treatment vs control weeks for every unit of a long frame.
+
+    `rows` has one row per unit-week with the `unit_columns`, the `dimension`
+    column (phase or schedule) and `value`; with `met` (a 0/1 column) the goal
+    attainment rates and their difference are reported as well.
+    """
+    rows = rows[rows[dimension].isin([treatment, control])]
+    units = rows[unit_columns].drop_duplicates().sort_values(unit_columns).reset_index(drop=True)
+    unit_codes = rows.groupby(unit_columns, sort=True).ngroup().to_numpy()
+    in_treatment = (rows[dimension] == treatment).to_numpy()
+
+    def split(column):
+        values = rows[column].to_numpy(dtype=float)
+        return (_padded(values[in_treatment], unit_codes[in_treatment], len(units)),
+                _padded(values[~in_treatment], unit_codes[~in_treatment], len(units)))
+
+    (treated, n_t), (controlled, n_c) = split(value)
+    mean_t, var_t = _moments(treated, n_t)
+    mean_c, var_c = _moments(controlled, n_c)
+    result = units.assign(
+        weeks_treatment=n_t, weeks_control=n_c,
+        mean_treatment=mean_t, mean_control=mean_c,
+        hedges_g=_hedges_g(mean_t, var_t, n_t, mean_c, var_c, n_c),
+    )
+    extra = []
+    if met is not None:
+        (met_t, _), (met_c, _) = split(met)
+        extra.append((met_t, met_c))
+    g_low, g_high, extra_intervals = bootstrap(treated, n_t, controlled, n_c, extra, **kwargs)
+    result["g_low"], result["g_high"] = g_low, g_high
+    if met is not None:
+        rate_t, rate_c = _moments(met_t, n_t)[0], _moments(met_c, n_c)[0]
+        result["attainment_treatment"], result["attainment_control"] = rate_t, rate_c
+        result["attainment_diff"] = rate_t - rate_c
+        result["diff_low"], result["diff_high"] = extra_intervals[0]
+    return result
+
+
+def effects(path=log_store.DEFAULT_PATH, dimension="phase", treatment="Phase II", control=None,
+            by_behavior=False, participant=None, **kwargs):
+    """Per-participant (or per participant-behavior) effects from the rollups, cached until new weeks land.
+
+    Reads the rollups as they are; callers refresh them first (the sticker chart
+    already does on every rerun).
+    """
+    control = control or BASELINES[dimension]
+    week_rollups = rollups.get_rollups(path)
+    key = (os.path.abspath(path), dimension, treatment, control, by_behavior, participant, tuple(sorted(kwargs.items())))
+    version = week_rollups.version()
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == version:
+            _cache.move_to_end(key)
+            return cached[1]
+    if by_behavior:
+        result = compare(week_rollups.behavior_rows(participant), ["participant", "behavior"],
+                         dimension, treatment, control, **kwargs)
+    else:
+        result = compare(week_rollups.week_rows(participant), ["participant"],
+                         dimension, treatment, control, met="met", **kwargs)
+    with _lock:
+        _cache[key] = (version, result)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return result
+
+
+def summarize(result):
+    """Cohort view of a per-unit effects table: units compared, median g and how many intervals exclude zero."""
+    estimated = result.dropna(subset=["g_low", "g_high"])
+    return {
+        "units": len(result),
+        "estimated": len(estimated),
+        "median_g": float(estimated["hedges_g"].median()) if len(estimated) else float("nan"),
+        "improved": int((estimated["g_low"] > 0).sum()),
+        "worsened": int((estimated["g_high"] < 0).sum()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Effect sizes with bootstrap CIs between phases or schedules.")
+    parser.add_argument("--dimension", choices=sorted(BASELINES), default="phase")
+    parser.add_argument("--treatment", default="Phase II")
+    parser.add_argument("--control", default=None, help="Control condition (default: Phase I / Continuous)")
+    parser.add_argument("--by-behavior", action="store_true", help="One row per participant and behavior")
+    parser.add_argument("--participant", default=None)
+    parser.add_argument("--n-boot", type=int, default=N_BOOT)
+    parser.add_argument("--db", default=log_store.DEFAULT_PATH, help=f"SQLite database path (default: {log_store.DEFAULT_PATH})")
+    args = parser.parse_args(argv)
+
+    rollups.get_rollups(args.db).refresh(args.participant)
+    result = effects(args.db, args.dimension, args.treatment, args.control, args.by_behavior, args.participant,
+                     n_boot=args.n_boot)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(result.round(3).to_string(index=False))
+    summary = summarize(result)
+    print(f"\n{summary['estimated']} of {summary['units']} units estimable; median g {summary['median_g']:.2f}; "
+          f"{summary['improved']} with the {CONFIDENCE:.0%} CI above zero, {summary['worsened']} below")
+
+
+if __name__ == "__main__":
+    main()
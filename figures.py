@@ -0,0 +1,196 @@
+# Figure rendering for the assessment summary.
+# Charts are drawn on standalone Agg figures (never registered with pyplot, so
+# nothing accumulates in a long-lived server), encoded to PNG once and kept in
+# a bounded process-wide cache keyed by a hash of the data they show.
+# export_png() writes them to a content-addressed directory (<hash>.png), so
+# static reports share one file per distinct chart and never redraw it.
+# A native Streamlit chart path is provided that skips matplotlib entirely.
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+MAX_CACHED = 256
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+# Curve and annotation text for the Bliss Point (RSS) and Distress Point (ASQ) plots
+BLISS_STYLES = {
+    "rss": {
+        "curve": "Effort vs. Perceived Reward Utility",
+        "curve_color": "green",
+        "point": "Bliss Point",
+        "point_color": "blue",
+        "title": "Top Reward",
+        "ylabel": "Perceived Reward Utility (PRU)",
+        "xlabel": "Required Behavioral Effort (RBE)",
+        "note": "RDH: When access to a normally high-frequency behavior is restricted below baseline, it becomes a reinforcer.",
+    },
+    "asq": {
+        "curve": "Arousal vs. Perceived Punisher Aversiveness",
+        "curve_color": "red",
+        "point": "Distress Point",
+        "point_color": "black",
+        "title": "Top Punisher",
+        "ylabel": "Perceived Punisher Aversiveness (PPA)",
+        "xlabel": "Arousal (Arousal)",
+        "note": "PAH: When exposure to a low-frequency behavior is imposed above baseline, it becomes a punisher.",
+    },
+}
+
+CURVE_X = [1, 2, 3, 4, 5]
+CURVE_Y = [i * 1.5 for i in CURVE_X]
+POINT = (2.5, 7.5)
+
+
+def figure_key(*parts):
+    """Stable content hash for the data a figure shows."""
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _new_figure(figsize):
+    # matplotlib is imported only when a PNG actually has to be drawn
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+
+def _render(fig):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    buf = io.BytesIO()
+    FigureCanvasAgg(fig)
+    fig.savefig(buf, format="png")
+    fig.clear()
+    return buf.getvalue()
+
+
+def _cached_png(key, draw):
+    with _lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+            return png
+    png = _render(draw())
+    with _lock:
+        _cache[key] = png
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return png
+
+
+def export_png(directory, key, draw):
+    """Write a figure to <directory>/<key>.png unless it is already there; returns the file name."""
+    name = f"{key}.png"
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        # Write-then-rename, so concurrent report workers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(_cached_png(key, draw))
+        os.replace(tmp, path)
+    return name
+
+
+def lollipop_figure(questions, responses, stim_type):
+    """(key, draw) of the top-5 lollipop chart."""
+    questions, responses = tuple(questions), tuple(int(r) for r in responses)
+
+    def draw():
+        fig = _new_figure((8, 5))
+        ax = fig.subplots()
+        ax.hlines(y=list(questions), xmin=0, xmax=list(responses), color="skyblue")
+        ax.plot(list(responses), list(questions), "o")
+        ax.set_xlabel("Likert Score (1-7)")
+        ax.set_title(f"Top 5 {stim_type}s by Subjective Intensity")
+        fig.tight_layout()
+        return fig
+
+    return figure_key("lollipop", questions, responses, stim_type), draw
+
+
+def lollipop_png(questions, responses, stim_type):
+    """PNG bytes of the top-5 lollipop chart."""
+    return _cached_png(*lollipop_figure(questions, responses, stim_type))
+
+
+def bliss_figure(kind, top_question):
+    """(key, draw) of the Bliss Point (kind='rss') or Distress Point (kind='asq') chart."""
+    style = BLISS_STYLES[kind]
+
+    def draw():
+        fig = _new_figure((7, 5))
+        ax = fig.subplots()
+        ax.plot(CURVE_X, CURVE_Y, label=style["curve"], color=style["curve_color"])
+        ax.scatter(*POINT, color=style["point_color"], label=style["point"], s=100, zorder=5)
+        ax.set_title(f"{style['title']}: {top_question}", fontsize=10)
+        ax.set_ylabel(style["ylabel"])
+        ax.set_xlabel(style["xlabel"])
+        ax.legend()
+        fig.tight_layout()
+        fig.text(0.5, 0.01, style["note"], wrap=True, horizontalalignment='center', fontsize=9, style='italic')
+        return fig
+
+    return figure_key("bliss", kind, top_question), draw
+
+
+def bliss_png(kind, top_question):
+    """PNG bytes of the Bliss Point (kind='rss') or Distress Point (kind='asq') chart."""
+    return _cached_png(*bliss_figure(kind, top_question))
+
+
+def stickers_by_week_figure(weeks, stickers, met):
+    """(key, draw) of a participant's stickers per saved week, marking the weeks whose goal was met."""
+    weeks, stickers, met = tuple(int(w) for w in weeks), tuple(int(s) for s in stickers), tuple(bool(m) for m in met)
+
+    def draw():
+        fig = _new_figure((7, 3.5))
+        ax = fig.subplots()
+        ax.plot(weeks, stickers, color="skyblue", zorder=1)
+        for hit, color, label in ((True, "green", "Goal met"), (False, "gray", "Goal not met")):
+            points = [(w, s) for w, s, m in zip(weeks, stickers, met) if m == hit]
+            if points:
+                ax.scatter(*zip(*points), color=color, label=label, zorder=2)
+        ax.set_xlabel("Week")
+        ax.set_ylabel("Stickers")
+        ax.set_title("Stickers Earned per Week")
+        ax.legend()
+        fig.tight_layout()
+        return fig
+
+    return figure_key("stickers_by_week", weeks, stickers, met), draw
+
+
+def lollipop_native(questions, responses, stim_type):
+    """Native Streamlit version of the lollipop chart (no matplotlib)."""
+    st.markdown(f"**Top 5 {stim_type}s by Subjective Intensity**")
+    data = pd.DataFrame({"question": list(questions), "Likert Score (1-7)": list(responses)})
+    st.bar_chart(data, x="question", y="Likert Score (1-7)", horizontal=True)
+
+
+def bliss_native(kind, top_question):
+    """Native Streamlit (Vega-Lite) version of the Bliss/Distress Point chart (no matplotlib)."""
+    style = BLISS_STYLES[kind]
+    curve = pd.DataFrame({"x": CURVE_X, "y": CURVE_Y, "series": style["curve"]})
+    point = pd.DataFrame({"x": [POINT[0]], "y": [POINT[1]], "series": style["point"]})
+    encoding = {
+        "x": {"field": "x", "type": "quantitative", "title": style["xlabel"]},
+        "y": {"field": "y", "type": "quantitative", "title": style["ylabel"]},
+        "color": {
+            "field": "series", "type": "nominal", "title": None,
+            "scale": {"domain": [style["curve"], style["point"]], "range": [style["curve_color"], style["point_color"]]},
+        },
+    }
+    st.vega_lite_chart(pd.concat([curve, point]), {
+        "title": f"{style['title']}: {top_question}",
+        "layer": [
+            {"mark": "line", "transform": [{"filter": f"datum.series == '{style['curve']}'"}], "encoding": encoding},
+            {"mark": {"type": "point", "filled": True, "size": 100},
+             "transform": [{"filter": f"datum.series == '{style['point']}'"}], "encoding": encoding},
+        ],
+    })
+    st.caption(f"*{style['note']}*")
@@ -0,0 +1,356 @@
+# Local JSON ingestion API for companion apps and kiosk devices.
+# A small asyncio HTTP/1.1 server (standard library only, keep-alive
+# connections) that runs next to the Streamlit apps. Batched sticker events are
+# validated against the participant's target behaviors and handed to the log
+# store's group-committed event stream (sticker_events.py). Questionnaire
+# submissions are validated against the instruments, appended to
+# submissions.jsonl, and scored in batches by the batch_assess engine, which
+# writes each participant's sticker chart export.
+# Both paths go through bounded queues. When a queue is full a request waits
+# up to ENQUEUE_TIMEOUT_S and then gets 503 with Retry-After, so a burst can
+# never grow memory without bound.
+#
+#   python ingest_api.py [--port 8765] [--cohort exports/]
+#   python benchmarks/ingest_load.py        # loopback load test
+#
+#   POST /v1/stickers     {"participant": "Ronda_Montelli", "week": 3,
+#                          "events": [{"behavior": "putting dirty clothes in hamper", "day": "Mon", "value": 1}, ...]}
+#   POST /v1/assessments  {"participant": "Jane Doe", "responses": {"Q1": 5, ..., "RSS_3": 7}}
+#                         or {"submissions": [{"participant": ..., "responses": {...}}, ...]}
+#   GET  /v1/health
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+
+import batch_assess
+import log_store
+import participants
+import psychometrics
+import registry
+import scoring
+import sticker_events
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_BODY = 1 << 20
+MAX_EVENTS_PER_REQUEST = 10_000
+MAX_SUBMISSIONS_PER_REQUEST = 1_000
+STICKER_QUEUE = 1_024      # requests waiting to be handed to the event stream
+ASSESSMENT_QUEUE = 256     # requests waiting to be scored
+MAX_PENDING_EVENTS = 50_000  # events the event stream may hold uncommitted before intake pauses
+ASSESSMENT_BATCH = 500     # submissions scored per batch
+ENQUEUE_TIMEOUT_S = 1.0
+LIKERT = (1, 7)
+SUBMISSIONS_FILE = "submissions.jsonl"
+
+DAY_INDEX = {day: i for i, day in enumerate(sticker_events.DAYS)}
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+logger = logging.getLogger(__name__)
+
+
+class BadRequest(ValueError):
+    """A request that fails validation (answered with 400)."""
+
+
+def _int(value, name, low, high=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value != int(value):
+        raise BadRequest(f"{name} must be an integer")
+    value = int(value)
+    if value < low or (high is not None and value > high):
+        raise BadRequest(f"{name} must be between {low} and {high}" if high is not None else f"{name} must be at least {low}")
+    return value
+
+
+class IngestServer:
+    """Validates submissions and feeds them through bounded queues to the stores."""
+
+    def __init__(self, log_path=log_store.DEFAULT_PATH, cohort_dir=None, sticker_path="Ronda_Montelli_sticker_data.csv",
+                 behavior_path="target_behaviors.csv", out_dir=None, base_dir="", norms_path=None):
+        self.events = sticker_events.get_event_log(log_path)
+        self.roster = participants.get_roster(cohort_dir, behavior_path) if cohort_dir else None
+        self.single = None if cohort_dir else participants.Participant.from_export(sticker_path, behavior_path)
+        # New exports land in the cohort directory, so scored participants can log stickers right away
+        self.out_dir = out_dir or cohort_dir or "exports"
+        self.base_dir = base_dir
+        self.norms_path = norms_path
+        self.item_keys = frozenset(key for kind in registry.INSTRUMENT_FILES for key in registry.get_instrument(kind, base_dir).keys)
+        self._behaviors = {}  # participant -> (StickerConfig, frozenset of behaviors)
+        self.counts = {"events": 0, "submissions": 0, "rejected": 0, "shed": 0}
+        self._server = None
+        self._tasks = []
+
+    # --- Lifecycle ---
+
+    async def start(self, host=HOST, port=PORT):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._sticker_queue = asyncio.Queue(STICKER_QUEUE)
+        self._assessment_queue = asyncio.Queue(ASSESSMENT_QUEUE)
+        self._tasks = [
+            asyncio.create_task(self._forward_stickers()),
+            asyncio.create_task(self._score_assessments()),
+        ]
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop accepting requests, finish everything queued and flush the event stream."""
+        self._server.close()
+        await self._server.wait_closed()
+        await self._sticker_queue.join()
+        await self._assessment_queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.get_running_loop().run_in_executor(None, self.events.flush)
+
+    # --- Validation ---
+
+    def _participant_behaviors(self, participant_id):
+        if self.roster is not None:
+            participant = self.roster.participants().get(participant_id)
+        else:
+            participant = self.single if participant_id == self.single.id else None
+        if participant is None:
+            raise BadRequest(f"unknown participant {participant_id!r}")
+        config = registry.get_sticker_config(participant.sticker_path, participant.behavior_path)
+        cached = self._behaviors.get(participant_id)
+        if cached is None or cached[0] is not config:
+            cached = self._behaviors[participant_id] = (config, frozenset(config.modified_behaviors))
+        return cached[1]
+
+    def sticker_rows(self, payload):
+        """Validated event-stream rows (ts, participant, week, behavior, day, value) of a sticker batch."""
+        if not isinstance(payload, dict):
+            raise BadRequest("body must be a JSON object")
+        participant_id = payload.get("participant")
+        if not isinstance(participant_id, str):
+            raise BadRequest("participant is required")
+        behaviors = self._participant_behaviors(participant_id)
+        week = _int(payload.get("week"), "week", 1)
+        events = payload.get("events")
+        if not isinstance(events, list) or not events:
+            raise BadRequest("events must be a non-empty list")
+        if len(events) > MAX_EVENTS_PER_REQUEST:
+            raise BadRequest(f"at most {MAX_EVENTS_PER_REQUEST} events per request")
+        now = time.time()
+        rows = []
+        for i, event in enumerate(events):
+            if not isinstance(event, dict):
+                raise BadRequest(f"events[{i}] must be an object")
+            behavior = event.get("behavior")
+            if not isinstance(behavior, str) or behavior not in behaviors:
+                raise BadRequest(f"events[{i}]: unknown behavior {behavior!r}")
+            day = event.get("day")
+            day = DAY_INDEX.get(day) if isinstance(day, str) else _int(day, f"events[{i}].day", 0, len(DAY_INDEX) - 1)
+            if day is None:
+                raise BadRequest(f"events[{i}]: day must be one of {', '.join(DAY_INDEX)} or 0-6")
+            value = _int(event.get("value"), f"events[{i}].value", 0, 1)
+            try:
+                ts = sticker_events._timestamp(event["ts"]) if "ts" in event else now
+            except (TypeError, ValueError):
+                raise BadRequest(f"events[{i}]: ts must be an ISO timestamp or epoch seconds") from None
+            rows.append((ts, participant_id, week, behavior, day, value))
+        return rows
+
+    def assessment_records(self, payload):
+        """Validated (participant, responses) records of one or more questionnaire submissions.
+
+        Participant names follow scoring.NAME_PATTERN, and every submission
+        must be complete by the rule of batch_assess.missing_items.
+        """
+        if not isinstance(payload, dict):
+            raise BadRequest("body must be a JSON object")
+        submissions = payload.get("submissions", [payload])
+        if not isinstance(submissions, list) or not submissions:
+            raise BadRequest("submissions must be a non-empty list")
+        if len(submissions) > MAX_SUBMISSIONS_PER_REQUEST:
+            raise BadRequest(f"at most {MAX_SUBMISSIONS_PER_REQUEST} submissions per request")
+        records = []
+        for i, submission in enumerate(submissions):
+            name = submission.get("participant") if isinstance(submission, dict) else None
+            if not scoring.valid_name(name):
+                raise BadRequest(f"submissions[{i}]: participant must be a plain name")
+            responses = submission.get("responses")
+            if not isinstance(responses, dict) or not responses:
+                raise BadRequest(f"submissions[{i}]: responses must be a non-empty object")
+            unknown = [key for key in responses if key not in self.item_keys]
+            if unknown:
+                raise BadRequest(f"submissions[{i}]: unknown item(s) {', '.join(map(str, unknown[:5]))}")
+            records.append((name.strip(), {
+                key: float(_int(value, f"submissions[{i}].{key}", *LIKERT)) for key, value in responses.items()
+            }))
+        for i, missing in enumerate(batch_assess.missing_items(records, self.base_dir)):
+            if missing is not None:
+                kind, keys = missing
+                raise BadRequest(f"submissions[{i}]: incomplete {kind.upper()}, missing {', '.join(keys)}")
+        return records
+
+    # --- Queues ---
+
+    async def _enqueue(self, queue, item):
+        try:
+            await asyncio.wait_for(queue.put(item), ENQUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            self.counts["shed"] += 1
+            return False
+        return True
+
+    async def _forward_stickers(self):
+        while True:
+            rows = await self._sticker_queue.get()
+            try:
+                self.events.record_many(rows)
+                # Let the group-commit writer catch up before taking more off the queue
+                while self.events.pending() > MAX_PENDING_EVENTS:
+                    await asyncio.sleep(self.events.flush_interval)
+            finally:
+                self._sticker_queue.task_done()
+
+    async def _score_assessments(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batches = [await self._assessment_queue.get()]
+            while sum(map(len, batches)) < ASSESSMENT_BATCH and not self._assessment_queue.empty():
+                batches.append(self._assessment_queue.get_nowait())
+            try:
+                await loop.run_in_executor(None, self._write_assessments, [r for batch in batches for r in batch])
+            except Exception:
+                logger.exception("Scoring %d submission(s) failed; they are kept in %s", sum(map(len, batches)), SUBMISSIONS_FILE)
+            finally:
+                for _ in batches:
+                    self._assessment_queue.task_done()
+
+    def _write_assessments(self, records):
+        # The raw submissions go first, in batch_assess's JSONL input format, so nothing is lost if scoring fails
+        with open(os.path.join(self.out_dir, SUBMISSIONS_FILE), "a") as f:
+            f.writelines(json.dumps({"participant": name, "responses": responses}) + "\n" for name, responses in records)
+        with_stats = self.norms_path is not None
+        result = batch_assess.score_chunk(records, self.out_dir, self.base_dir, with_stats=with_stats)
+        summary, stats = result if with_stats else (result, None)
+        summary_path = os.path.join(self.out_dir, batch_assess.SUMMARY_FILE)
+        summary.to_csv(summary_path, mode="a", header=not os.path.exists(summary_path), index=False)
+        if stats is not None:
+            psychometrics.merge_into(self.norms_path, stats)
+
+    # --- HTTP ---
+
+    async def _route(self, method, path, body):
+        if path == "/v1/health":
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            return 200, {
+                "status": "ok",
+                "sticker_queue": self._sticker_queue.qsize(),
+                "pending_events": self.events.pending(),
+                "assessment_queue": self._assessment_queue.qsize(),
+                **self.counts,
+            }
+        if path not in ("/v1/stickers", "/v1/assessments"):
+            return 404, {"error": f"no route {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            payload = json.loads(body)
+            if path == "/v1/stickers":
+                items, queue = self.sticker_rows(payload), self._sticker_queue
+            else:
+                items, queue = self.assessment_records(payload), self._assessment_queue
+        except (BadRequest, ValueError) as exc:
+            self.counts["rejected"] += 1
+            return 400, {"error": str(exc)}
+        if not await self._enqueue(queue, items):
+            return 503, {"error": "ingest queue is full, retry later"}
+        self.counts["events" if queue is self._sticker_queue else "submissions"] += len(items)
+        return 202, {"accepted": len(items)}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode("latin-1").split(maxsplit=2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version.strip() == "HTTP/1.1" or connection == "keep-alive")
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # The body can't be delimited, so the connection can't be reused either
+                    self.counts["rejected"] += 1
+                    status, payload, keep_alive = 400, {"error": "Content-Length must be a non-negative integer"}, False
+                elif length > MAX_BODY:
+                    status, payload, keep_alive = 413, {"error": f"body larger than {MAX_BODY} bytes"}, False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = await self._route(method, path.split("?", 1)[0], body)
+                    except Exception:
+                        logger.exception("%s %s failed", method, path)
+                        status, payload = 500, {"error": "internal error"}
+                data = json.dumps(payload).encode()
+                head = (
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    + ("Retry-After: 1\r\n" if status == 503 else "")
+                    + ("" if keep_alive else "Connection: close\r\n")
+                    + "\r\n"
+                )
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # malformed request or client went away
+        finally:
+            writer.close()
+
+
+async def serve(host=HOST, port=PORT, **kwargs):
+    server = IngestServer(**kwargs)
+    await server.start(host, port)
+    print(f"Ingest API listening on http://{host}:{server.port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the JSON ingestion API for sticker events and questionnaire submissions.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--db", default=log_store.DEFAULT_PATH, help=f"SQLite database path (default: {log_store.DEFAULT_PATH})")
+    parser.add_argument("--cohort", default=None, help="Cohort directory of *_sticker_data.csv exports (default: the single built-in participant)")
+    parser.add_argument("--behaviors", default="target_behaviors.csv", help="Shared target behaviors file")
+    parser.add_argument("--out", default=None, help="Directory for scored exports and submissions.jsonl (default: the cohort directory, else exports/)")
+    parser.add_argument("--instruments", default="", help="Directory holding the questionnaire CSVs")
+    parser.add_argument("--norms", default=None, help="Also fold scored submissions into this psychometrics file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(format="%(levelname)s %(message)s")
+
+    try:
+        asyncio.run(serve(
+            args.host, args.port, log_path=args.db, cohort_dir=args.cohort, behavior_path=args.behaviors,
+            out_dir=args.out, base_dir=args.instruments, norms_path=args.norms,
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
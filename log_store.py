@@ -0,0 +1,289 @@
+# Embedded SQLite store for weekly sticker chart logs.
+# Replaces the weekly_behavior_log_week{N}.csv files: one database holds every
+# participant's weeks, keyed by participant/week/behavior/day, with week
+# metadata (phase, schedule, goal, timestamp) stored once per week.
+import argparse
+import datetime
+import glob
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import schemas
+
+DEFAULT_PATH = "behavior_logs.sqlite3"
+DAYS = schemas.DAYS
+MAX_CACHED_CSV = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS weeks (
+    participant TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    phase TEXT,
+    schedule TEXT,
+    threshold INTEGER,
+    total_stickers INTEGER,
+    logged_at TEXT,
+    PRIMARY KEY (participant, week)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stickers (
+    participant TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    behavior TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (participant, week, behavior, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stickers_behavior ON stickers (participant, behavior, week);
+"""
+
+_stores = {}
+_stores_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+
+class LogStore:
+    """Append-only weekly log store backed by a single SQLite file."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Saves from the UI run on one background thread, in submission order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-store-writer")
+        self._csv_cache = OrderedDict()  # (participant, week) -> CSV text of a saved week
+        self._csv_lock = threading.Lock()
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+    # --- Writes ---
+
+    def _insert_week(self, participant, week, behaviors, values, phase, schedule, threshold, total, logged_at):
+        """Insert a week's metadata and its behaviors x days `values` grid."""
+        self._conn.execute(
+            "INSERT INTO weeks VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (participant, week, phase, schedule, threshold, total, logged_at),
+        )
+        values = values.tolist()
+        self._conn.executemany(
+            "INSERT INTO stickers VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (participant, week, behavior, day, values[row][day], row)
+                for row, behavior in enumerate(behaviors)
+                for day in range(len(DAYS))
+            ],
+        )
+
+    def append_week(self, participant, sticker_df, phase, schedule, threshold, logged_at=None, week=None):
+        """Append one week of sticker data and return its week number.
+
+        `sticker_df` is the behaviors x days grid the chart displays. When `week`
+        is omitted the next free week for the participant is allocated inside the
+        same transaction, so concurrent sessions never collide. Existing weeks
+        are never overwritten (sqlite3.IntegrityError).
+        """
+        if logged_at is None:
+            logged_at = datetime.datetime.now().isoformat()
+        values = sticker_df[DAYS].astype(int).to_numpy()
+        total = int(values.sum())
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if week is None:
+                    week = self._latest_week(participant) + 1
+                self._insert_week(participant, week, sticker_df.index, values, phase, schedule, threshold, total, logged_at)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return week
+
+    def submit_week(self, participant, sticker_df, phase, schedule, threshold):
+        """Queue `append_week` on the store's background writer and return a Future of the week number.
+
+        The week is committed in one transaction (never half-written), and its
+        download CSV is built and cached by the writer as well.
+        """
+        sticker_df = sticker_df.copy()
+
+        def save():
+            week = self.append_week(participant, sticker_df, phase, schedule, threshold)
+            self.week_csv(participant, week)
+            return week
+
+        return self._writer.submit(save)
+
+    def import_csv_logs(self, paths, participant):
+        """Bulk import weekly_behavior_log_week{N}.csv files in one transaction.
+
+        The week number comes from the file name. Weeks already in the store are
+        skipped. All files are parsed and validated against the weekly log
+        schema in one pass before the write transaction starts; files that fail
+        validation are logged and skipped, and a stored Total_Stickers_Earned
+        that disagrees with the day columns is replaced by their sum. Returns
+        the list of imported week numbers.
+        """
+        with self._lock:
+            existing = {
+                row[0] for row in
+                self._conn.execute("SELECT week FROM weeks WHERE participant = ?", (participant,))
+            }
+        weeks = {}
+        for path in paths:
+            match = re.search(r"week(\d+)", os.path.basename(path))
+            if match and int(match.group(1)) not in existing:
+                weeks.setdefault(int(match.group(1)), path)
+        logs, rejected = schemas.read_many(weeks.values(), "weekly_log")
+        for error in rejected.values():
+            logger.warning("Skipped %s", error)
+        week_of_source = list(weeks)
+
+        imported = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check inside the transaction; another writer may have added weeks meanwhile
+                existing = {
+                    row[0] for row in
+                    self._conn.execute("SELECT week FROM weeks WHERE participant = ?", (participant,))
+                }
+                for source, log_df in logs.groupby("source", sort=False):
+                    week = week_of_source[source]
+                    if week in existing:
+                        continue
+                    first = log_df.iloc[0]
+                    self._insert_week(
+                        participant, week, log_df["behavior"], log_df[DAYS].to_numpy(),
+                        first["Phase"], first["Schedule"], int(first["Weekly_Threshold_Goal"]),
+                        int(first["Total_Stickers_Earned"]), first["Log_Timestamp"],
+                    )
+                    imported.append(week)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return sorted(imported)
+
+    # --- Reads ---
+
+    def _latest_week(self, participant):
+        row = self._conn.execute(
+            "SELECT MAX(week) FROM weeks WHERE participant = ?", (participant,)
+        ).fetchone()
+        return row[0] or 0
+
+    def latest_week(self, participant):
+        with self._lock:
+            return self._latest_week(participant)
+
+    def weeks(self, participant, start=None, end=None):
+        """Week metadata for a participant, optionally limited to weeks start..end (inclusive)."""
+        sql = "SELECT * FROM weeks WHERE participant = ?"
+        params = [participant]
+        if start is not None:
+            sql += " AND week >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND week <= ?"
+            params.append(end)
+        with self._lock:
+            return pd.read_sql_query(sql + " ORDER BY week", self._conn, params=params)
+
+    def query(self, participant, start=None, end=None, behavior=None):
+        """Long-format sticker rows (participant, week, behavior, day, value, position) from the primary key index."""
+        sql = "SELECT participant, week, behavior, day, value, position FROM stickers WHERE participant = ?"
+        params = [participant]
+        if behavior is not None:
+            sql += " AND behavior = ?"
+            params.append(behavior)
+        if start is not None:
+            sql += " AND week >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND week <= ?"
+            params.append(end)
+        with self._lock:
+            return pd.read_sql_query(sql + " ORDER BY week, day", self._conn, params=params)
+
+    def participants(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT participant FROM weeks ORDER BY participant")]
+
+    def week_frame(self, participant, week):
+        """Rebuild one week in the layout of the old weekly_behavior_log_week{N}.csv files."""
+        meta = self.weeks(participant, week, week)
+        if meta.empty:
+            return None
+        rows = self.query(participant, week, week)
+        # Keep the behaviors in the order they were logged
+        behaviors = rows.sort_values("position")["behavior"].unique()
+        grid = rows.pivot(index="behavior", columns="day", values="value").reindex(behaviors)
+        grid.columns = [DAYS[d] for d in grid.columns]
+        grid.index.name = None
+        first = meta.iloc[0]
+        grid["Phase"] = first["phase"]
+        grid["Schedule"] = first["schedule"]
+        grid["Weekly_Threshold_Goal"] = first["threshold"]
+        grid["Total_Stickers_Earned"] = first["total_stickers"]
+        grid["Log_Timestamp"] = first["logged_at"]
+        return grid
+
+    def week_csv(self, participant, week):
+        """CSV text of a saved week (old weekly log layout), or None if the week doesn't exist.
+
+        Saved weeks are never modified, so the text is cached in memory.
+        """
+        key = (participant, week)
+        with self._csv_lock:
+            if key in self._csv_cache:
+                self._csv_cache.move_to_end(key)
+                return self._csv_cache[key]
+        log_df = self.week_frame(participant, week)
+        if log_df is None:
+            return None
+        text = log_df.to_csv(index=True)
+        with self._csv_lock:
+            self._csv_cache[key] = text
+            while len(self._csv_cache) > MAX_CACHED_CSV:
+                self._csv_cache.popitem(last=False)
+        return text
+
+
+def get_store(path=DEFAULT_PATH):
+    """Return the process-wide LogStore for a database path (one connection shared by all sessions)."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = LogStore(key)
+        return _stores[key]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import weekly sticker chart CSV logs into the log store.")
+    parser.add_argument("paths", nargs="*", default=None, help="CSV log files (default: weekly_behavior_log_week*.csv)")
+    parser.add_argument("--participant", required=True, help="Participant the logs belong to (e.g. Ronda_Montelli)")
+    parser.add_argument("--db", default=DEFAULT_PATH, help=f"SQLite database path (default: {DEFAULT_PATH})")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or sorted(glob.glob("weekly_behavior_log_week*.csv"))
+    store = LogStore(args.db)
+    imported = store.import_csv_logs(paths, args.participant)
+    print(f"Imported {len(imported)} week(s) for {args.participant}: {imported}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# Rerun latency metrics for the Streamlit apps.
+# Timing spans (page functions and script phases) are aggregated in-process
+# into per-page latency histograms. They can be exported three ways, each
+# switched on with an environment variable:
+#
+#   OPERANT_METRICS_PORT=9464        Prometheus text endpoint at http://host:9464/metrics
+#   OPERANT_METRICS_FILE=metrics.log one JSON line per rerun in a rotating file
+#   OPERANT_PROFILE_SLOW_MS=500      cProfile every rerun and keep the stats of
+#                                    reruns slower than this in OPERANT_PROFILE_DIR
+#
+# `python metrics.py metrics.log*` prints p50/p95/p99 per page and span from the file.
+import argparse
+import bisect
+import contextlib
+import cProfile
+import functools
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+MAX_PROFILES = 20
+
+_lock = threading.Lock()
+_histograms = {}  # (page, span) -> Histogram
+_server = None
+_file_logger = None
+_active = threading.local()  # per-session-thread run in progress: extra spans and cProfile instance
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in milliseconds (Prometheus layout)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th quantile."""
+        target, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS_MS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= target and n:
+                return bound
+        return float("nan")
+
+
+def observe(page, span, ms):
+    with _lock:
+        hist = _histograms.get((page, span))
+        if hist is None:
+            hist = _histograms[(page, span)] = Histogram()
+        hist.observe(ms)
+
+
+def timed(page):
+    """Decorator recording a function's duration as a span named after the function."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(page, fn.__name__, (time.perf_counter() - t0) * 1000)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def span(label):
+    """Time a block as a span of the page or fragment rerun in progress on this thread."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans = getattr(_active, "spans", None)
+        if spans is not None:
+            # Repeated spans (e.g. one per questionnaire item) add up within a run
+            spans[label] = spans.get(label, 0.0) + (time.perf_counter() - t0) * 1000
+
+
+def fragment(page):
+    """Decorator for @st.fragment bodies (place it below @st.fragment).
+
+    During a full run of the script the body is a span of that run. A
+    fragment-only rerun never passes through the script's start and end, so it
+    is recorded as a rerun of its own under `page`, with its own histograms
+    and slow-rerun profile.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if getattr(_active, "spans", None) is not None:
+                with span(fn.__name__):
+                    return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            profiler = begin_rerun(page)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end_rerun(page, (time.perf_counter() - t0) * 1000, [], profiler)
+        return wrapper
+    return decorator
+
+
+# --- Rerun lifecycle (driven by startup_profile.StartupProfile) ---
+
+def begin_rerun(page):
+    """Start of a script run: starts exporters once per process and, if enabled, cProfile."""
+    _start_exporters()
+    _active.spans = {}
+    # A run cut short by st.rerun()/st.stop() never reaches end_rerun; drop its profiler
+    stale = getattr(_active, "profiler", None)
+    if stale is not None:
+        stale.disable()
+        _active.profiler = None
+    if not os.environ.get("OPERANT_PROFILE_SLOW_MS"):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is active (e.g. a concurrent session on Python 3.12+)
+        return None
+    _active.profiler = profiler
+    return profiler
+
+
+def end_rerun(page, total_ms, phases, profiler=None):
+    """End of a script run: record its phases and total, export, keep slow profiles."""
+    phases = list(phases) + list((getattr(_active, "spans", None) or {}).items())
+    _active.spans = None
+    for label, ms in phases:
+        observe(page, label, ms)
+    observe(page, "rerun", total_ms)
+    if _file_logger is not None:
+        _file_logger.info(json.dumps({
+            "ts": time.time(), "page": page, "total_ms": round(total_ms, 3),
+            "spans": {label: round(ms, 3) for label, ms in phases},
+        }))
+    if profiler is not None:
+        profiler.disable()
+        _active.profiler = None
+        if total_ms >= float(os.environ["OPERANT_PROFILE_SLOW_MS"]):
+            _keep_profile(profiler, page, total_ms)
+
+
+def _keep_profile(profiler, page, total_ms):
+    directory = os.environ.get("OPERANT_PROFILE_DIR", "profiles")
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(directory, f"{page}-{int(total_ms):07d}ms-{time.time_ns()}.prof"))
+    # Keep only the slowest MAX_PROFILES captures (the duration leads the file name)
+    captures = sorted(glob.glob(os.path.join(directory, f"{page}-*ms-*.prof")))
+    for path in captures[:-MAX_PROFILES]:
+        os.remove(path)
+
+
+# --- Exporters ---
+
+def prometheus_text():
+    """All histograms in the Prometheus text exposition format."""
+    lines = ["# HELP operant_span_ms Duration of app spans in milliseconds.",
+             "# TYPE operant_span_ms histogram"]
+    with _lock:
+        items = sorted((key, (list(h.counts), h.count, h.sum)) for key, h in _histograms.items())
+    for (page, span), (counts, count, total) in items:
+        labels = f'page="{page}",span="{span}"'
+        cumulative = 0
+        for bound, n in zip(BUCKETS_MS + ("+Inf",), counts):
+            cumulative += n
+            lines.append(f'operant_span_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"operant_span_ms_sum{{{labels}}} {total}")
+        lines.append(f"operant_span_ms_count{{{labels}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread (once per process)."""
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, daemon=True, name="operant-metrics").start()
+    return _server
+
+
+def _start_exporters():
+    global _file_logger
+    port = os.environ.get("OPERANT_METRICS_PORT")
+    if port and _server is None:
+        try:
+            serve(int(port))
+        except OSError:
+            pass  # Port taken (e.g. by the other app in this process group)
+    path = os.environ.get("OPERANT_METRICS_FILE")
+    if path and _file_logger is None:
+        logger = logging.getLogger("operant.metrics")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(logging.handlers.RotatingFileHandler(path, maxBytes=10_000_000, backupCount=5))
+        _file_logger = logger
+
+
+# --- Offline summary of the rotating file ---
+
+def _quantile(values, q):
+    """Nearest-rank q-th quantile of sorted values."""
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(paths):
+    """p50/p95/p99 (ms) per page and span from rotating metrics files."""
+    samples = {}
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                samples.setdefault((record["page"], "rerun"), []).append(record["total_ms"])
+                for span, ms in record["spans"].items():
+                    samples.setdefault((record["page"], span), []).append(ms)
+    rows = []
+    for (page, span), values in sorted(samples.items()):
+        values.sort()
+        rows.append((page, span, len(values), _quantile(values, 0.5), _quantile(values, 0.95),
+                     _quantile(values, 0.99), values[-1]))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize rerun latency from OPERANT_METRICS_FILE logs.")
+    parser.add_argument("paths", nargs="+", help="Metrics log files (rotated files included)")
+    args = parser.parse_args(argv)
+    print(f"{'page':<20} {'span':<24} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for page, span, n, p50, p95, p99, worst in summarize(args.paths):
+        print(f"{page:<20} {span:<24} {n:6d} {p50:8.1f} {p95:8.1f} {p99:8.1f} {worst:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
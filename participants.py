@@ -0,0 +1,191 @@
+# Multi-participant routing for the sticker chart.
+# One process can serve a whole cohort: every <id>_sticker_data.csv export in a
+# cohort directory (e.g. the --out directory of batch_assess.py) is a
+# participant, and an optional <id>_target_behaviors.csv next to it overrides
+# the shared target behaviors. Shared files are parsed once by the registry;
+# per-participant state (sticker config, saved sticker history, last phase and
+# schedule) is loaded on first use and at most `max_resident` participants are
+# kept in memory, least recently used evicted first.
+#
+#   OPERANT_COHORT_DIR=exports/ streamlit run sticker_chart.py   (then ?participant=<id>)
+#   python participants.py exports/
+import argparse
+import glob
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import log_store
+import registry
+import sticker_matrix
+
+EXPORT_SUFFIX = "_sticker_data.csv"
+BEHAVIOR_SUFFIX = "_target_behaviors.csv"
+MAX_RESIDENT = int(os.environ.get("OPERANT_MAX_RESIDENT", 128))
+
+_rosters = {}
+_pools = {}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Participant:
+    """A participant id and the files that configure their sticker chart."""
+    id: str
+    sticker_path: str
+    behavior_path: str
+
+    @classmethod
+    def from_export(cls, sticker_path, behavior_path):
+        """Participant named after their export (e.g. 'Ronda_Montelli' from 'Ronda_Montelli_sticker_data.csv')."""
+        return cls(os.path.basename(sticker_path).removesuffix(EXPORT_SUFFIX), sticker_path, behavior_path)
+
+
+class Roster:
+    """Participants found in a cohort directory, rescanned when the directory changes."""
+
+    def __init__(self, directory, behavior_path="target_behaviors.csv"):
+        self.directory = directory
+        self.behavior_path = behavior_path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._participants = {}
+
+    def _scan(self):
+        participants = {}
+        for sticker_path in sorted(glob.glob(os.path.join(glob.escape(self.directory), "*" + EXPORT_SUFFIX))):
+            participant = Participant.from_export(sticker_path, self.behavior_path)
+            own_behaviors = os.path.join(self.directory, participant.id + BEHAVIOR_SUFFIX)
+            if os.path.exists(own_behaviors):
+                participant = Participant(participant.id, sticker_path, own_behaviors)
+            participants[participant.id] = participant
+        return participants
+
+    def participants(self):
+        """{id: Participant}; adding or removing an export changes the directory mtime and triggers a rescan."""
+        mtime = os.stat(self.directory).st_mtime_ns
+        with self._lock:
+            if mtime != self._mtime:
+                self._participants = self._scan()
+                self._mtime = mtime
+            return self._participants
+
+    def ids(self):
+        return list(self.participants())
+
+    def get(self, participant_id):
+        """The Participant with this id (KeyError if there is no export for it)."""
+        return self.participants()[participant_id]
+
+
+@dataclass
+class Resident:
+    """One participant's loaded state, shared read-only by all of their sessions."""
+    participant: Participant
+    config: registry.StickerConfig
+    history: sticker_matrix.StickerHistory  # saved weeks only; sessions work on a copy
+    latest_week: int
+    phase: str = None      # of the latest saved week
+    schedule: str = None
+
+
+class ParticipantPool:
+    """LRU cache of resident participants over one log store."""
+
+    def __init__(self, store, max_resident=MAX_RESIDENT):
+        self.store = store
+        self.max_resident = max_resident
+        self._lock = threading.Lock()
+        self._resident = OrderedDict()  # id -> Resident
+        self.hits = self.misses = self.evictions = 0
+
+    def _load(self, participant):
+        config = registry.get_sticker_config(participant.sticker_path, participant.behavior_path)
+        weeks = self.store.weeks(participant.id)
+        history = sticker_matrix.StickerHistory.from_long(
+            self.store.query(participant.id), behaviors=config.modified_behaviors, week_info=weeks,
+        )
+        last = weeks.iloc[-1] if len(weeks) else None
+        return Resident(
+            participant=participant,
+            config=config,
+            history=history,
+            latest_week=int(last["week"]) if last is not None else 0,
+            phase=last["phase"] if last is not None else None,
+            schedule=last["schedule"] if last is not None else None,
+        )
+
+    def get(self, participant):
+        """The participant's Resident, loading it on first use or after a week was saved since it was loaded."""
+        latest_week = self.store.latest_week(participant.id)
+        with self._lock:
+            resident = self._resident.get(participant.id)
+            if resident is not None and resident.participant == participant and resident.latest_week == latest_week:
+                self._resident.move_to_end(participant.id)
+                self.hits += 1
+                return resident
+        resident = self._load(participant)
+        with self._lock:
+            self.misses += 1
+            self._resident[participant.id] = resident
+            self._resident.move_to_end(participant.id)
+            while len(self._resident) > self.max_resident:
+                _, evicted = self._resident.popitem(last=False)
+                self.evictions += 1
+                self._forget(evicted.participant)
+        return resident
+
+    def _forget(self, participant):
+        # Drop the registry's copy of the participant's own files; shared files stay cached
+        registry.forget(participant.sticker_path)
+        if os.path.basename(participant.behavior_path).endswith(BEHAVIOR_SUFFIX):
+            registry.forget(participant.behavior_path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident": len(self._resident),
+                "max_resident": self.max_resident,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def get_roster(directory, behavior_path="target_behaviors.csv"):
+    """Return the process-wide Roster for a cohort directory."""
+    key = (os.path.abspath(directory), os.path.abspath(behavior_path))
+    with _lock:
+        if key not in _rosters:
+            _rosters[key] = Roster(*key)
+        return _rosters[key]
+
+
+def get_pool(path=log_store.DEFAULT_PATH):
+    """Return the process-wide ParticipantPool for a log store path."""
+    key = os.path.abspath(path)
+    with _lock:
+        if key not in _pools:
+            _pools[key] = ParticipantPool(log_store.get_store(key))
+        return _pools[key]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the participants of a cohort directory and their stored weeks.")
+    parser.add_argument("directory")
+    parser.add_argument("--behaviors", default="target_behaviors.csv", help="Shared target behaviors file (default: target_behaviors.csv)")
+    parser.add_argument("--db", default=log_store.DEFAULT_PATH, help=f"SQLite database path (default: {log_store.DEFAULT_PATH})")
+    args = parser.parse_args(argv)
+
+    store = log_store.LogStore(args.db)
+    for participant in get_roster(args.directory, args.behaviors).participants().values():
+        behaviors = "own" if participant.behavior_path.endswith(BEHAVIOR_SUFFIX) else "shared"
+        weeks = store.weeks(participant.id)["week"]
+        latest = f"latest week {weeks.max()}" if len(weeks) else "no weeks"
+        print(f"{participant.id:<30} {len(weeks):3d} weeks ({latest})  {behaviors} target behaviors")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
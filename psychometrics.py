@@ -0,0 +1,341 @@
+# Cohort psychometrics for the SPSRQ, RSS and ASQ.
+# Item statistics come from a streaming mean vector and co-moment matrix per
+# instrument, merged batch by batch with the parallel Welford update (Chan et
+# al.), so a new submission or a new intake chunk costs O(items^2) no matter
+# how large the archive is. Item means/variances, corrected item-total
+# correlations and Cronbach's alpha per subscale are all derived from the
+# covariance matrix. SR/SP percentile norms are kept as integer histograms of
+# the totals. The state lives in one small .npz file; every read-modify-write
+# of it holds a lock file, so concurrent sessions and processes (the apps,
+# ingest_api.py, batch_assess.py) never lose each other's updates. The app
+# hands its submissions to a background writer instead of merging on the page.
+#
+#   python psychometrics.py update intake.jsonl      # fold a batch file into the norms
+#   python psychometrics.py report                   # item statistics, alpha and norms
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import registry
+import scoring
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the in-process lock still serializes one server's sessions
+    fcntl = None
+
+DEFAULT_PATH = "cohort_norms.npz"
+KINDS = ("spsrq", "rss", "asq")
+SCALES = ("reward", "punishment")
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+# Percentile ranks are only shown to participants once the cohort is this large
+MIN_NORM_N = 20
+
+_lock = threading.Lock()
+_cache = {}  # abspath -> (signature, CohortStats)
+_writer = None  # background thread for record_async
+
+
+class Moments:
+    """Streaming mean and co-moment matrix over a fixed set of item columns."""
+
+    def __init__(self, n_items):
+        self.n = 0
+        self.mean = np.zeros(n_items)
+        self.m2 = np.zeros((n_items, n_items))
+
+    def update(self, matrix):
+        """Fold in a respondents x items batch; rows with unanswered (NaN) items are skipped."""
+        matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+        if matrix.shape[1] != len(self.mean):
+            raise ValueError(f"Expected {len(self.mean)} items, got {matrix.shape[1]}")
+        matrix = matrix[~np.isnan(matrix).any(axis=1)]
+        if not len(matrix):
+            return
+        batch = Moments(matrix.shape[1])
+        batch.n = len(matrix)
+        batch.mean = matrix.mean(axis=0)
+        centered = matrix - batch.mean
+        batch.m2 = centered.T @ centered
+        self.merge(batch)
+
+    def merge(self, other):
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 = self.m2 + other.m2 + np.outer(delta, delta) * (self.n * other.n / n)
+        self.mean = self.mean + delta * (other.n / n)
+        self.n = n
+
+    def covariance(self):
+        if self.n < 2:
+            return np.full(self.m2.shape, np.nan)
+        return self.m2 / (self.n - 1)
+
+
+def _scale_statistics(cov):
+    """Corrected item-total correlations and Cronbach's alpha from a covariance block."""
+    k = cov.shape[0]
+    variances = np.diag(cov)
+    total_var = cov.sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Correlation of each item with the total of the *other* items in its scale
+        cov_rest = cov.sum(axis=1) - variances
+        var_rest = total_var - 2 * cov.sum(axis=1) + variances
+        item_rest = cov_rest / np.sqrt(variances * var_rest)
+        alpha = k / (k - 1) * (1 - variances.sum() / total_var) if k > 1 else np.nan
+    return item_rest, float(alpha)
+
+
+def _subscales(kind, instrument_df):
+    """{subscale name: column positions} (the SPSRQ splits into reward/punishment)."""
+    if kind != "spsrq":
+        return {kind: np.arange(len(instrument_df))}
+    types = instrument_df["type"].str.lower().to_numpy()
+    return {scale: np.flatnonzero(types == scale) for scale in SCALES}
+
+
+class CohortStats:
+    """Item moments per instrument and SR/SP total histograms for the whole cohort."""
+
+    def __init__(self):
+        self.moments = {}                                          # kind -> Moments
+        self.norms = {scale: np.zeros(0, dtype=np.int64) for scale in SCALES}
+
+    # --- Updates ---
+
+    def update_items(self, kind, matrix):
+        matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+        if kind not in self.moments:
+            self.moments[kind] = Moments(matrix.shape[1])
+        self.moments[kind].update(matrix)
+
+    def update_norms(self, scores):
+        """Add SR/SP totals from a scoring.score_spsrq frame to the norm histograms."""
+        for scale in SCALES:
+            totals = np.rint(scores[f"{scale}_total"].to_numpy(dtype=float)).astype(np.int64)
+            counts = np.bincount(totals, minlength=len(self.norms[scale]))
+            counts[:len(self.norms[scale])] += self.norms[scale]
+            self.norms[scale] = counts
+
+    def update(self, responses_by_kind, instruments):
+        """Fold in a batch: {kind: matrix} plus the instrument frames for scoring the SPSRQ."""
+        for kind, matrix in responses_by_kind.items():
+            self.update_items(kind, matrix)
+        if "spsrq" in responses_by_kind:
+            spsrq = np.atleast_2d(responses_by_kind["spsrq"])
+            prorate = bool(np.isnan(spsrq).any())
+            self.update_norms(scoring.score_spsrq(spsrq, instruments["spsrq"], prorate=prorate))
+
+    def merge(self, other):
+        for kind, moments in other.moments.items():
+            if kind not in self.moments:
+                self.moments[kind] = Moments(len(moments.mean))
+            self.moments[kind].merge(moments)
+        for scale in SCALES:
+            size = max(len(self.norms[scale]), len(other.norms[scale]))
+            merged = np.zeros(size, dtype=np.int64)
+            merged[:len(self.norms[scale])] += self.norms[scale]
+            merged[:len(other.norms[scale])] += other.norms[scale]
+            self.norms[scale] = merged
+
+    # --- Statistics ---
+
+    def respondents(self, kind):
+        return self.moments[kind].n if kind in self.moments else 0
+
+    def item_table(self, kind, instrument_df):
+        """Per-item n, mean, variance and corrected item-total correlation within its subscale."""
+        moments = self.moments.get(kind) or Moments(len(instrument_df))
+        cov = moments.covariance()
+        item_rest = np.full(len(instrument_df), np.nan)
+        subscale = np.full(len(instrument_df), kind, dtype=object)
+        for name, cols in _subscales(kind, instrument_df).items():
+            item_rest[cols] = _scale_statistics(cov[np.ix_(cols, cols)])[0]
+            subscale[cols] = name
+        return pd.DataFrame({
+            "qid": scoring.item_keys(instrument_df, kind),
+            "question": instrument_df["question"].to_numpy(),
+            "subscale": subscale,
+            "n": moments.n,
+            "mean": np.round(moments.mean, 3) if moments.n else np.nan,
+            "variance": np.round(np.diag(cov), 3),
+            "item_total_r": np.round(item_rest, 3),
+        })
+
+    def alpha(self, kind, instrument_df):
+        """{subscale: Cronbach's alpha}."""
+        moments = self.moments.get(kind) or Moments(len(instrument_df))
+        cov = moments.covariance()
+        return {name: _scale_statistics(cov[np.ix_(cols, cols)])[1]
+                for name, cols in _subscales(kind, instrument_df).items()}
+
+    def norm_count(self, scale):
+        return int(self.norms[scale].sum())
+
+    def percentile_rank(self, scale, total):
+        """Percentage of the cohort scoring below `total` (ties count half)."""
+        counts = self.norms[scale]
+        n = counts.sum()
+        if not n:
+            return float("nan")
+        total = int(round(total))
+        below = counts[:max(0, min(total, len(counts)))].sum()
+        equal = counts[total] if 0 <= total < len(counts) else 0
+        return float(100 * (below + 0.5 * equal) / n)
+
+    def norms_table(self, percentiles=PERCENTILES):
+        """SR/SP totals at the given percentiles of the cohort."""
+        rows = {}
+        for scale in SCALES:
+            counts = self.norms[scale]
+            cumulative = np.cumsum(counts)
+            n = cumulative[-1] if len(cumulative) else 0
+            rows[scale] = [int(np.searchsorted(cumulative, p / 100 * n)) if n else np.nan for p in percentiles]
+        table = pd.DataFrame(rows, index=[f"P{p}" for p in percentiles])
+        table.loc["n"] = [self.norm_count(scale) for scale in SCALES]
+        return table
+
+    # --- Persistence ---
+
+    def save(self, path):
+        """Write the state atomically (readers never see a half-written file)."""
+        arrays = {f"norm_{scale}": self.norms[scale] for scale in SCALES}
+        for kind, moments in self.moments.items():
+            arrays[f"{kind}_n"] = np.array(moments.n)
+            arrays[f"{kind}_mean"] = moments.mean
+            arrays[f"{kind}_m2"] = moments.m2
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        stats = cls()
+        with np.load(path) as data:
+            for scale in SCALES:
+                stats.norms[scale] = data[f"norm_{scale}"]
+            for kind in KINDS:
+                if f"{kind}_n" in data:
+                    moments = Moments(len(data[f"{kind}_mean"]))
+                    moments.n = int(data[f"{kind}_n"])
+                    moments.mean = data[f"{kind}_mean"]
+                    moments.m2 = data[f"{kind}_m2"]
+                    stats.moments[kind] = moments
+        return stats
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_stats(path=DEFAULT_PATH):
+    """The cohort statistics on disk, re-read only when the file changes (empty if there is none)."""
+    key = os.path.abspath(path)
+    signature = _signature(key)
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    stats = CohortStats.load(key) if signature is not None else CohortStats()
+    with _lock:
+        _cache[key] = (signature, stats)
+    return stats
+
+
+def merge_into(path, batch):
+    """Merge a CohortStats into the file at `path` and return the combined statistics.
+
+    The load, merge and save run under a lock file (`<path>.lock`) as well as
+    the process lock, so merges from other processes are never overwritten.
+    """
+    key = os.path.abspath(path)
+    with _lock, open(key + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file is closed
+        stats = CohortStats.load(key) if _signature(key) is not None else CohortStats()
+        stats.merge(batch)
+        stats.save(key)
+        _cache[key] = (_signature(key), stats)
+    return stats
+
+
+def record(responses_by_kind, path=DEFAULT_PATH, base_dir=""):
+    """Fold one submission (or batch) of {kind: response dict(s) or matrix} into the stored statistics."""
+    instruments = {kind: registry.get_instrument(kind, base_dir).df for kind in responses_by_kind}
+    matrices = {
+        kind: scoring.response_matrix(r, instruments[kind], kind) if isinstance(r, (dict, list)) else r
+        for kind, r in responses_by_kind.items()
+    }
+    batch = CohortStats()
+    batch.update(matrices, instruments)
+    return merge_into(path, batch)
+
+
+def record_async(responses_by_kind, path=DEFAULT_PATH, base_dir=""):
+    """Queue `record` on the module's background writer and return a Future of the combined statistics.
+
+    Submissions are merged one at a time in arrival order, off the caller's thread.
+    """
+    global _writer
+    responses_by_kind = {kind: r.copy() for kind, r in responses_by_kind.items()}
+    with _lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="psychometrics-writer")
+    return _writer.submit(record, responses_by_kind, path, base_dir)
+
+
+def report(stats, base_dir=""):
+    lines = []
+    for kind in KINDS:
+        instrument_df = registry.get_instrument(kind, base_dir).df
+        alphas = ", ".join(f"{name} {value:.3f}" for name, value in stats.alpha(kind, instrument_df).items())
+        lines.append(f"{kind.upper()}: {stats.respondents(kind)} complete respondents; Cronbach's alpha: {alphas}")
+        lines.append(stats.item_table(kind, instrument_df).drop(columns="question").to_string(index=False))
+        lines.append("")
+    lines.append("SR/SP total norms")
+    lines.append(stats.norms_table().to_string())
+    return "\n".join(lines)
+
+
+def _split_by_kind(records):
+    """{kind: [responses]} with each kind holding only the respondents who answered it."""
+    split = {}
+    for kind, prefix in scoring.ITEM_PREFIX.items():
+        rows = [r for r in records if any(k.startswith(prefix) and k[len(prefix):].isdigit() for k in r)]
+        if rows:
+            split[kind] = rows
+    return split
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cohort item statistics and SR/SP norms.")
+    parser.add_argument("command", choices=["update", "report"])
+    parser.add_argument("inputs", nargs="*", help="JSONL/CSV response files for `update` (batch_assess format)")
+    parser.add_argument("--norms", default=DEFAULT_PATH, help=f"Statistics file (default: {DEFAULT_PATH})")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--instruments", default="", help="Directory holding the questionnaire CSVs")
+    args = parser.parse_args(argv)
+
+    if args.command == "update":
+        import batch_assess
+        stats = get_stats(args.norms)
+        for path in args.inputs:
+            for chunk in batch_assess._chunks(batch_assess.iter_records(path, args.chunk_size), args.chunk_size):
+                stats = record(_split_by_kind([responses for _, responses in chunk]), args.norms, args.instruments)
+        print(f"{args.norms}: {stats.norm_count('reward')} respondents in the SR/SP norms")
+    else:
+        print(report(get_stats(args.norms), args.instruments))
+
+
+if __name__ == "__main__":
+    main()
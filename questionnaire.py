@@ -0,0 +1,146 @@
+# Shared Likert questionnaire renderer for the SPSRQ, RSS and ASQ pages.
+# Each item is its own Streamlit fragment, so moving one slider reruns only
+# that item instead of the whole script (metrics.py records those reruns under
+# their own page label). Long questionnaires can be paginated.
+import streamlit as st
+
+import metrics
+
+DEFAULT_VALUE = 4
+
+likert_labels = {
+    1: "Strongly Disagree",
+    2: "Disagree",
+    3: "Somewhat Disagree",
+    4: "Neutral",
+    5: "Somewhat Agree",
+    6: "Agree",
+    7: "Strongly Agree"
+}
+
+LIKERT_LEGEND = """
+    <div class='likert-legend'>
+        <b>Likert Scale</b>:
+        <span style='color:#b30000;'>1</span>,
+        <span style='color:#e34a33;'>2</span>,
+        <span style='color:#fc8d59;'>3</span>,
+        <span style='color:#fdbb84;'>4</span>,
+        <span style='color:#a1d99b;'>5</span>,
+        <span style='color:#74c476;'>6</span>,
+        <span style='color:#31a354;'>7</span> <br>
+        <hr style='height:5px;border:none;background:linear-gradient(to right, yellow, orange); border-radius:5px;'>
+        <i>1 = Strongly Disagree &nbsp;&nbsp;&nbsp; 2 = Disagree &nbsp;&nbsp;&nbsp; 3 = Somewhat Disagree &nbsp;&nbsp;&nbsp; <br> 4 = Neutral <br> 5 = Somewhat Agree &nbsp;&nbsp;&nbsp; 6 = Agree &nbsp;&nbsp;&nbsp; 7 = Strongly Agree</i>
+    </div>
+    """
+
+ITEM_DIVIDER = "<hr style='height:3px;border:none;background:linear-gradient(to right, red, orange, yellow, green); border-radius:5px;'>"
+
+
+def get_color(value):
+    """Return a CSS color gradient based on Likert scale value."""
+    color_map = {
+        1: '#b30000',  # Dark red
+        2: '#e34a33',
+        3: '#fc8d59',
+        4: '#fdbb84',  # Orange for Neutral
+        5: '#a1d99b',
+        6: '#74c476',
+        7: '#31a354'   # Green
+    }
+    return color_map.get(value, 'black')
+
+
+def render_legend():
+    st.markdown(LIKERT_LEGEND, unsafe_allow_html=True)
+
+
+def _answers(kind):
+    # Answers live outside the widget keys so they survive page changes
+    # (Streamlit drops widget state for sliders that are not rendered)
+    state_key = f"{kind}_answers"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = {}
+    return st.session_state[state_key]
+
+
+@st.fragment
+@metrics.fragment("questionnaire_item")
+def _render_item(kind, key, question, on_change=None):
+    answers = _answers(kind)
+    st.markdown(ITEM_DIVIDER, unsafe_allow_html=True)
+    value = st.slider(
+        f"{key}. {question}",
+        min_value=1,
+        max_value=7,
+        value=answers.get(key, DEFAULT_VALUE),
+        key=key,
+        label_visibility="visible"
+    )
+    previous = answers.get(key)
+    answers[key] = value
+    if on_change is not None and previous is not None and previous != value:
+        on_change()
+    color = get_color(value)
+    label = likert_labels.get(value, "Invalid value")
+    st.markdown(
+        f"<div style='padding:6px; border-radius:5px; background-color:{color}; color:black; margin-bottom:5px;'>"
+        f"<b>Your response:</b> {label}</div>",
+        unsafe_allow_html=True
+    )
+
+
+def render_questionnaire(instrument, page_size=None, order=None, is_settled=None, on_change=None):
+    """Render an instrument's items as independent fragments.
+
+    With `page_size` set, items are shown that many at a time with Previous/Next
+    controls. Returns the complete {key: value} response dict once the last
+    page is showing (so the caller can offer its submit button), else None.
+
+    `order` presents the items in that order of row positions. `is_settled`
+    enables early stopping: it is called with the responses shown so far each
+    time Next is clicked, and once it returns True the current page becomes the
+    last one and only the items shown are returned.
+
+    `on_change` is called (from the item's fragment) whenever an answer changes.
+    """
+    kind = instrument.kind
+    n_items = len(instrument.keys)
+    positions = range(n_items) if order is None else [int(i) for i in order]
+    settled_key = f"{kind}_settled_at"
+    if not page_size or page_size >= n_items:
+        start, stop, last_page = 0, n_items, True
+    else:
+        page_key = f"{kind}_page"
+        n_pages = -(-n_items // page_size)
+        page = min(st.session_state.get(page_key, 0), n_pages - 1)
+        start, stop = page * page_size, min((page + 1) * page_size, n_items)
+        last_page = page == n_pages - 1 or st.session_state.get(settled_key) == stop
+        st.caption(f"Page {page + 1} of {n_pages} (items {start + 1}-{stop} of {n_items})")
+
+    for i in positions[start:stop]:
+        _render_item(kind, instrument.keys[i], instrument.questions[i], on_change)
+
+    if page_size and page_size < n_items:
+        col_prev, col_next = st.columns(2)
+        if page > 0 and col_prev.button("⬅️ Previous", key=f"{kind}_prev"):
+            st.session_state[page_key] = page - 1
+            st.rerun()
+        if not last_page and col_next.button("Next ➡️", key=f"{kind}_next"):
+            if is_settled is not None and is_settled(_shown(kind, instrument, positions[:stop])):
+                st.session_state[settled_key] = stop
+            else:
+                st.session_state.pop(settled_key, None)
+                st.session_state[page_key] = page + 1
+            st.rerun()
+
+    if not last_page:
+        return None
+    if st.session_state.get(settled_key) == stop and stop < n_items:
+        st.info(f"Your answers to the first {stop} of {n_items} items are enough to continue.")
+        return _shown(kind, instrument, positions[:stop])
+    return _shown(kind, instrument, range(n_items))
+
+
+def _shown(kind, instrument, positions):
+    answers = _answers(kind)
+    return {instrument.keys[i]: answers.get(instrument.keys[i], DEFAULT_VALUE) for i in positions}
@@ -0,0 +1,157 @@
+# Process-wide registry of instrument and configuration files.
+# Every Streamlit session (and batch job) in the process shares one parsed copy
+# of each CSV. Entries are re-read only when the file's mtime or size changes.
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import schemas
+import scoring
+
+INSTRUMENT_FILES = {
+    "spsrq": "spsrq_questions.csv",
+    "rss": "rss_questions.csv",
+    "asq": "asq_questions.csv",
+}
+
+_lock = threading.Lock()
+_tables = {}    # (abspath, schema kind or None) -> (signature, DataFrame)
+_derived = {}   # (name, *abspaths) -> (signatures, object)
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_table(path, kind=None):
+    """Return the shared DataFrame for a CSV file, re-reading it only if the file changed.
+
+    With a `kind` from schemas.SCHEMAS the file is parsed with its declared
+    columns and dtypes and validated (schemas.SchemaError if it doesn't match).
+    The frame is shared by every session in the process and must be treated as read-only.
+    Raises FileNotFoundError if the file does not exist.
+    """
+    key = os.path.abspath(path)
+    signature = _signature(key)
+    with _lock:
+        cached = _tables.get((key, kind))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    df = schemas.read_csv(key, kind) if kind else pd.read_csv(key)
+    with _lock:
+        _tables[(key, kind)] = (signature, df)
+    return df
+
+
+def _get_derived(name, paths, kinds, build):
+    """Cache an object built from one or more registry files (of the given schema kinds), keyed on all their signatures."""
+    keys = tuple(os.path.abspath(p) for p in paths)
+    signatures = tuple(_signature(k) for k in keys)
+    with _lock:
+        cached = _derived.get((name,) + keys)
+        if cached is not None and cached[0] == signatures:
+            return cached[1]
+    value = build(*[get_table(k, kind) for k, kind in zip(keys, kinds)])
+    with _lock:
+        _derived[(name,) + keys] = (signatures, value)
+    return value
+
+
+def forget(path):
+    """Drop the cached entries built from one file (e.g. a participant evicted from a cohort pool)."""
+    key = os.path.abspath(path)
+    with _lock:
+        for table_key in [k for k in _tables if k[0] == key]:
+            del _tables[table_key]
+        for derived_key in [k for k in _derived if key in k[1:]]:
+            del _derived[derived_key]
+
+
+def clear():
+    """Drop every cached entry (the next lookup re-reads from disk)."""
+    with _lock:
+        _tables.clear()
+        _derived.clear()
+
+
+@dataclass(frozen=True)
+class Instrument:
+    """An immutable questionnaire definition with precomputed lookup arrays."""
+    kind: str
+    df: pd.DataFrame
+    ids: np.ndarray
+    keys: tuple
+    types: np.ndarray
+    questions: np.ndarray
+    id_to_row: dict
+
+    def question(self, item_id):
+        return self.questions[self.id_to_row[int(item_id)]]
+
+    def item_type(self, item_id):
+        return self.types[self.id_to_row[int(item_id)]]
+
+
+def _build_instrument(kind, df):
+    ids = df["id"].to_numpy()
+    types = df["type"].str.lower().to_numpy()
+    questions = df["question"].to_numpy()
+    for arr in (ids, types, questions):
+        arr.flags.writeable = False
+    return Instrument(
+        kind=kind,
+        df=df,
+        ids=ids,
+        keys=tuple(scoring.item_keys(df, kind)),
+        types=types,
+        questions=questions,
+        id_to_row={int(i): row for row, i in enumerate(ids)},
+    )
+
+
+def get_instrument(kind, base_dir=""):
+    """Return the shared Instrument for 'spsrq', 'rss' or 'asq'."""
+    path = os.path.join(base_dir, INSTRUMENT_FILES[kind])
+    return _get_derived(kind, [path], ["instrument"], lambda df: _build_instrument(kind, df))
+
+
+@dataclass(frozen=True)
+class StickerConfig:
+    """Reinforcer/punisher export and target behaviors used by the sticker chart."""
+    reinforcer_df: pd.DataFrame
+    reinforcer_type: str
+    reinforcer_list: tuple
+    reinforcer_description_map: dict
+    target_df: pd.DataFrame
+    behavior_map: dict
+    behaviors: tuple
+    modified_behaviors: tuple
+
+
+def _build_sticker_config(reinforcer_df, target_df):
+    # Fall back to the QID when the export carries no question text
+    if "question" in reinforcer_df.columns:
+        description_map = dict(zip(reinforcer_df["qid"], reinforcer_df["question"]))
+    else:
+        description_map = {qid: qid for qid in reinforcer_df["qid"]}
+    return StickerConfig(
+        reinforcer_df=reinforcer_df,
+        reinforcer_type=reinforcer_df["label"].iloc[0],
+        reinforcer_list=tuple(reinforcer_df["qid"]),
+        reinforcer_description_map=description_map,
+        target_df=target_df,
+        behavior_map=dict(zip(target_df["target_behavior"], target_df["modified_behavior"])),
+        behaviors=tuple(target_df["target_behavior"]),
+        modified_behaviors=tuple(target_df["modified_behavior"]),
+    )
+
+
+def get_sticker_config(sticker_path, behavior_path):
+    """Return the shared StickerConfig for a reinforcer export and target behavior file."""
+    return _get_derived(
+        "sticker_config", [sticker_path, behavior_path], ["sticker_export", "target_behaviors"], _build_sticker_config,
+    )
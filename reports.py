@@ -0,0 +1,262 @@
+# Static per-participant reports for clinic reviews.
+# One HTML page per participant combines the assessment summary (SPSRQ scores
+# table, top-5 lollipop and Bliss/Distress Point charts) with the weekly
+# sticker history from the log store's rollups. Participants are scored and
+# rendered in chunks across a process pool. Figures go to a content-addressed
+# figures/ directory (<hash of the data shown>.png), so a chart shared by many
+# participants is drawn once. A manifest records a hash of the data behind
+# each report, and later runs rebuild only the reports whose data changed.
+#
+#   python reports.py intake.jsonl --out reports/            # or exports/submissions.jsonl from ingest_api.py
+#   python reports.py intake.jsonl --out reports/ --force    # rebuild everything
+import argparse
+import html
+import json
+import logging
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+import pandas as pd
+
+import batch_assess
+import figures
+import log_store
+import registry
+import rollups
+import scoring
+import tables
+
+REPORT_VERSION = 2  # part of every report's data hash; bump it when the layout changes
+MANIFEST_FILE = "reports_manifest.json"
+INDEX_FILE = "index.html"
+FIGURE_DIR = "figures"
+REPORT_SUFFIX = "_report.html"
+
+# SPSRQ summary columns as the assessment app labels them
+SUMMARY_COLUMNS = {
+    "reward_total": "Total Sensitivity to Reward",
+    "reward_mean": "Mean Reward Score",
+    "reward_sd": "Reward Score SD",
+    "punishment_total": "Total Sensitivity to Punishment",
+    "punishment_mean": "Mean Punishment Score",
+    "punishment_sd": "Punishment Score SD",
+    "dominant": "Dominant Sensitivity",
+}
+STIM_TYPE = {"rss": "Reinforcer", "asq": "Punisher"}
+
+logger = logging.getLogger(__name__)
+
+STYLE = tables.TABLE_CSS + """
+body { font-family: sans-serif; max-width: 960px; margin: 2em auto; color: #222; }
+table.operant-table { margin-bottom: 1em; }
+img { max-width: 100%; }
+.muted { color: #777; font-style: italic; }
+"""
+
+
+def participant_id(name):
+    """Log store / export id of a participant name (e.g. 'Ronda_Montelli' for 'Ronda Montelli')."""
+    return scoring.participant_id(name)
+
+
+def latest_records(input_path):
+    """{participant name: responses} from a JSONL/CSV file or directory; a later submission replaces an earlier one.
+
+    Names that can't be used in file names are skipped, and so is a name whose
+    report file another name already claims (e.g. 'Jane Doe' and 'Jane_Doe').
+    """
+    records, names = {}, {}
+    for name, responses in batch_assess.iter_records(input_path):
+        if not scoring.valid_name(name):
+            logger.warning("Skipped a record with participant name %r: missing or not usable as a file name", name)
+            continue
+        name = name.strip()
+        pid = participant_id(name)
+        if names.setdefault(pid, name) != name:
+            logger.warning("Skipped %r: its report file %s is already used by %r", name, pid + REPORT_SUFFIX, names[pid])
+            continue
+        records[name] = responses
+    return records
+
+
+def _figure_html(out_dir, key, draw, alt):
+    name = figures.export_png(os.path.join(out_dir, FIGURE_DIR), key, draw)
+    return f"<img src='{FIGURE_DIR}/{name}' alt='{html.escape(alt)}'>"
+
+
+def _write_atomic(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _render_report(out_dir, name, scores, kind, top, weekly, by_behavior, by_phase):
+    parts = [f"<h1>Behavioral Assessment Report: {html.escape(name)}</h1>",
+             f"<p class='muted'>Generated {datetime.now():%Y-%m-%d %H:%M}</p>",
+             "<h2>1. SPSRQ Scores Summary</h2>",
+             tables.table_html(scores)]
+
+    parts.append("<h2>2. Top 5 Stimuli by Strength of Response</h2>")
+    if len(top):
+        stim_type = STIM_TYPE[kind]
+        parts.append(tables.table_html(top.rename(columns={"qid": "Item", "question": stim_type, "response": "Likert Score (1-7)"})))
+        parts.append(_figure_html(out_dir, *figures.lollipop_figure(top["question"], top["response"], stim_type), "Top 5 stimuli"))
+        parts.append(_figure_html(out_dir, *figures.bliss_figure(kind, top["question"].iloc[0]), "Bliss/Distress Point"))
+    else:
+        parts.append(f"<p class='muted'>No {kind.upper()} responses were recorded.</p>")
+
+    parts.append("<h2>3. Weekly Sticker Summary</h2>")
+    if len(weekly):
+        met = int(weekly["met"].sum())
+        parts.append(f"<p><b>Weekly Goals Met:</b> {met} of {len(weekly)} saved weeks</p>")
+        parts.append(_figure_html(out_dir, *figures.stickers_by_week_figure(weekly.index, weekly["stickers"], weekly["met"]), "Stickers per week"))
+        table = weekly.reset_index().assign(met=weekly["met"].map({1: "Yes", 0: "No"}).to_numpy())
+        parts.append(tables.table_html(table.rename(columns=str.title)))
+        parts.append("<h3>Stickers per Behavior</h3>")
+        totals = by_behavior.sum().rename("stickers").rename_axis("behavior").reset_index()
+        parts.append(tables.table_html(totals.rename(columns=str.title)))
+        parts.append("<h3>Phase Comparison</h3>")
+        parts.append(tables.table_html(by_phase[["weeks", "stickers_per_week", "attainment_rate"]].reset_index()))
+    else:
+        parts.append("<p class='muted'>No weekly sticker logs have been saved yet.</p>")
+
+    return (f"<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>{html.escape(name)} report</title>"
+            f"<style>{STYLE}</style></head><body>\n" + "\n".join(parts) + "\n</body></html>\n")
+
+
+def build_chunk(records, out_dir, log_path, previous, base_dir=""):
+    """Score a chunk of (name, responses) pairs and write the reports whose data changed.
+
+    `previous` is {participant id: data hash} from the last run. Returns one
+    (participant id, manifest entry, written) tuple per participant.
+    """
+    names = [name for name, _ in records]
+    spsrq = registry.get_instrument("spsrq", base_dir)
+    summary = scoring.score_spsrq(scoring.response_matrix([r for _, r in records], spsrq.df, "spsrq"), spsrq.df)
+    summary[["reward_mean", "reward_sd", "punishment_mean", "punishment_sd"]] = summary[
+        ["reward_mean", "reward_sd", "punishment_mean", "punishment_sd"]].round(2)
+    tops = {}
+    for kind in ("rss", "asq"):
+        rows = [i for i, sensitivity in enumerate(summary["sensitivity"]) if sensitivity == kind]
+        if rows:
+            instrument = registry.get_instrument(kind, base_dir)
+            top = scoring.top_stimuli(scoring.response_matrix([records[i][1] for i in rows], instrument.df, kind), instrument.df, kind)
+            for respondent, group in top.groupby("respondent"):
+                tops[rows[respondent]] = group[["qid", "question", "response"]].reset_index(drop=True)
+
+    week_rollups = rollups.get_rollups(log_path)
+    results = []
+    for i, name in enumerate(names):
+        pid = participant_id(name)
+        kind = summary["sensitivity"].iloc[i]
+        scores = summary.iloc[[i]][list(SUMMARY_COLUMNS)].rename(columns=SUMMARY_COLUMNS)
+        top = tops.get(i, pd.DataFrame(columns=["qid", "question", "response"]))
+        weekly = week_rollups.weekly(pid)
+        by_behavior = week_rollups.by_behavior(pid)
+        by_phase = week_rollups.by_group(pid, "phase")
+        key = figures.figure_key(
+            REPORT_VERSION, name, scores.to_csv(index=False), kind, top.to_csv(index=False),
+            weekly.to_csv(), by_behavior.to_csv(), by_phase.to_csv(),
+        )
+        path = scoring.output_path(out_dir, pid + REPORT_SUFFIX)
+        written = previous.get(pid) != key or not os.path.exists(path)
+        if written:
+            _write_atomic(path, _render_report(out_dir, name, scores, kind, top, weekly, by_behavior, by_phase))
+        entry = {"name": name, "hash": key, "dominant": scores["Dominant Sensitivity"].iloc[0],
+                 "weeks": len(weekly), "met": int(weekly["met"].sum())}
+        results.append((pid, entry, written))
+    return results
+
+
+def _chunks(items, size):
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _write_index(out_dir, manifest):
+    index = pd.DataFrame.from_dict(manifest, orient="index", columns=["name", "hash", "dominant", "weeks", "met"])
+    index = index.iloc[index["name"].str.lower().argsort()]
+    links = [f"<a href='{html.escape(pid + REPORT_SUFFIX)}'>{html.escape(name)}</a>" for pid, name in zip(index.index, index["name"])]
+    cohort = pd.DataFrame({
+        "Participant": links, "Dominant Sensitivity": index["dominant"],
+        "Saved Weeks": index["weeks"], "Weekly Goals Met": index["met"],
+    })
+    _write_atomic(os.path.join(out_dir, INDEX_FILE), (
+        f"<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>Participant reports</title><style>{STYLE}</style></head>"
+        f"<body><h1>Participant Reports ({len(manifest)})</h1>{tables.table_html(cohort, markup=('Participant',))}</body></html>\n"
+    ))
+
+
+def build(input_path, out_dir, log_path=log_store.DEFAULT_PATH, workers=None, chunk_size=200, base_dir="", force=False):
+    """Build the reports of every participant in `input_path`; returns (participants, reports written).
+
+    The manifest and index list only the participants of this run; entries of
+    participants no longer in the input are dropped.
+    """
+    os.makedirs(os.path.join(out_dir, FIGURE_DIR), exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    # Bring the rollups up to date once here; workers only read them
+    rollups.get_rollups(log_path).refresh()
+
+    previous = {pid: entry["hash"] for pid, entry in manifest.items()}
+    chunks = _chunks(latest_records(input_path).items(), chunk_size)
+    count = written = 0
+    current = {}
+
+    def collect(results):
+        nonlocal count, written
+        for pid, entry, was_written in results:
+            current[pid] = entry
+            count += 1
+            written += was_written
+
+    if workers == 0:
+        for chunk in chunks:
+            collect(build_chunk(chunk, out_dir, log_path, previous, base_dir))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # At most two chunks per worker in flight, like batch_assess
+            pending = deque()
+            for chunk in chunks:
+                keys = {participant_id(name): previous.get(participant_id(name)) for name, _ in chunk}
+                pending.append(pool.submit(build_chunk, chunk, out_dir, log_path, keys, base_dir))
+                if len(pending) >= 2 * workers:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+
+    for pid in manifest.keys() - current.keys():
+        logger.info("%s is no longer in the input; dropped from the index", pid)
+    _write_atomic(manifest_path, json.dumps(current, indent=1, sort_keys=True))
+    _write_index(out_dir, current)
+    return count, written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build static HTML reports (assessment summary and weekly sticker history) per participant.")
+    parser.add_argument("input", help="JSONL/CSV file of responses, or a directory of them")
+    parser.add_argument("--out", default="reports", help="Output directory for the reports, figures and index")
+    parser.add_argument("--db", default=log_store.DEFAULT_PATH, help=f"SQLite database path (default: {log_store.DEFAULT_PATH})")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 0 = no pool)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Participants per task")
+    parser.add_argument("--instruments", default="", help="Directory holding the questionnaire CSVs")
+    parser.add_argument("--force", action="store_true", help="Rebuild every report, even if its data is unchanged")
+    args = parser.parse_args(argv)
+
+    count, written = build(args.input, args.out, args.db, args.workers, args.chunk_size, args.instruments, args.force)
+    print(f"{count} participants, {written} report(s) written, {count - written} unchanged; index at {os.path.join(args.out, INDEX_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# Pre-computed cross-week rollups of the weekly sticker logs.
+# Rollup tables live next to the raw logs in the log store's SQLite file and
+# are filled incrementally: refresh() aggregates only the weeks saved since the
+# last refresh (weeks are immutable once saved), so trend, phase and schedule
+# queries read a handful of pre-aggregated rows however many weeks or
+# participants have been logged. Legacy weekly_behavior_log_week{N}.csv files
+# are ingested only when new or changed since the last ingest.
+#
+#   python rollups.py --participant Ronda_Montelli [weekly_behavior_log_week*.csv]
+import argparse
+import glob
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+import log_store
+import schedules
+
+DAYS = log_store.DAYS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_week (
+    participant TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    phase TEXT,
+    schedule TEXT,
+    threshold INTEGER,
+    stickers INTEGER NOT NULL,
+    progress INTEGER NOT NULL,
+    met INTEGER NOT NULL,
+    PRIMARY KEY (participant, week)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_behavior (
+    participant TEXT NOT NULL,
+    behavior TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    stickers INTEGER NOT NULL,
+    PRIMARY KEY (participant, behavior, week)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_day (
+    participant TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    stickers INTEGER NOT NULL,
+    PRIMARY KEY (participant, week, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_group (
+    participant TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    weeks INTEGER NOT NULL,
+    stickers INTEGER NOT NULL,
+    met INTEGER NOT NULL,
+    PRIMARY KEY (participant, dimension, value)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_rollups = {}
+_rollups_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+
+def goal_progress(participant, week, schedule_name, threshold, day_totals):
+    """(progress, met) for a saved week in its schedule's units.
+
+    Interval schedules count intervals with a sticker (their interval length is
+    redrawn from the participant's RNG); ratio and unknown schedules count stickers.
+    """
+    schedule = schedules.SCHEDULES.get(schedule_name)
+    if isinstance(schedule, schedules.IntervalSchedule):
+        goal = schedules.weekly_goal(schedule, participant, week)
+        progress = int(schedule.progress(day_totals, goal))
+    else:
+        progress = int(np.sum(day_totals))
+    return progress, int(threshold is not None and progress >= threshold)
+
+
+class Rollups:
+    """Incrementally maintained weekly, behavior, day, phase and schedule aggregates."""
+
+    def __init__(self, path=log_store.DEFAULT_PATH):
+        self.path = path
+        self.store = log_store.get_store(path)  # creates the raw log tables
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Incremental maintenance ---
+
+    def refresh(self, participant=None):
+        """Aggregate the weeks saved since the last refresh; returns how many were added.
+
+        With nothing new this is a plain read: the write lock is only taken
+        (and the check repeated inside the transaction) when there are weeks to add.
+        """
+        scope, params = ("AND w.participant = ?", (participant,)) if participant is not None else ("", ())
+        sql = ("SELECT w.participant, w.week, w.phase, w.schedule, w.threshold FROM weeks w "
+               "LEFT JOIN rollup_week r ON r.participant = w.participant AND r.week = w.week "
+               f"WHERE r.week IS NULL {scope}")
+        with self._lock:
+            if not self._conn.execute(sql, params).fetchone():
+                return 0
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have aggregated them meanwhile
+                new_weeks = self._conn.execute(sql, params).fetchall()
+                if new_weeks:
+                    self._add_weeks(new_weeks)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(new_weeks)
+
+    def _add_weeks(self, new_weeks):
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS new_weeks (participant TEXT, week INTEGER)")
+        self._conn.execute("DELETE FROM new_weeks")
+        self._conn.executemany("INSERT INTO new_weeks VALUES (?, ?)", [(p, w) for p, w, *_ in new_weeks])
+        # Behavior and day totals straight from the sticker rows of the new weeks only
+        self._conn.execute(
+            "INSERT INTO rollup_behavior SELECT s.participant, s.behavior, s.week, SUM(s.value) "
+            "FROM stickers s JOIN new_weeks n ON s.participant = n.participant AND s.week = n.week "
+            "GROUP BY s.participant, s.behavior, s.week"
+        )
+        day_rows = self._conn.execute(
+            "SELECT s.participant, s.week, s.day, SUM(s.value) "
+            "FROM stickers s JOIN new_weeks n ON s.participant = n.participant AND s.week = n.week "
+            "GROUP BY s.participant, s.week, s.day"
+        ).fetchall()
+        self._conn.executemany("INSERT INTO rollup_day VALUES (?, ?, ?, ?)", day_rows)
+
+        day_totals = {}
+        for participant, week, day, stickers in day_rows:
+            day_totals.setdefault((participant, week), np.zeros(len(DAYS), dtype=int))[day] = stickers
+        week_rows, groups = [], {}
+        for participant, week, phase, schedule, threshold in new_weeks:
+            days = day_totals.get((participant, week), np.zeros(len(DAYS), dtype=int))
+            progress, met = goal_progress(participant, week, schedule, threshold, days)
+            stickers = int(days.sum())
+            week_rows.append((participant, week, phase, schedule, threshold, stickers, progress, met))
+            for dimension, value in (("phase", phase), ("schedule", schedule)):
+                group = groups.setdefault((participant, dimension, value or ""), [0, 0, 0])
+                group[0] += 1
+                group[1] += stickers
+                group[2] += met
+        self._conn.executemany("INSERT INTO rollup_week VALUES (?, ?, ?, ?, ?, ?, ?, ?)", week_rows)
+        self._conn.executemany(
+            "INSERT INTO rollup_group VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (participant, dimension, value) DO UPDATE SET "
+            "weeks = weeks + excluded.weeks, stickers = stickers + excluded.stickers, met = met + excluded.met",
+            [key + tuple(totals) for key, totals in groups.items()],
+        )
+
+    def ingest_files(self, paths, participant):
+        """Import legacy weekly CSV logs that are new or changed since the last ingest, then refresh.
+
+        Saved weeks are immutable, so a changed file for a week already in the
+        store is reported and skipped. Files rejected by the schema check are
+        not recorded as ingested, so a corrected file is imported on the next
+        call. Returns the imported week numbers.
+        """
+        changed = []
+        with self._lock:
+            seen = dict(((p, (m, s)) for p, m, s in self._conn.execute("SELECT path, mtime_ns, size FROM ingested_files")))
+        for path in paths:
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if seen.get(os.path.abspath(path)) != signature:
+                changed.append((path, signature))
+        stored = set(self.store.weeks(participant)["week"].tolist())
+        imported = self.store.import_csv_logs([path for path, _ in changed], participant)
+        loaded = []
+        for path, signature in changed:
+            match = re.search(r"week(\d+)", os.path.basename(path))
+            week = int(match.group(1)) if match else None
+            if week in stored:
+                logger.warning("%s: week %s is already stored and saved weeks are immutable; skipped", path, week)
+            if week in stored or week in imported:
+                loaded.append((path, signature))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ingested_files VALUES (?, ?, ?)",
+                [(os.path.abspath(path), *signature) for path, signature in loaded],
+            )
+        self.refresh(participant)
+        return imported
+
+    # --- Queries (pre-aggregated rows only) ---
+
+    def _query(self, sql, params):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def weekly(self, participant):
+        """One row per saved week: phase, schedule, threshold, stickers, progress and whether the goal was met."""
+        return self._query(
+            "SELECT week, phase, schedule, threshold, stickers, progress, met FROM rollup_week "
+            "WHERE participant = ? ORDER BY week", (participant,),
+        ).set_index("week")
+
+    def by_behavior(self, participant, behaviors=None):
+        """Weeks x behaviors sticker counts."""
+        long = self._query(
+            "SELECT week, behavior, stickers FROM rollup_behavior WHERE participant = ?", (participant,)
+        )
+        grid = long.pivot(index="week", columns="behavior", values="stickers").fillna(0).astype(int)
+        return grid.reindex(columns=list(behaviors), fill_value=0) if behaviors is not None else grid
+
+    def by_day(self, participant):
+        """Weeks x days sticker counts."""
+        long = self._query("SELECT week, day, stickers FROM rollup_day WHERE participant = ?", (participant,))
+        grid = long.pivot(index="week", columns="day", values="stickers").reindex(columns=range(len(DAYS)), fill_value=0)
+        grid.columns = DAYS
+        return grid.fillna(0).astype(int)
+
+    def by_group(self, participant, dimension):
+        """Per phase or schedule: weeks, stickers per week and goal attainment rate."""
+        table = self._query(
+            "SELECT value, weeks, stickers, met FROM rollup_group WHERE participant = ? AND dimension = ? ORDER BY value",
+            (participant, dimension),
+        ).set_index("value")
+        table.index.name = dimension
+        table["stickers_per_week"] = (table["stickers"] / table["weeks"]).round(2)
+        table["attainment_rate"] = (table["met"] / table["weeks"]).round(3)
+        return table
+
+    def week_rows(self, participant=None):
+        """Long rows of rollup_week (participant, week, phase, schedule, threshold, stickers, progress, met)."""
+        scope, params = ("WHERE participant = ?", (participant,)) if participant is not None else ("", ())
+        return self._query(f"SELECT * FROM rollup_week {scope} ORDER BY participant, week", params)
+
+    def behavior_rows(self, participant=None):
+        """Long rows (participant, behavior, week, stickers, phase, schedule) of every behavior-week."""
+        scope, params = ("WHERE b.participant = ?", (participant,)) if participant is not None else ("", ())
+        return self._query(
+            "SELECT b.participant, b.behavior, b.week, b.stickers, w.phase, w.schedule FROM rollup_behavior b "
+            f"JOIN rollup_week w ON w.participant = b.participant AND w.week = b.week {scope} "
+            "ORDER BY b.participant, b.behavior, b.week", params,
+        )
+
+    def version(self):
+        """Number of weeks aggregated so far; saved weeks are immutable, so this changes only when new weeks land."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rollup_week").fetchone()[0]
+
+    def cohort(self):
+        """Per participant: weeks logged, stickers per week and goal attainment rate."""
+        return self._query(
+            "SELECT participant, SUM(weeks) AS weeks, SUM(stickers) * 1.0 / SUM(weeks) AS stickers_per_week, "
+            "SUM(met) * 1.0 / SUM(weeks) AS attainment_rate FROM rollup_group WHERE dimension = 'phase' "
+            "GROUP BY participant ORDER BY participant", (),
+        ).set_index("participant")
+
+
+def get_rollups(path=log_store.DEFAULT_PATH):
+    """Return the process-wide Rollups for a database path."""
+    key = os.path.abspath(path)
+    with _rollups_lock:
+        if key not in _rollups:
+            _rollups[key] = Rollups(key)
+        return _rollups[key]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest weekly CSV logs (new or changed only) and print the history rollups.")
+    parser.add_argument("paths", nargs="*", default=None, help="CSV log files (default: weekly_behavior_log_week*.csv)")
+    parser.add_argument("--participant", required=True)
+    parser.add_argument("--db", default=log_store.DEFAULT_PATH, help=f"SQLite database path (default: {log_store.DEFAULT_PATH})")
+    args = parser.parse_args(argv)
+
+    rollups = Rollups(args.db)
+    imported = rollups.ingest_files(args.paths or sorted(glob.glob("weekly_behavior_log_week*.csv")), args.participant)
+    print(f"Imported {len(imported)} week(s): {imported}")
+    print(rollups.weekly(args.participant).to_string())
+    print()
+    print(rollups.by_group(args.participant, "phase").to_string())
+    print()
+    print(rollups.by_group(args.participant, "schedule").to_string())
+    rollups.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# Reinforcement schedules and an offline Monte Carlo simulator.
+# A schedule turns a participant-week into a goal and decides from the week's
+# per-day sticker counts whether the goal was met. Every method works on whole
+# NumPy arrays, so one call can score a single week in the app or every week
+# of tens of thousands of synthetic participants.
+import argparse
+import zlib
+
+import numpy as np
+import pandas as pd
+
+DAYS_PER_WEEK = 7
+
+
+def participant_rng(participant_id, week=0, seed=0):
+    """Seedable RNG for one participant (and optionally one week).
+
+    The same participant/week/seed always gives the same draws, so a Variable
+    Ratio goal survives reruns and restarts without being stored.
+    """
+    return np.random.default_rng([seed, zlib.crc32(str(participant_id).encode()), int(week)])
+
+
+def _shape(size, week):
+    if size is None:
+        size = ()
+    elif isinstance(size, int):
+        size = (size,)
+    return np.broadcast_shapes(tuple(size), np.shape(week))
+
+
+class Schedule:
+    """Base class: subclasses define goals() and progress()."""
+    name = ""
+    unit = "stickers"
+
+    def goals(self, rng, size=None, week=1):
+        """Draw the per-week schedule parameter (ratio requirement or interval length)."""
+        raise NotImplementedError
+
+    def progress(self, daily_counts, goals):
+        """What counts toward the goal, from (..., 7) per-day sticker counts."""
+        raise NotImplementedError
+
+    def required(self, goals):
+        """How much progress meets the goal."""
+        return np.asarray(goals)
+
+    def met(self, daily_counts, goals):
+        return self.progress(daily_counts, goals) >= self.required(goals)
+
+    def describe(self, goal):
+        return f"Weekly Goal: {self.required(goal)} {self.unit}"
+
+
+class RatioSchedule(Schedule):
+    """Goal is a number of stickers earned during the week."""
+
+    def progress(self, daily_counts, goals):
+        return np.asarray(daily_counts).sum(axis=-1)
+
+
+class FixedRatio(RatioSchedule):
+    def __init__(self, n, name=None):
+        self.n = n
+        self.name = name or f"FR-{n}"
+
+    def goals(self, rng, size=None, week=1):
+        return np.full(_shape(size, week), self.n)
+
+    def describe(self, goal):
+        return f"Weekly Goal: {goal} sticker{'s' if goal != 1 else ''}"
+
+
+class VariableRatio(RatioSchedule):
+    """Goal drawn uniformly from low..high each week (mean (low + high) / 2)."""
+
+    def __init__(self, low, high, name=None):
+        self.low, self.high = low, high
+        self.name = name or f"VR-{(low + high) / 2:g}"
+
+    def goals(self, rng, size=None, week=1):
+        shape = _shape(size, week)
+        return rng.integers(self.low, self.high + 1, size=shape)
+
+    def describe(self, goal):
+        return f"Weekly Goal: Randomly Generated: {goal} stickers"
+
+
+class ProgressiveRatio(RatioSchedule):
+    """Goal grows by `step` stickers every week, starting at `start`."""
+
+    def __init__(self, start, step, name=None):
+        self.start, self.step = start, step
+        self.name = name or f"PR-{start}+{step}"
+
+    def goals(self, rng, size=None, week=1):
+        week = np.asarray(week)
+        shape = _shape(size, week)
+        return np.broadcast_to(self.start + self.step * (week - 1), shape).copy()
+
+    def describe(self, goal):
+        return f"Weekly Goal: Progressive: {goal} stickers"
+
+
+class IntervalSchedule(Schedule):
+    """The week is split into intervals of `goal` days; each interval needs at least one sticker."""
+    unit = "intervals"
+
+    def progress(self, daily_counts, goals):
+        active = np.asarray(daily_counts) > 0
+        lengths = np.asarray(goals)[..., None]
+        window = np.arange(DAYS_PER_WEEK) // lengths
+        # One-hot (day, window) membership, then count windows holding any sticker
+        hits = (window[..., None] == np.arange(DAYS_PER_WEEK)) & active[..., None]
+        return hits.any(axis=-2).sum(axis=-1)
+
+    def required(self, goals):
+        return -(-DAYS_PER_WEEK // np.asarray(goals))
+
+    def describe(self, goal):
+        return f"Weekly Goal: a sticker every {goal} day{'s' if goal != 1 else ''} ({self.required(goal)} intervals)"
+
+
+class FixedInterval(IntervalSchedule):
+    def __init__(self, days, name=None):
+        self.days = days
+        self.name = name or f"FI-{days}d"
+
+    def goals(self, rng, size=None, week=1):
+        return np.full(_shape(size, week), self.days)
+
+
+class VariableInterval(IntervalSchedule):
+    """Interval length drawn uniformly from low..high days each week."""
+
+    def __init__(self, low, high, name=None):
+        self.low, self.high = low, high
+        self.name = name or f"VI-{(low + high) / 2:g}d"
+
+    def goals(self, rng, size=None, week=1):
+        shape = _shape(size, week)
+        return rng.integers(self.low, self.high + 1, size=shape)
+
+    def describe(self, goal):
+        return f"Weekly Goal: Randomly Generated: a sticker every {goal} day{'s' if goal != 1 else ''} ({self.required(goal)} intervals)"
+
+
+# Schedules offered in the sticker chart, keyed by the name stored in the weekly logs
+SCHEDULES = {
+    "Continuous": FixedRatio(1, name="Continuous"),
+    "Fixed Ratio": FixedRatio(15, name="Fixed Ratio"),
+    "Variable Ratio": VariableRatio(15, 30, name="Variable Ratio"),
+    "Progressive Ratio": ProgressiveRatio(10, 5, name="Progressive Ratio"),
+    "Fixed Interval": FixedInterval(2, name="Fixed Interval"),
+    "Variable Interval": VariableInterval(1, 3, name="Variable Interval"),
+}
+
+
+def weekly_goal(schedule, participant_id, week):
+    """The goal a participant faces in a given week (reproducible per participant/week)."""
+    return int(schedule.goals(participant_rng(participant_id, week), week=week))
+
+
+def simulate(schedule, n_participants=10000, n_weeks=6, n_behaviors=11, completion=(2.0, 3.0), seed=0):
+    """Run a schedule against synthetic participants' weekly sticker distributions.
+
+    Each participant gets a daily completion probability per behavior drawn from
+    Beta(*completion); daily sticker counts are Binomial(n_behaviors, p). Returns a
+    dict of reinforcement/punisher rates and sticker statistics.
+    """
+    rng = np.random.default_rng(seed)
+    p = rng.beta(*completion, size=(n_participants, 1, 1))
+    daily = rng.binomial(n_behaviors, p, size=(n_participants, n_weeks, DAYS_PER_WEEK))
+    weeks = np.broadcast_to(np.arange(1, n_weeks + 1), (n_participants, n_weeks))
+    goals = schedule.goals(rng, (n_participants, n_weeks), week=weeks)
+    met = schedule.met(daily, goals)
+    return {
+        "schedule": schedule.name,
+        "participants": n_participants,
+        "weeks": n_weeks,
+        "reinforcement_rate": float(met.mean()),
+        "punisher_rate": float(1 - met.mean()),
+        "never_reinforced": float((~met.any(axis=1)).mean()),
+        "mean_weekly_stickers": float(daily.sum(axis=-1).mean()),
+        "mean_required": float(np.mean(schedule.required(goals))),
+    }
+
+
+def compare(schedules=None, **kwargs):
+    """Simulate several schedules on the same synthetic cohort (same seed) and tabulate the results."""
+    schedules = schedules or list(SCHEDULES.values())
+    return pd.DataFrame([simulate(s, **kwargs) for s in schedules]).set_index("schedule")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare reinforcement schedules on synthetic participants.")
+    parser.add_argument("--participants", type=int, default=10000)
+    parser.add_argument("--weeks", type=int, default=6)
+    parser.add_argument("--behaviors", type=int, default=11)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    results = compare(n_participants=args.participants, n_weeks=args.weeks, n_behaviors=args.behaviors, seed=args.seed)
+    print(results.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# Declared schemas for every CSV file the apps and batch jobs read.
+# Each file kind (questionnaire, target behaviors, reinforcer/punisher export,
+# weekly log) has fixed columns and dtypes, so parsing skips type inference and
+# uses pyarrow's CSV reader when it is installed. Many files are parsed into
+# one frame and validated together with grouped, vectorized checks: a file
+# with bad values is rejected (SchemaError), and a weekly log whose stored
+# Total_Stickers_Earned disagrees with its day columns is repaired (or rejected).
+#
+#   python schemas.py weekly_behavior_log_week*.csv [--reject]
+import argparse
+import importlib.util
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+WEEK_COLUMNS = ["Phase", "Schedule", "Weekly_Threshold_Goal", "Log_Timestamp"]
+# pyarrow (optional) parses straight into the declared column types
+ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaError(ValueError):
+    """A CSV file that doesn't match its declared schema."""
+
+
+@dataclass(frozen=True)
+class Schema:
+    """Columns (in file order) and dtypes of one file kind."""
+    kind: str
+    columns: dict
+    optional: tuple = ()
+    unique: tuple = ()
+    index: str = None  # name for the first column when it holds row labels (its header is ignored)
+    check: object = field(default=None, compare=False)
+
+    @property
+    def required(self):
+        return ([self.index] if self.index else []) + [c for c in self.columns if c not in self.optional]
+
+
+# Per-kind checks take the combined frame of every file (`source` is the file's
+# position in `paths`) and return it with derived or repaired columns, plus
+# {source: message} for the files to reject.
+
+def _groups(frame):
+    """(first row of each file, file number of each row); a file's rows are contiguous."""
+    source = frame["source"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, source[1:] != source[:-1]])
+    return starts, np.cumsum(np.r_[False, source[1:] != source[:-1]])
+
+
+def _first_bad(frame, bad, column):
+    """{source: offending value} for the first bad row of each file."""
+    if not bad.any():
+        return {}
+    return frame.loc[bad, ["source", column]].drop_duplicates("source").set_index("source")[column].to_dict()
+
+
+def _check_instrument(frame, paths, on_mismatch):
+    bad = ~frame["type"].str.lower().isin(["reward", "punishment"]).to_numpy()
+    problems = {
+        source: f"unknown item type {value!r} (expected reward or punishment)"
+        for source, value in _first_bad(frame, bad, "type").items()
+    }
+    return frame, problems
+
+
+def _check_sticker_export(frame, paths, on_mismatch):
+    bad = ~frame["qid"].str.fullmatch(r"(RSS|ASQ)_\d+").to_numpy()
+    problems = {
+        source: f"malformed qid {value!r} (expected RSS_<n> or ASQ_<n>)"
+        for source, value in _first_bad(frame, bad, "qid").items()
+    }
+    frame["label"] = np.where(frame["qid"].str.startswith("RSS"), "Reward", "Punisher")
+    return frame, problems
+
+
+def _check_weekly_log(frame, paths, on_mismatch):
+    problems = {}
+    starts, group = _groups(frame)
+    sources = frame["source"].to_numpy()[starts]
+    days = frame[DAYS].to_numpy()
+    for source in np.unique(frame["source"].to_numpy()[~np.isin(days, (0, 1)).all(axis=1)]):
+        problems[source] = "day columns must hold 0 or 1"
+    for column in WEEK_COLUMNS:
+        values = frame[column].to_numpy()
+        for source in np.unique(sources[group[values != values[starts][group]]]):
+            problems.setdefault(source, f"week fields differ between rows ({column})")
+
+    # Total_Stickers_Earned repeats the week's total on every row; the day columns are authoritative
+    totals = np.add.reduceat(days.sum(axis=1, dtype=np.int64), starts)
+    stored = frame["Total_Stickers_Earned"].to_numpy()[starts]
+    for source, was, total in zip(sources[stored != totals], stored[stored != totals], totals[stored != totals]):
+        if source in problems:
+            continue
+        if on_mismatch == "reject":
+            problems[source] = f"Total_Stickers_Earned is {was} but the day columns sum to {total}"
+        else:
+            logger.warning("%s: Total_Stickers_Earned %d repaired to %d (sum of the day columns)", paths[source], was, total)
+    frame["Total_Stickers_Earned"] = totals[group]
+    return frame, problems
+
+
+SCHEMAS = {
+    "instrument": Schema(
+        "instrument", {"id": "int64", "question": "str", "type": "str"},
+        unique=("id",), check=_check_instrument,
+    ),
+    "target_behaviors": Schema(
+        "target_behaviors", {"id_rank": "int64", "target_behavior": "str", "modified_behavior": "str"},
+        unique=("target_behavior",),
+    ),
+    "sticker_export": Schema(
+        "sticker_export", {"qid": "str", "question": "str", "response": "int64"},
+        optional=("question",), unique=("qid",), check=_check_sticker_export,
+    ),
+    "weekly_log": Schema(
+        "weekly_log",
+        {**{day: "int8" for day in DAYS}, "Phase": "str", "Schedule": "str",
+         "Weekly_Threshold_Goal": "int64", "Total_Stickers_Earned": "int64", "Log_Timestamp": "str"},
+        index="behavior", unique=("behavior",), check=_check_weekly_log,
+    ),
+}
+
+
+def kind_for(path):
+    """Guess a file's schema from its name (None if it isn't a known kind)."""
+    name = os.path.basename(path)
+    if name.endswith("_questions.csv"):
+        return "instrument"
+    if name == "target_behaviors.csv":
+        return "target_behaviors"
+    if name.endswith("_sticker_data.csv"):
+        return "sticker_export"
+    if re.fullmatch(r"weekly_behavior_log_week\d+\.csv", name):
+        return "weekly_log"
+    return None
+
+
+def _parse(path, schema, source):
+    """One file as a pyarrow Table (a DataFrame without pyarrow) of its declared columns plus `source`."""
+    if ENGINE == "pyarrow":
+        # pyarrow.csv directly rather than pandas' engine="pyarrow", which infers
+        # types first (turning ISO timestamps into datetimes) and only then casts
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        types = {
+            column: pa.string() if dtype == "str" else pa.from_numpy_dtype(np.dtype(dtype))
+            for column, dtype in schema.columns.items()
+        }
+        table = pa_csv.read_csv(
+            path,
+            read_options=pa_csv.ReadOptions(use_threads=False),  # files are small; threads cost more than they save
+            convert_options=pa_csv.ConvertOptions(column_types=types, strings_can_be_null=True),
+        )
+        names = table.column_names
+    else:
+        table = pd.read_csv(path, dtype=schema.columns, engine="c")
+        names = list(table.columns)
+    if schema.index and names:
+        names = [schema.index] + names[1:]
+    missing = [column for column in schema.columns if column not in names and column not in schema.optional]
+    if missing:
+        raise SchemaError(f"{path}: missing column(s) {', '.join(missing)}")
+    declared = ([schema.index] if schema.index else []) + [column for column in schema.columns if column in names]
+    if ENGINE == "pyarrow":
+        table = table.rename_columns(names).select(declared)
+        return table.append_column("source", pa.array(np.full(table.num_rows, source, dtype=np.int32)))
+    table.columns = names
+    return table[declared].assign(source=np.int32(source))
+
+
+def read_many(paths, kind, on_mismatch="repair"):
+    """Parse and validate many CSV files of one kind in a single pass.
+
+    Returns (frame, rejected): one DataFrame with the rows of every valid file,
+    a `source` column giving each row's position in `paths` and the declared
+    columns with their dtypes; and {path: SchemaError} for the files rejected
+    for missing columns, empty or unparsable values, duplicate keys or (with
+    on_mismatch="reject") aggregates that disagree with their detail columns.
+    """
+    schema = SCHEMAS[kind]
+    paths = list(paths)
+    parts, problems = [], {}
+    for source, path in enumerate(paths):
+        try:
+            parts.append(_parse(path, schema, source))
+        except SchemaError as exc:
+            problems[source] = exc
+        except (ValueError, TypeError) as exc:
+            problems[source] = SchemaError(f"{path}: {exc}")
+    if not parts:
+        columns = ([schema.index] if schema.index else []) + list(schema.columns)
+        frame = pd.DataFrame({column: pd.Series(dtype=schema.columns.get(column, "str")) for column in columns})
+        frame["source"] = pd.Series(dtype=np.int32)
+    elif ENGINE == "pyarrow":
+        import pyarrow as pa
+        frame = pa.concat_tables(parts, promote_options="default").to_pandas()
+    else:
+        frame = pd.concat(parts, ignore_index=True)
+
+    def reject(found):
+        for source, message in found.items():
+            problems.setdefault(source, SchemaError(f"{paths[source]}: {message}"))
+
+    empty = np.zeros(len(frame), dtype=bool)
+    for column in schema.required:
+        empty |= frame[column].isna().to_numpy()
+    if empty.any():
+        starts, group = _groups(frame)
+        row = np.arange(len(frame)) - starts[group] + 1
+        source = frame["source"].to_numpy()
+        reject({s: f"empty value(s) on data row(s) {row[empty & (source == s)].tolist()[:10]}" for s in np.unique(source[empty])})
+    for column in schema.unique:
+        duplicated = frame.duplicated(["source", column]).to_numpy()
+        reject({source: f"duplicate {column} {value!r}" for source, value in _first_bad(frame, duplicated, column).items()})
+    if problems:
+        frame = frame[~frame["source"].isin(list(problems))].reset_index(drop=True)
+    if schema.check is not None and len(frame):
+        frame, found = schema.check(frame, paths, on_mismatch)
+        reject(found)
+        if found:
+            frame = frame[~frame["source"].isin(list(found))].reset_index(drop=True)
+    return frame, {paths[source]: error for source, error in sorted(problems.items())}
+
+
+def read_csv(path, kind, on_mismatch="repair"):
+    """Parse and validate one CSV file; raises SchemaError if it is rejected.
+
+    Files whose first column holds row labels (weekly logs) come back indexed by it.
+    """
+    frame, rejected = read_many([path], kind, on_mismatch)
+    if rejected:
+        raise rejected[path]
+    frame = frame.drop(columns="source")
+    schema = SCHEMAS[kind]
+    if schema.index:
+        frame = frame.set_index(schema.index).rename_axis(None)
+    return frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate CSV files against their declared schemas.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--kind", choices=sorted(SCHEMAS), help="Schema to check against (default: guessed from the file name)")
+    parser.add_argument("--reject", action="store_true", help="Treat aggregate mismatches as errors instead of repairing them")
+    args = parser.parse_args(argv)
+    logging.basicConfig(format="%(levelname)s %(message)s")
+
+    by_kind = {}
+    for path in args.paths:
+        by_kind.setdefault(args.kind or kind_for(path), []).append(path)
+    unknown = by_kind.pop(None, [])
+    for path in unknown:
+        print(f"{path}: unknown file kind (pass --kind)")
+    failed = len(unknown)
+    for kind, paths in by_kind.items():
+        frame, rejected = read_many(paths, kind, on_mismatch="reject" if args.reject else "repair")
+        rows = frame["source"].value_counts()
+        for source, path in enumerate(paths):
+            print(rejected[path] if path in rejected else f"{path}: ok ({kind}, {rows.get(source, 0)} rows)")
+        failed += len(rejected)
+    print(f"Checked {len(args.paths)} file(s) with the {ENGINE} engine, {failed} rejected")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
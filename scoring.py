@@ -0,0 +1,149 @@
+# Scoring engine for the SPSRQ, RSS and ASQ questionnaires.
+# Works on a respondents x items response matrix so one participant
+# (a single row) and a whole intake cohort go through the same code path.
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Response key prefix used by each questionnaire page ("Q12", "RSS_4", "ASQ_7")
+ITEM_PREFIX = {
+    "spsrq": "Q",
+    "rss": "RSS_",
+    "asq": "ASQ_",
+}
+
+TOP_N = 5
+# Participant names become file names (exports, reports): a word character, then
+# only word characters, spaces and . , ' - (never a path separator)
+NAME_PATTERN = re.compile(r"\w[\w .,'-]*")
+
+
+def item_keys(instrument_df, kind):
+    """Return the response keys (e.g. 'RSS_4') for every item of an instrument, in file order."""
+    prefix = ITEM_PREFIX[kind]
+    return [f"{prefix}{i}" for i in instrument_df["id"].tolist()]
+
+
+def response_matrix(responses, instrument_df, kind):
+    """Build a respondents x items float matrix from response dicts.
+
+    `responses` is one {key: value} dict or a list of them. Unanswered items are NaN.
+    """
+    if isinstance(responses, dict):
+        responses = [responses]
+    keys = item_keys(instrument_df, kind)
+    matrix = np.full((len(responses), len(keys)), np.nan)
+    for r, answers in enumerate(responses):
+        matrix[r] = [answers.get(k, np.nan) for k in keys]
+    return matrix
+
+
+def score_spsrq(matrix, spsrq_df, prorate=False):
+    """Score SPSRQ responses for every respondent in one pass.
+
+    Returns a DataFrame with one row per respondent holding the SR/SP totals,
+    means and SDs, the dominant sensitivity and the follow-up questionnaire
+    ("rss" or "asq"). Ties go to the RSS as positive conditioning preference.
+
+    With `prorate`, unanswered items are left out instead of counting as 0:
+    means and SDs cover the answered items and totals are the mean times the
+    subscale length (for partial, adaptive administrations).
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+    types = spsrq_df["type"].str.lower().to_numpy()
+    # Missing answers count as 0, matching the original per-item lookups
+    filled = np.nan_to_num(matrix, nan=0.0)
+
+    scores = {}
+    projected = {}
+    for label, q_type in (("reward", "reward"), ("punishment", "punishment")):
+        block = filled[:, types == q_type]
+        n_items = block.shape[1]
+        if prorate:
+            answered = ~np.isnan(matrix[:, types == q_type])
+            n = answered.sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = block.sum(axis=1) / n
+                sd = np.sqrt(((block - mean[:, None]) ** 2 * answered).sum(axis=1) / (n - 1))
+            total = np.nan_to_num(mean * n_items)
+            projected[label] = total
+            scores[f"{label}_total"] = np.round(total)
+            scores[f"{label}_mean"] = np.round(mean, 2)
+            scores[f"{label}_sd"] = np.round(np.where(n > 1, sd, np.nan), 2)
+            continue
+        total = block.sum(axis=1)
+        projected[label] = total
+        scores[f"{label}_total"] = total
+        scores[f"{label}_mean"] = np.round(total / n_items, 2) if n_items else np.full(len(total), np.nan)
+        scores[f"{label}_sd"] = np.round(block.std(axis=1, ddof=1), 2) if n_items > 1 else np.full(len(total), np.nan)
+
+    result = pd.DataFrame(scores)
+    # Decide on the unrounded (projected) totals
+    reward_wins = projected["reward"] >= projected["punishment"]
+    result["dominant"] = np.where(reward_wins, "Reward", "Punishment")
+    result["sensitivity"] = np.where(reward_wins, "rss", "asq")
+    return result
+
+
+def top_stimuli(matrix, instrument_df, kind, n=TOP_N):
+    """Return the n highest-rated items for every respondent.
+
+    The result is a long DataFrame (respondent, rank, qid, question, response).
+    Ties keep questionnaire order. Unanswered items are never selected.
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+    keys = np.array(item_keys(instrument_df, kind))
+    questions = instrument_df["question"].to_numpy()
+
+    # Stable descending sort with NaN pushed to the end
+    order = np.argsort(np.where(np.isnan(matrix), np.inf, -matrix), axis=1, kind="stable")[:, :n]
+    values = np.take_along_axis(matrix, order, axis=1)
+
+    respondent = np.repeat(np.arange(matrix.shape[0]), order.shape[1])
+    rank = np.tile(np.arange(1, order.shape[1] + 1), matrix.shape[0])
+    flat_order = order.ravel()
+    flat_values = values.ravel()
+    answered = ~np.isnan(flat_values)
+
+    top = pd.DataFrame({
+        "respondent": respondent[answered],
+        "rank": rank[answered],
+        "qid": keys[flat_order[answered]],
+        "question": questions[flat_order[answered]],
+        "response": flat_values[answered].astype(int),
+    })
+    return top
+
+
+def valid_name(participant_name):
+    """Whether a participant name can be used in file names (see NAME_PATTERN)."""
+    return isinstance(participant_name, str) and NAME_PATTERN.fullmatch(participant_name.strip()) is not None
+
+
+def participant_id(participant_name):
+    """File-safe id of a participant name (e.g. 'Ronda_Montelli'); ValueError for an invalid name."""
+    if not valid_name(participant_name):
+        raise ValueError(f"Invalid participant name {participant_name!r}: use letters, digits, spaces and . , ' - only")
+    return participant_name.strip().replace(" ", "_")
+
+
+def sticker_filename(participant_name):
+    """File name of a participant's reinforcer/punisher export (e.g. 'Ronda_Montelli_sticker_data.csv')."""
+    return f"{participant_id(participant_name)}_sticker_data.csv"
+
+
+def output_path(directory, filename):
+    """Path of `filename` in `directory`; ValueError if it would resolve outside the directory."""
+    base = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(base, filename))
+    if os.path.dirname(path) != base:
+        raise ValueError(f"{filename!r} is not a file name inside {directory}")
+    return path
+
+
+def sticker_export(top_df, respondent=0):
+    """Slice one respondent's rows out of `top_stimuli` in the format sticker_chart.py reads."""
+    rows = top_df[top_df["respondent"] == respondent]
+    return rows[["qid", "question", "response"]].reset_index(drop=True)
@@ -0,0 +1,138 @@
+# Per-page startup and import-time profiling for the Streamlit entry points.
+# Each script run records how long its phases take and which deferred modules
+# it imported (and how many modules each import pulled in), in the spirit of
+# `python -X importtime` but broken down per page. Reports are kept per page
+# in the process; run `python startup_profile.py` for a cold-start report of
+# both apps, or add `?profile=1` to the app URL to see the live report.
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+import metrics
+
+HISTORY = 50
+
+_lock = threading.Lock()
+_cold = {}                                    # page -> first report in this process
+_recent = {}                                  # page -> deque of recent reports
+
+
+class StartupProfile:
+    """Timing marks and deferred imports for one run of one page."""
+
+    def __init__(self, page):
+        self.page = page
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.rows = []  # (kind, name, ms, new_modules)
+        self._profiler = metrics.begin_rerun(page)
+
+    def mark(self, label):
+        """Record the time since the previous mark."""
+        now = time.perf_counter()
+        self.rows.append(("phase", label, (now - self.last) * 1000, 0))
+        self.last = now
+
+    def import_module(self, name):
+        """Import a module on first use and record what it cost."""
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        before = len(sys.modules)
+        t0 = time.perf_counter()
+        module = importlib.import_module(name)
+        self.rows.append(("import", name, (time.perf_counter() - t0) * 1000, len(sys.modules) - before))
+        return module
+
+    def finish(self, last="rest of page"):
+        """Close the run, file it under its page and hand its phases to the rerun metrics."""
+        self.mark(last)
+        report = {
+            "page": self.page,
+            "total_ms": (time.perf_counter() - self.start) * 1000,
+            "rows": list(self.rows),
+        }
+        phases = [(name, ms) for kind, name, ms, _ in self.rows if kind == "phase"]
+        metrics.end_rerun(self.page, report["total_ms"], phases, self._profiler)
+        with _lock:
+            _cold.setdefault(self.page, report)
+            _recent.setdefault(self.page, deque(maxlen=HISTORY)).append(report)
+        return report
+
+
+def begin(page):
+    return StartupProfile(page)
+
+
+def reports(page=None):
+    """(cold report, recent reports) for one page, or a dict of both for every page."""
+    with _lock:
+        if page is not None:
+            return _cold.get(page), list(_recent.get(page, ()))
+        return {p: (_cold[p], list(_recent[p])) for p in _cold}
+
+
+def format_report(report):
+    lines = [f"page: {report['page']}  total: {report['total_ms']:.1f} ms",
+             f"{'kind':<7} | {'ms':>9} | {'new modules':>11} | name"]
+    for kind, name, ms, new_modules in report["rows"]:
+        lines.append(f"{kind:<7} | {ms:9.1f} | {new_modules:11d} | {name}")
+    return "\n".join(lines)
+
+
+def enabled():
+    if os.environ.get("OPERANT_PROFILE"):
+        return True
+    try:
+        import streamlit as st
+        return st.query_params.get("profile") == "1"
+    except Exception:
+        return False
+
+
+def show(profile, last="rest of page"):
+    """Finish a run and, when profiling is enabled, show the cold and latest reports on the page."""
+    report = profile.finish(last)
+    if not enabled():
+        return
+    import streamlit as st
+    cold, _ = reports(profile.page)
+    with st.expander("⏱️ Startup profile"):
+        st.code(format_report(cold), language=None)
+        if report is not cold:
+            st.code(format_report(report), language=None)
+
+
+# Code run in a fresh interpreter for the cold-start CLI report
+_CHILD = """
+import os, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness_ms = (time.perf_counter() - t0) * 1000
+sys.path.insert(0, os.getcwd())
+AppTest.from_file(os.path.abspath(sys.argv[1]), default_timeout=120).run()
+import startup_profile
+cold, _ = startup_profile.reports(sys.argv[2])
+print(f"(streamlit + test harness import: {harness_ms:.1f} ms)")
+print(startup_profile.format_report(cold) if cold else "no report recorded")
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start report for each Streamlit page (fresh interpreter per page).")
+    parser.add_argument("pages", nargs="*", default=["behavior_assessment.py", "sticker_chart.py"])
+    args = parser.parse_args(argv)
+    for page in args.pages:
+        name = os.path.splitext(os.path.basename(page))[0]
+        result = subprocess.run([sys.executable, "-c", _CHILD, page, name], capture_output=True, text=True)
+        print(result.stdout.strip() or result.stderr.strip())
+        print()
+
+
+if __name__ == "__main__":
+    main()
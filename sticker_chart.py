@@ -1,54 +1,137 @@
 #program by Marcus C. Rodriguez PSYC-3220-U71 06/10/2025
 import streamlit as st
-import pandas as pd
-import datetime
 import os
-import random # Import random module
+import startup_profile
+import checkpoint
+import metrics
+
+# Every module below is needed on each run; importing them through the
+# startup profile makes their cold-start cost visible in the report
+profile = startup_profile.begin("sticker_chart")
+log_store = profile.import_module("log_store")
+sticker_matrix = profile.import_module("sticker_matrix")
+schedules = profile.import_module("schedules")
+sticker_events = profile.import_module("sticker_events")
+rollups = profile.import_module("rollups")
+effects = profile.import_module("effects")
+participants = profile.import_module("participants")
+tables = profile.import_module("tables")
+profile.mark("imports")
 
 # --- Configuration and Data Loading ---
 sticker_path = "Ronda_Montelli_sticker_data.csv"
 behavior_path = "target_behaviors.csv"
-
-# Load behavior and reinforcer/punisher data
-if os.path.exists(sticker_path) and os.path.exists(behavior_path):
-    reinforcer_df = pd.read_csv(sticker_path)
-    target_df = pd.read_csv(behavior_path)
+log_path = log_store.DEFAULT_PATH
+# Cohort mode: one process serves every *_sticker_data.csv export in this directory (see participants.py)
+COHORT_DIR = os.environ.get("OPERANT_COHORT_DIR")
+
+store = log_store.get_store(log_path)
+events = sticker_events.get_event_log(log_path)
+
+if COHORT_DIR:
+    roster = participants.get_roster(COHORT_DIR, behavior_path)
+    cohort_ids = roster.ids()
+    if not cohort_ids:
+        st.error(f"No participant exports (*_sticker_data.csv) were found in '{COHORT_DIR}'.")
+        st.stop()
+    # ?participant=<id> links a session straight to one participant
+    requested = st.query_params.get("participant")
+    selected_id = st.sidebar.selectbox(
+        "Participant", cohort_ids,
+        index=cohort_ids.index(requested) if requested in cohort_ids else 0,
+        key="participant_selector",
+    )
+    st.query_params["participant"] = selected_id
+    participant = roster.get(selected_id)
 else:
-    st.error("Required data files are missing. Please ensure 'Ronda_Montelli_sticker_data.csv' and 'target_behaviors.csv' are in the same directory.")
+    participant = participants.Participant.from_export(sticker_path, behavior_path)
+# Weekly logs are keyed by participant (e.g. "Ronda_Montelli" from the sticker export name)
+participant_id = participant.id
+
+# Behavior and reinforcer/punisher data and the saved sticker history come from the
+# process-wide participant pool (loaded on first use, least recently used evicted)
+try:
+    resident = participants.get_pool(log_path).get(participant)
+except FileNotFoundError:
+    st.error(f"Required data files are missing. Please ensure '{os.path.basename(participant.sticker_path)}' and '{os.path.basename(participant.behavior_path)}' are in the same directory.")
     st.stop()
+config = resident.config
 
-# Process reinforcer data
-reinforcer_df['label'] = reinforcer_df['qid'].apply(lambda x: "Reward" if x.startswith("RSS") else "Punisher")
-reinforcer_type = reinforcer_df['label'].iloc[0]
-reinforcer_list = reinforcer_df['qid'].tolist()
-
-# Assuming a 'description' column in Ronda_Montelli_sticker_data.csv for display
-if 'question' in reinforcer_df.columns:
-    reinforcer_description_map = dict(zip(reinforcer_df['qid'], reinforcer_df['question']))
-else:
-    reinforcer_description_map = {qid: qid for qid in reinforcer_df['qid']} # Fallback to QID if no description
+reinforcer_type = config.reinforcer_type
+reinforcer_list = config.reinforcer_list
+reinforcer_description_map = config.reinforcer_description_map
+behavior_map = config.behavior_map
+behaviors = list(config.behaviors) # Use target behaviors for the sticker chart index
 
-# Map target behaviors to modified behaviors (for display purposes)
-behavior_map = dict(zip(target_df['target_behavior'], target_df['modified_behavior']))
-behaviors = target_df['target_behavior'].tolist() # Use target behaviors for the sticker chart index
+profile.mark("load")
 
 # --- Session State Initialization ---
+# Switching participants (cohort mode) starts from the new participant's own state;
+# saves still pending for the previous participant land without a confirmation
+if st.session_state.get("participant_id") != participant_id:
+    for field in ("checkpoint", "phase", "week_counter", "selected_schedule", "sticker_history", "pending_saves", "schedule_selector"):
+        st.session_state.pop(field, None)
+    st.session_state.participant_id = participant_id
+
+# Phase, schedule and the unsaved ticks of the week being logged are checkpointed
+# per participant, so a browser refresh or server restart doesn't lose them
+if "checkpoint" not in st.session_state:
+    st.session_state.checkpoint = checkpoint.Checkpoint("sticker_chart", participant_id)
+    restored = st.session_state.checkpoint.restore()
+    for field in ("phase", "selected_schedule"):
+        if field in restored:
+            st.session_state[field] = restored[field]
+else:
+    restored = {}
+# Without a checkpoint, continue from the participant's last stored week
 if 'phase' not in st.session_state:
-    st.session_state.phase = "Phase I"
+    st.session_state.phase = resident.phase or "Phase I"
 if 'week_counter' not in st.session_state:
-    st.session_state.week_counter = 0 # Initialize week counter
+    st.session_state.week_counter = resident.latest_week
 
-# Initialize schedule and variable ratio threshold
+# Initialize schedule (goals are drawn from a per-participant, per-week seeded RNG, see schedules.py)
 if 'selected_schedule' not in st.session_state:
-    st.session_state.selected_schedule = "Continuous" # Default schedule
-if 'variable_ratio_threshold' not in st.session_state:
-    st.session_state.variable_ratio_threshold = 0 # Will be set dynamically
-
-# Initialize sticker_data for weekly tracking if not already present
-if "sticker_data" not in st.session_state:
-    days_of_week = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-    # Initialize DataFrame with False values
-    st.session_state.sticker_data = pd.DataFrame(False, index=target_df['modified_behavior'].tolist(), columns=days_of_week)
+    st.session_state.selected_schedule = resident.schedule if resident.schedule in schedules.SCHEDULES else "Continuous" # Default schedule
+
+# Initialize the bit-packed sticker history (all stored weeks plus the current one) if not already present;
+# each session edits its own copy of the participant's shared saved history
+if "sticker_history" not in st.session_state:
+    st.session_state.sticker_history = resident.history.copy()
+sticker_history = st.session_state.sticker_history
+
+# Weekly saves run on the log store's background writer; pick up the ones that finished
+if "pending_saves" not in st.session_state:
+    st.session_state.pending_saves = [] # (future, expected week, saved grid)
+for pending in [p for p in st.session_state.pending_saves if p[0].done()]:
+    future, expected_week, _ = pending
+    st.session_state.pending_saves.remove(pending)
+    try:
+        saved_week = future.result()
+    except Exception as exc:
+        # Step back to the unsaved week; its stickers are still in the history
+        st.session_state.week_counter = min(st.session_state.week_counter, expected_week - 1)
+        st.error(f"Saving week {expected_week} failed ({exc}). Press Reset again to retry.")
+    else:
+        if saved_week != expected_week:
+            # Another session saved first and the store filed this week under a later number:
+            # take the saved weeks as the store numbers them and move the week being logged
+            # (and any saves still pending) after it, so history, rollups and download agree
+            unsaved = sticker_history.week_bytes(st.session_state.week_counter + 1)
+            resident = participants.get_pool(log_path).get(participant)
+            sticker_history = st.session_state.sticker_history = resident.history.copy()
+            shift = saved_week - expected_week
+            st.session_state.pending_saves = [(f, week + shift, df) for f, week, df in st.session_state.pending_saves]
+            st.session_state.week_counter += shift
+            sticker_history.load_week_bytes(st.session_state.week_counter + 1, unsaved)
+            sticker_history.set_week_info(st.session_state.week_counter + 1, st.session_state.phase, st.session_state.selected_schedule)
+        st.success(f"Sticker chart reset for the new week! Log saved as **week {saved_week}**")
+
+current_week = st.session_state.week_counter + 1 # Week being logged
+# A checkpoint of a week that has since been saved is stale and ignored
+if restored.get("week") == current_week:
+    sticker_history.load_week_bytes(current_week, restored["stickers"])
+
+profile.mark("session state")
 
 # --- Streamlit App Layout ---
 st.title("🎯 Digital Sticker Chart Tracker")
@@ -62,29 +145,6 @@ st.subheader("🧭 Target Behaviors and Goals")
 for tb, mb in behavior_map.items():
     st.markdown(f"- **{tb}** → _{mb}_")
 
-st.markdown("---")
-st.subheader("📅 Log Weekly Behavior")
-st.markdown("""
-Use the checkboxes below to track completion of daily behaviors for the week.
-Each checkmark represents a "sticker" earned for completing a task on that day.
-""")
-
-# Form for weekly progress submission
-with st.form("weekly_sticker_form"):
-    for behavior in st.session_state.sticker_data.index:
-        st.markdown(f"**{behavior}**")
-        cols = st.columns(len(st.session_state.sticker_data.columns))
-        for i, day in enumerate(st.session_state.sticker_data.columns):
-            # Ensure unique key for each checkbox using current behavior, day, and a stable identifier
-            key = f"checkbox_{behavior}_{day}_{st.session_state.week_counter}"
-            current_value = st.session_state.sticker_data.at[behavior, day]
-            # Update the DataFrame directly with the checkbox state
-            st.session_state.sticker_data.at[behavior, day] = cols[i].checkbox(day, value=current_value, key=key)
-    submitted = st.form_submit_button("Save Weekly Progress")
-
-if submitted:
-    st.success("✅ Weekly progress updated!")
-
 # --- Phase & Schedule Controls ---
 st.markdown("---")
 col1, col2 = st.columns(2) # Keep layout for consistency, though one button is removed
@@ -96,7 +156,7 @@ with col1:
 
 with col2:
     # Dropdown for Schedule Selection
-    schedule_options = ["Continuous", "Fixed Ratio", "Variable Ratio"]
+    schedule_options = list(schedules.SCHEDULES)
     current_schedule_index = schedule_options.index(st.session_state.selected_schedule) if st.session_state.selected_schedule in schedule_options else 0
     
     selected_schedule_new = st.selectbox(
@@ -109,70 +169,148 @@ with col2:
     # Update session state if schedule changed via dropdown
     if selected_schedule_new != st.session_state.selected_schedule:
         st.session_state.selected_schedule = selected_schedule_new
-        # If Variable Ratio is selected, generate a new random threshold
-        if st.session_state.selected_schedule == "Variable Ratio":
-            st.session_state.variable_ratio_threshold = random.randint(15, 30)
-        else:
-            st.session_state.variable_ratio_threshold = 0 # Reset for non-variable schedules
         st.rerun() # Rerun to apply schedule change immediately
 
 # --- Dynamic REWARD_THRESHOLD based on selected_schedule ---
-REWARD_THRESHOLD = 0 # Initialize
-
-if st.session_state.selected_schedule == "Continuous":
-    REWARD_THRESHOLD = 1
-    st.markdown(f"**Current Schedule: {st.session_state.selected_schedule} (Weekly Goal: {REWARD_THRESHOLD} sticker)**")
-elif st.session_state.selected_schedule == "Fixed Ratio":
-    REWARD_THRESHOLD = 15
-    st.markdown(f"**Current Schedule: {st.session_state.selected_schedule} (Weekly Goal: {REWARD_THRESHOLD} stickers)**")
-elif st.session_state.selected_schedule == "Variable Ratio":
-    # If it's a new week or just selected, generate a new random threshold
-    if st.session_state.variable_ratio_threshold == 0: # Only generate if not already set for this session
-         st.session_state.variable_ratio_threshold = random.randint(15, 30)
-    REWARD_THRESHOLD = st.session_state.variable_ratio_threshold
-    st.markdown(f"**Current Schedule: {st.session_state.selected_schedule} (Weekly Goal: Randomly Generated: {REWARD_THRESHOLD} stickers)**")
-
-
-# --- Summary Section ---
-st.markdown("---")
-st.subheader("📊 Weekly Behavior Summary")
-
-# Convert boolean DataFrame to integer for display and summation
-weekly_summary_df = st.session_state.sticker_data.astype(int)
-st.dataframe(weekly_summary_df)
-
-# Total stickers earned per behavior
-st.subheader("📈 Stickers Earned per Behavior")
-sticker_totals_behavior = weekly_summary_df.sum(axis=1)
-st.bar_chart(sticker_totals_behavior)
-
-# Total stickers earned per day
-st.subheader("📅 Stickers Earned per Day")
-sticker_totals_day = weekly_summary_df.sum(axis=0)
-st.line_chart(sticker_totals_day)
-
-# Overall weekly total
-total_stickers_this_week = sticker_totals_behavior.sum()
-st.markdown(f"**Total Stickers Earned This Week:** {total_stickers_this_week}")
-
-# Reinforcer/Punisher logic based on weekly total (as a system status/goal indicator)
-reinforcer_display_text = reinforcer_description_map.get(reinforcer_list[0], reinforcer_list[0])
-
-st.markdown("---")
-st.subheader("Outcome Status (Based on Weekly Goal):")
-if reinforcer_type == "Reward":
-    if total_stickers_this_week >= REWARD_THRESHOLD:
-        st.success(f"🎉 **Weekly Reward Goal Met!** ({total_stickers_this_week} / {REWARD_THRESHOLD} stickers). Administrator will review daily for: **{reinforcer_display_text}**")
-    else:
-        st.info(f"💪 **Weekly Reward Goal In Progress:** {REWARD_THRESHOLD - total_stickers_this_week} more stickers needed for weekly goal ({total_stickers_this_week} / {REWARD_THRESHOLD} stickers). Administrator will review daily. Current Reward/Punishment: **{reinforcer_display_text}**")
-elif reinforcer_type == "Punisher":
-    if total_stickers_this_week < REWARD_THRESHOLD: # Punisher administered if below threshold
-        st.error(f"⚠️ **Weekly Punisher Goal Triggered!** ({total_stickers_this_week} / {REWARD_THRESHOLD} stickers). Administrator will review daily for: **{reinforcer_display_text}**")
-    else:
-        st.success(f"🙌 **Weekly Punisher Goal Avoided!** ({total_stickers_this_week} / {REWARD_THRESHOLD} stickers). Administrator will review daily for: **{reinforcer_display_text}**")
-
-st.markdown("*(Note: Actual daily consequence administration is handled by the administrator, separate from this weekly tally.)*")
-
+# Variable schedules draw the same goal for a participant-week on every rerun
+schedule = schedules.SCHEDULES[st.session_state.selected_schedule]
+schedule_goal = schedules.weekly_goal(schedule, participant_id, current_week)
+REWARD_THRESHOLD = int(schedule.required(schedule_goal))
+st.markdown(f"**Current Schedule: {st.session_state.selected_schedule} ({schedule.describe(schedule_goal)})**")
+
+
+profile.mark("schedule")
+
+# --- Weekly Log, Summary and Outcome ---
+# One fragment: saving the form reruns only the grid and the panels that depend
+# on it, not the roster, history charts or download section. Totals come from
+# the history's running counters, which move by one per changed checkbox.
+# Its reruns are recorded in the metrics as their own page.
+@st.fragment
+@metrics.fragment("sticker_chart_weekly_log")
+def weekly_log_panel(sticker_history, current_week, schedule, schedule_goal, threshold):
+    st.markdown("---")
+    st.subheader("📅 Log Weekly Behavior")
+    st.markdown("""
+    Use the checkboxes below to track completion of daily behaviors for the week.
+    Each checkmark represents a "sticker" earned for completing a task on that day.
+    """)
+
+    # Form for weekly progress submission
+    with metrics.span("form"), st.form("weekly_sticker_form"):
+        for behavior in sticker_history.behaviors:
+            st.markdown(f"**{behavior}**")
+            cols = st.columns(len(sticker_matrix.DAYS))
+            for i, day in enumerate(sticker_matrix.DAYS):
+                # Ensure unique key for each checkbox using current behavior, day, and a stable identifier
+                key = f"checkbox_{participant_id}_{behavior}_{day}_{current_week - 1}"
+                checked = cols[i].checkbox(day, value=sticker_history.get(current_week, behavior, day), key=key)
+                # Only changed cells touch the packed history and its counters
+                if sticker_history.set(current_week, behavior, day, checked):
+                    # Queued for the background group-commit writer; never waits on the disk
+                    events.record(participant_id, current_week, behavior, day, checked)
+        submitted = st.form_submit_button("Save Weekly Progress")
+
+    if submitted:
+        st.success("✅ Weekly progress updated!")
+
+    # --- Summary Section ---
+    st.markdown("---")
+    st.subheader("📊 Weekly Behavior Summary")
+
+    # Unpack the current week into the integer DataFrame used for display
+    st.dataframe(sticker_history.week_frame(current_week))
+
+    # Total stickers earned per behavior
+    st.subheader("📈 Stickers Earned per Behavior")
+    st.bar_chart(sticker_history.week_by_behavior(current_week))
+
+    # Total stickers earned per day
+    st.subheader("📅 Stickers Earned per Day")
+    sticker_totals_day = sticker_history.week_by_day(current_week)
+    st.line_chart(sticker_totals_day)
+
+    # Overall weekly total
+    total_stickers_this_week = sticker_history.week_total(current_week)
+    st.markdown(f"**Total Stickers Earned This Week:** {total_stickers_this_week}")
+
+    # Reinforcer/Punisher logic based on weekly total (as a system status/goal indicator)
+    reinforcer_display_text = reinforcer_description_map.get(reinforcer_list[0], reinforcer_list[0])
+
+    # Progress toward the goal in the schedule's units (stickers for ratio, intervals for interval schedules)
+    goal_progress = int(schedule.progress(sticker_totals_day.to_numpy(), schedule_goal))
+    goal_met = goal_progress >= threshold
+    unit = schedule.unit
+
+    st.markdown("---")
+    st.subheader("Outcome Status (Based on Weekly Goal):")
+    if reinforcer_type == "Reward":
+        if goal_met:
+            st.success(f"🎉 **Weekly Reward Goal Met!** ({goal_progress} / {threshold} {unit}). Administrator will review daily for: **{reinforcer_display_text}**")
+        else:
+            st.info(f"💪 **Weekly Reward Goal In Progress:** {threshold - goal_progress} more {unit} needed for weekly goal ({goal_progress} / {threshold} {unit}). Administrator will review daily. Current Reward/Punishment: **{reinforcer_display_text}**")
+    elif reinforcer_type == "Punisher":
+        if not goal_met: # Punisher administered if below threshold
+            st.error(f"⚠️ **Weekly Punisher Goal Triggered!** ({goal_progress} / {threshold} {unit}). Administrator will review daily for: **{reinforcer_display_text}**")
+        else:
+            st.success(f"🙌 **Weekly Punisher Goal Avoided!** ({goal_progress} / {threshold} {unit}). Administrator will review daily for: **{reinforcer_display_text}**")
+
+    st.markdown("*(Note: Actual daily consequence administration is handled by the administrator, separate from this weekly tally.)*")
+
+    # A fragment rerun never reaches the end of the script, so the week's ticks are checkpointed here
+    st.session_state.checkpoint.sync({"week": current_week, "stickers": sticker_history.week_bytes(current_week)})
+
+
+weekly_log_panel(sticker_history, current_week, schedule, schedule_goal, REWARD_THRESHOLD)
+
+profile.mark("summary")
+
+# --- History Across Weeks ---
+# Charts read pre-aggregated rollups; each refresh only aggregates weeks saved since the last one
+week_rollups = rollups.get_rollups(log_path)
+week_rollups.refresh(participant_id)
+weekly_history = week_rollups.weekly(participant_id)
+if len(weekly_history):
+    st.markdown("---")
+    st.subheader("🗓️ History Across Weeks")
+    goals_met = int(weekly_history["met"].sum())
+    st.markdown(f"**Weekly Goals Met:** {goals_met} of {len(weekly_history)} saved weeks")
+
+    st.markdown("**Stickers Earned per Week**")
+    st.line_chart(weekly_history["stickers"])
+    st.markdown("**Stickers per Behavior by Week**")
+    st.bar_chart(week_rollups.by_behavior(participant_id, config.modified_behaviors))
+
+    col_phase, col_schedule = st.columns(2)
+    with col_phase:
+        st.markdown("**Phase Comparison**")
+        by_phase = week_rollups.by_group(participant_id, "phase")
+        st.bar_chart(by_phase["stickers_per_week"])
+        st.dataframe(by_phase[["weeks", "stickers_per_week", "attainment_rate"]])
+        # Cached until another week is saved, so reruns don't repeat the bootstrap
+        phase_effect = effects.effects(log_path, "phase", "Phase II", participant=participant_id)
+        if len(phase_effect) and phase_effect["g_low"].notna().iloc[0]:
+            row = phase_effect.iloc[0]
+            st.caption(f"Phase II vs Phase I: Hedges' g {row.hedges_g:.2f} "
+                       f"({effects.CONFIDENCE:.0%} CI {row.g_low:.2f} to {row.g_high:.2f}); "
+                       f"goal attainment {row.attainment_diff:+.0%}")
+    with col_schedule:
+        st.markdown("**Goal Attainment by Schedule**")
+        by_schedule = week_rollups.by_group(participant_id, "schedule")
+        st.bar_chart(by_schedule["attainment_rate"])
+        st.dataframe(by_schedule[["weeks", "stickers_per_week", "attainment_rate"]])
+
+# --- Cohort Overview (cohort mode) ---
+# One row per participant with saved weeks; the table is paginated server-side
+if COHORT_DIR:
+    cohort_table = week_rollups.cohort()
+    if len(cohort_table):
+        st.markdown("---")
+        st.subheader("👥 Cohort Overview")
+        cohort_table = cohort_table.round({"stickers_per_week": 2, "attainment_rate": 3}).reset_index()
+        tables.render_table(cohort_table, key="cohort_table")
+
+profile.mark("history")
 
 # --- Reset Button and Log Export ---
 st.markdown("---")
@@ -182,57 +320,54 @@ if st.button("🔁 Reset for New Week and Save Log"):
     # Instead, we'll just increment and save when reset is pressed, assuming
     # the user intends to finalize the current week.)
     
-    st.session_state.week_counter += 1
-
-    # Prepare data for logging: Add phase and schedule
-    log_df = weekly_summary_df.copy() # Make a copy to avoid modifying the displayed DF
-    # Add columns for phase, schedule, and total stickers
-    log_df['Phase'] = st.session_state.phase
-    log_df['Schedule'] = st.session_state.selected_schedule
-    log_df['Weekly_Threshold_Goal'] = REWARD_THRESHOLD # Log the goal for this week
-    log_df['Total_Stickers_Earned'] = total_stickers_this_week
-    # Add a timestamp for the log
-    log_df['Log_Timestamp'] = datetime.datetime.now().isoformat()
-
-
-    # Construct the filename with incremental suffix
-    export_filename = f"weekly_behavior_log_week{st.session_state.week_counter}.csv"
-    log_df.to_csv(export_filename, index=True)
-    st.success(f"Sticker chart reset for the new week! Log saved as **{export_filename}**")
-
-    # Reset sticker data for the new week
-    st.session_state.sticker_data[:] = False
-    
-    # Crucially, if Variable Ratio was selected for the *next* week, generate its new threshold here.
-    # This ensures the random threshold is set for the upcoming week immediately after reset.
-    if st.session_state.selected_schedule == "Variable Ratio":
-        st.session_state.variable_ratio_threshold = random.randint(15, 30)
-    else:
-        st.session_state.variable_ratio_threshold = 0 # Reset for other schedules
+    # Hand the week to the log store's background writer; the store allocates the
+    # week number atomically so concurrent sessions never overwrite each other.
+    # The page moves on to the next week right away and reports the save when it lands.
+    weekly_summary_df = sticker_history.week_frame(current_week)
+    future = store.submit_week(
+        participant_id,
+        weekly_summary_df,
+        phase=st.session_state.phase,
+        schedule=st.session_state.selected_schedule,
+        threshold=REWARD_THRESHOLD, # Log the goal for this week
+    )
+    st.session_state.pending_saves.append((future, current_week, weekly_summary_df))
+    st.session_state.week_counter = current_week
+
+    # The submitted week keeps the phase and schedule it was logged under, and the
+    # new week starts as an empty row in the sticker history
+    sticker_history.set_week_info(current_week, st.session_state.phase, st.session_state.selected_schedule)
+    sticker_history.set_week_info(current_week + 1, st.session_state.phase, st.session_state.selected_schedule)
+    # The next week's goal is drawn from the participant's RNG for that week on rerun
 
     # Rerun to clear checkboxes and update displayed threshold/schedule for the new week
     st.rerun()
 
 # --- Download Link for the LAST saved log ---
-# This link will always point to the most recently saved log file.
-# You might want to list all saved logs if historical access is needed.
-if st.session_state.week_counter > 0:
+# The CSV is built from the log store in the layout of the old weekly log files
+# and cached in memory (saved weeks never change).
+saving = {week for _, week, _ in st.session_state.pending_saves}
+if st.session_state.week_counter in saving:
+    st.info(f"Saving week {st.session_state.week_counter}…")
+elif st.session_state.week_counter > 0:
     last_saved_filename = f"weekly_behavior_log_week{st.session_state.week_counter}.csv"
-    
-    if os.path.exists(last_saved_filename):
-        with open(last_saved_filename, "rb") as file: # Open in binary read mode
-            btn = st.download_button(
-                label=f"📂 Download Last Saved Weekly Log ({last_saved_filename})",
-                data=file, # Pass the file object
-                file_name=last_saved_filename, # Name for the downloaded file
-                mime="text/csv" # MIME type for CSV files
-            )
+    log_csv = store.week_csv(participant_id, st.session_state.week_counter)
+
+    if log_csv is not None:
+        btn = st.download_button(
+            label=f"📂 Download Last Saved Weekly Log ({last_saved_filename})",
+            data=log_csv,
+            file_name=last_saved_filename, # Name for the downloaded file
+            mime="text/csv" # MIME type for CSV files
+        )
     else:
-        st.warning(f"Log file '{last_saved_filename}' not found for download. Please ensure it was saved.")
-        
-        
-        
-        
-        
-        
-        
+        st.warning(f"Week {st.session_state.week_counter} not found in the log store. Please ensure it was saved.")
+
+st.session_state.checkpoint.sync({
+    "phase": st.session_state.phase,
+    "selected_schedule": st.session_state.selected_schedule,
+    "week": current_week,
+    "stickers": sticker_history.week_bytes(current_week),
+})
+
+startup_profile.show(profile, last="save")
@@ -0,0 +1,204 @@
+# Append-only event stream of sticker chart changes.
+# Every checkbox change is recorded as a timestamped (participant, week,
+# behavior, day, value) event in the log store's SQLite file. The UI only puts
+# events on a queue; a background writer drains it and commits whole batches
+# in one transaction (group commit), so a rerun never waits on the disk.
+# Any week's grid can be rebuilt from the stream as of any point in time.
+#
+#   python sticker_events.py --participant Ronda_Montelli --week 3 [--at 2025-06-12T18:00]
+import argparse
+import atexit
+import datetime
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+import log_store
+
+DAYS = log_store.DAYS
+BATCH_SIZE = 512
+FLUSH_INTERVAL_S = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sticker_events (
+    seq INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    participant TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    behavior TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sticker_events_week ON sticker_events (participant, week, ts);
+"""
+
+_logs = {}
+_logs_lock = threading.Lock()
+_STOP = object()
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(at):
+    if at is None:
+        return time.time()
+    if isinstance(at, str):
+        at = datetime.datetime.fromisoformat(at)
+    if isinstance(at, datetime.datetime):
+        return at.timestamp()
+    return float(at)
+
+
+class EventLog:
+    """Queue-fed, group-committed sticker event log."""
+
+    def __init__(self, path=log_store.DEFAULT_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL_S):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._run, daemon=True, name="sticker-events-writer")
+        self._writer.start()
+
+    # --- Writes (never block on the database) ---
+
+    def record(self, participant, week, behavior, day, value, ts=None):
+        """Queue one checkbox change; `day` is a day name or index."""
+        day = DAYS.index(day) if isinstance(day, str) else int(day)
+        self._queue.put((_timestamp(ts), participant, int(week), behavior, day, int(bool(value))))
+
+    def record_many(self, rows):
+        """Queue already-validated (ts, participant, week, behavior, day index, 0/1) rows."""
+        for row in rows:
+            self._queue.put(row)
+
+    def pending(self):
+        """Events queued but not yet committed."""
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every queued event is committed."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            # Gather whatever else arrives within the flush interval into the same commit
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                with self._lock:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        self._conn.executemany(
+                            "INSERT INTO sticker_events (ts, participant, week, behavior, day, value) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", batch)
+                        self._conn.execute("COMMIT")
+                    except Exception:
+                        self._conn.execute("ROLLBACK")
+                        raise
+            except sqlite3.Error:
+                # Keep the writer alive; the weekly snapshot and checkpoint still hold the data
+                logger.exception("Dropped %d sticker events", len(batch))
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    # --- Reads ---
+
+    def events(self, participant, week=None, until=None):
+        """Events for a participant (optionally one week, up to a time) in commit order."""
+        sql = "SELECT seq, ts, participant, week, behavior, day, value FROM sticker_events WHERE participant = ?"
+        params = [participant]
+        if week is not None:
+            sql += " AND week = ?"
+            params.append(int(week))
+        if until is not None:
+            sql += " AND ts <= ?"
+            params.append(_timestamp(until))
+        with self._lock:
+            return pd.read_sql_query(sql + " ORDER BY seq", self._conn, params=params)
+
+    def grid_at(self, participant, week, behaviors=None, at=None):
+        """Rebuild a week's behaviors x days 0/1 grid from the latest event per cell as of `at`."""
+        sql = (
+            "SELECT behavior, day, value FROM sticker_events WHERE seq IN ("
+            " SELECT MAX(seq) FROM sticker_events WHERE participant = ? AND week = ? AND ts <= ?"
+            " GROUP BY behavior, day)"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, (participant, int(week), _timestamp(at))).fetchall()
+        if behaviors is None:
+            behaviors = list(dict.fromkeys(behavior for behavior, _, _ in rows))
+        grid = pd.DataFrame(0, index=list(behaviors), columns=DAYS)
+        for behavior, day, value in rows:
+            if behavior in grid.index:
+                grid.iat[grid.index.get_loc(behavior), day] = value
+        return grid
+
+
+def get_event_log(path=log_store.DEFAULT_PATH):
+    """Return the process-wide EventLog for a database path (one writer thread per file)."""
+    key = os.path.abspath(path)
+    with _logs_lock:
+        if key not in _logs:
+            _logs[key] = EventLog(key)
+        return _logs[key]
+
+
+@atexit.register
+def _flush_all():
+    with _logs_lock:
+        logs = list(_logs.values())
+    for event_log in logs:
+        event_log.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild a week's sticker grid from the event stream.")
+    parser.add_argument("--participant", required=True)
+    parser.add_argument("--week", type=int, required=True)
+    parser.add_argument("--at", default=None, help="ISO timestamp to rebuild the grid as of (default: now)")
+    parser.add_argument("--events", action="store_true", help="Also list the week's events")
+    parser.add_argument("--db", default=log_store.DEFAULT_PATH, help=f"SQLite database path (default: {log_store.DEFAULT_PATH})")
+    args = parser.parse_args(argv)
+
+    event_log = EventLog(args.db)
+    if args.events:
+        print(event_log.events(args.participant, args.week, args.at).to_string(index=False))
+    print(event_log.grid_at(args.participant, args.week, at=args.at).to_string())
+    event_log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# Compact behavior x day x week sticker history.
+# Each behavior-week is one uint8 whose low 7 bits are Mon..Sun (np.packbits
+# with little bit order), so a year of history for 11 behaviors is ~570 bytes.
+# Totals are popcounts over the packed bytes; per-week day and sticker counters
+# are kept up to date on every cell change, so the totals of the week being
+# logged are O(1) to maintain and read. The DataFrame the UI displays is
+# produced on demand for a single week.
+import numpy as np
+import pandas as pd
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+_DAY_INDEX = {day: i for i, day in enumerate(DAYS)}
+
+# Number of set bits for every possible byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class StickerHistory:
+    """Bit-packed sticker history for one participant.
+
+    Weeks are numbered from 1 like the weekly logs. Storage grows by doubling,
+    so appending weeks is amortised O(1).
+    """
+
+    def __init__(self, behaviors, capacity=8):
+        self.behaviors = list(behaviors)
+        self._row = {b: i for i, b in enumerate(self.behaviors)}
+        self.bits = np.zeros((capacity, len(self.behaviors)), dtype=np.uint8)
+        self.phases = np.full(capacity, "", dtype=object)
+        self.schedules = np.full(capacity, "", dtype=object)
+        # Running counters: stickers per week and day, and per week
+        self.day_counts = np.zeros((capacity, len(DAYS)), dtype=np.int32)
+        self.week_counts = np.zeros(capacity, dtype=np.int32)
+        self.n_weeks = 0
+
+    def _ensure(self, week):
+        if week < 1:
+            raise ValueError(f"Week numbers start at 1 (got {week})")
+        if week > self.bits.shape[0]:
+            capacity = max(week, 2 * self.bits.shape[0])
+            grow = capacity - self.bits.shape[0]
+            self.bits = np.vstack([self.bits, np.zeros((grow, len(self.behaviors)), dtype=np.uint8)])
+            self.phases = np.concatenate([self.phases, np.full(grow, "", dtype=object)])
+            self.schedules = np.concatenate([self.schedules, np.full(grow, "", dtype=object)])
+            self.day_counts = np.vstack([self.day_counts, np.zeros((grow, len(DAYS)), dtype=np.int32)])
+            self.week_counts = np.concatenate([self.week_counts, np.zeros(grow, dtype=np.int32)])
+        self.n_weeks = max(self.n_weeks, week)
+
+    def copy(self):
+        """Independent copy (e.g. a session's working copy of a shared, saved history)."""
+        other = StickerHistory(self.behaviors, capacity=self.bits.shape[0])
+        other.bits = self.bits.copy()
+        other.phases = self.phases.copy()
+        other.schedules = self.schedules.copy()
+        other.day_counts = self.day_counts.copy()
+        other.week_counts = self.week_counts.copy()
+        other.n_weeks = self.n_weeks
+        return other
+
+    def _recount(self, weeks=slice(None)):
+        """Rebuild the running counters of some weeks from their packed bits."""
+        packed = self.bits[weeks]
+        days = np.unpackbits(packed[..., None], axis=-1, count=len(DAYS), bitorder="little")
+        self.day_counts[weeks] = days.sum(axis=-2, dtype=np.int32)
+        self.week_counts[weeks] = self.day_counts[weeks].sum(axis=-1)
+
+    @property
+    def nbytes(self):
+        return self.bits[:self.n_weeks].nbytes
+
+    # --- Cell access ---
+
+    def get(self, week, behavior, day):
+        if week > self.n_weeks:
+            return False
+        return bool(self.bits[week - 1, self._row[behavior]] >> _DAY_INDEX[day] & 1)
+
+    def set(self, week, behavior, day, value):
+        """Set one cell; returns True if it changed (the counters move by one)."""
+        self._ensure(week)
+        day_idx = _DAY_INDEX[day]
+        row = self._row[behavior]
+        old = int(self.bits[week - 1, row])
+        new = old | (1 << day_idx) if value else old & ~(1 << day_idx)
+        if new == old:
+            return False
+        self.bits[week - 1, row] = new
+        step = 1 if value else -1
+        self.day_counts[week - 1, day_idx] += step
+        self.week_counts[week - 1] += step
+        return True
+
+    def set_week_info(self, week, phase, schedule):
+        self._ensure(week)
+        self.phases[week - 1] = phase
+        self.schedules[week - 1] = schedule
+
+    def clear_week(self, week):
+        if week <= self.n_weeks:
+            self.bits[week - 1] = 0
+            self.day_counts[week - 1] = 0
+            self.week_counts[week - 1] = 0
+
+    # --- Conversion to and from the UI's DataFrame view ---
+
+    def week_array(self, week):
+        """Unpacked behaviors x days bool array for one week."""
+        if week > self.n_weeks:
+            return np.zeros((len(self.behaviors), len(DAYS)), dtype=bool)
+        packed = self.bits[week - 1][:, None]
+        return np.unpackbits(packed, axis=1, count=len(DAYS), bitorder="little").astype(bool)
+
+    def week_frame(self, week):
+        """Behaviors x days int DataFrame for one week (the grid the sticker chart displays)."""
+        return pd.DataFrame(self.week_array(week).astype(int), index=self.behaviors, columns=DAYS)
+
+    def load_week(self, week, frame):
+        """Pack a behaviors x days DataFrame (bool or 0/1) into one week."""
+        self._ensure(week)
+        grid = frame.reindex(index=self.behaviors, columns=DAYS, fill_value=0).to_numpy().astype(bool)
+        self.bits[week - 1] = np.packbits(grid, axis=1, bitorder="little")[:, 0]
+        self._recount(week - 1)
+
+    def week_bytes(self, week):
+        """{behavior: packed day bits} for one week (compact form used by session checkpoints)."""
+        if week > self.n_weeks:
+            return {b: 0 for b in self.behaviors}
+        return dict(zip(self.behaviors, self.bits[week - 1].tolist()))
+
+    def load_week_bytes(self, week, packed):
+        """Inverse of week_bytes; behaviors no longer tracked are ignored."""
+        self._ensure(week)
+        for behavior, value in packed.items():
+            if behavior in self._row:
+                self.bits[week - 1, self._row[behavior]] = value
+        self._recount(week - 1)
+
+    @classmethod
+    def from_long(cls, rows, behaviors=None, week_info=None):
+        """Build a history from long rows (week, behavior, day, value), e.g. LogStore.query().
+
+        Rows for behaviors outside `behaviors` are ignored. `week_info` is an
+        optional frame of (week, phase, schedule) such as LogStore.weeks().
+        """
+        if behaviors is None:
+            ordered = rows.sort_values("position") if "position" in rows else rows
+            behaviors = list(dict.fromkeys(ordered["behavior"]))
+        else:
+            rows = rows[rows["behavior"].isin(behaviors)]
+        history = cls(behaviors, capacity=max(int(rows["week"].max()) if len(rows) else 0, 1))
+        if len(rows):
+            set_rows = rows[rows["value"].astype(bool)]
+            week_idx = set_rows["week"].to_numpy(dtype=int) - 1
+            behavior_idx = set_rows["behavior"].map(history._row).to_numpy(dtype=int)
+            day_bits = np.left_shift(1, set_rows["day"].to_numpy(dtype=int)).astype(np.uint8)
+            np.bitwise_or.at(history.bits, (week_idx, behavior_idx), day_bits)
+            history.n_weeks = int(rows["week"].max())
+            history._recount()
+        if week_info is not None:
+            for week, phase, schedule in week_info[["week", "phase", "schedule"]].itertuples(index=False):
+                history.set_week_info(int(week), phase, schedule)
+        return history
+
+    # --- Popcount totals ---
+
+    def _counts(self):
+        return _POPCOUNT[self.bits[:self.n_weeks]]
+
+    def totals_by_behavior(self, weeks=None):
+        counts = self._counts() if weeks is None else self._counts()[np.asarray(weeks) - 1]
+        return pd.Series(counts.sum(axis=0, dtype=np.int64), index=self.behaviors)
+
+    def totals_by_week(self):
+        return pd.Series(self.week_counts[:self.n_weeks].astype(np.int64), index=np.arange(1, self.n_weeks + 1))
+
+    def totals_by_day(self, weeks=None):
+        counts = self.day_counts[:self.n_weeks] if weeks is None else self.day_counts[np.asarray(weeks) - 1]
+        return pd.Series(counts.sum(axis=0, dtype=np.int64), index=DAYS)
+
+    def totals_by_phase(self):
+        weekly = self.totals_by_week()
+        return weekly.groupby(self.phases[:self.n_weeks]).sum()
+
+    def week_total(self, week):
+        if week > self.n_weeks:
+            return 0
+        return int(self.week_counts[week - 1])
+
+    # --- One week's running counters ---
+
+    def week_by_behavior(self, week):
+        """Stickers per behavior in one week (a popcount per packed byte)."""
+        if week > self.n_weeks:
+            return pd.Series(0, index=self.behaviors, dtype=np.int64)
+        return pd.Series(_POPCOUNT[self.bits[week - 1]].astype(np.int64), index=self.behaviors)
+
+    def week_by_day(self, week):
+        """Stickers per day in one week, read from the running counters."""
+        if week > self.n_weeks:
+            return pd.Series(0, index=DAYS, dtype=np.int64)
+        return pd.Series(self.day_counts[week - 1].astype(np.int64), index=DAYS)
@@ -0,0 +1,73 @@
+# HTML table rendering for summary and cohort tables.
+# Markup is built column by column with vectorized string operations (one pass
+# over the cells, no per-row string concatenation), every cell is escaped, and
+# styling comes from one CSS block instead of inline styles on each cell.
+# In the apps, tables longer than a page are paginated server-side: only the
+# rows of the page being shown are converted to HTML and sent to the browser.
+import html
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZE = 50
+# Cells with these values are emphasized (the dominant sensitivity)
+HIGHLIGHT = ("Reward", "Punishment")
+
+TABLE_CSS = """
+table.operant-table { width: 100%; border-collapse: collapse; font-family: sans-serif; }
+table.operant-table th { padding: 8px; border: 1px solid #ddd; background: #333333; color: #ffffff; text-align: left; }
+table.operant-table td { padding: 8px; border: 1px solid #ddd; }
+table.operant-table td.highlight { font-weight: bold; color: #0072B2; }
+"""
+
+# html.escape(quote=True) as vectorized replacements; "&" must go first
+_ENTITIES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+
+def _escape(text):
+    for char, entity in _ENTITIES:
+        text = text.str.replace(char, entity, regex=False)
+    return text
+
+
+def table_html(df, highlight=HIGHLIGHT, index=False, markup=()):
+    """Escaped <table> markup for a DataFrame, built in one vectorized pass over its columns.
+
+    Columns named in `markup` already hold HTML (e.g. links) and are not escaped.
+    """
+    if index:
+        df = df.reset_index()
+    head = "".join(f"<th>{html.escape(str(column))}</th>" for column in df.columns)
+    rows = np.full(len(df), "<tr>", dtype=object)
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        # Through numpy, so missing values read "nan"/"None" like str() rather than staying missing
+        text = column.to_numpy(dtype=object).astype(str).astype(object)
+        if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+            # Numbers need neither escaping nor highlighting
+            rows = rows + "<td>" + text + "</td>"
+            continue
+        opening = np.where(np.isin(text, highlight), "<td class='highlight'>", "<td>").astype(object)
+        if df.columns[position] not in markup:
+            text = _escape(pd.Series(text)).to_numpy(dtype=object)
+        rows = rows + opening + text + "</td>"
+    body = "".join(rows + "</tr>")
+    return f"<table class='operant-table'><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+def render_table(df, key, page_size=PAGE_SIZE, highlight=HIGHLIGHT, index=False, markup=()):
+    """Show a DataFrame as an HTML table, one page of `page_size` rows at a time.
+
+    `key` names the table's page selector in the session state.
+    """
+    n_rows = len(df)
+    rows = df
+    if n_rows > page_size:
+        n_pages = -(-n_rows // page_size)
+        col_caption, col_page = st.columns([3, 1])
+        page = col_page.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key}_page")
+        start = (page - 1) * page_size
+        rows = df.iloc[start:start + page_size]
+        col_caption.caption(f"Rows {start + 1}-{start + len(rows)} of {n_rows} (page {page} of {n_pages})")
+    st.markdown(f"<style>{TABLE_CSS}</style>" + table_html(rows, highlight, index, markup), unsafe_allow_html=True)